@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import DepositSaving, StockHolding, BondHolding
+from .models import DepositSaving, StockHolding, BondHolding, FxRate, PortfolioSummary, PriceRefreshJob
+from .pricing import refresh_holdings
 
 
 @admin.register(DepositSaving)
@@ -40,10 +41,7 @@ class StockHoldingAdmin(admin.ModelAdmin):
     ]
 
     def action_update_stock_prices(self, request, queryset):
-        updated = 0
-        for obj in queryset:
-            if obj.update_price_via_fdr():
-                updated += 1
+        updated = refresh_holdings(stocks=queryset).stocks_updated
         self.message_user(request, f"주식 가격 업데이트: {updated}건 완료")
     action_update_stock_prices.short_description = "선택 주식 FDR 가격 업데이트"
 
@@ -69,9 +67,29 @@ class BondHoldingAdmin(admin.ModelAdmin):
     ]
 
     def action_update_bond_prices(self, request, queryset):
-        updated = 0
-        for obj in queryset:
-            if obj.update_price_via_pykrx():
-                updated += 1
+        updated = refresh_holdings(bonds=queryset).bonds_updated
         self.message_user(request, f"채권 가격 업데이트: {updated}건 완료")
     action_update_bond_prices.short_description = "선택 채권 pykrx 가격 업데이트"
+
+
+@admin.register(PortfolioSummary)
+class PortfolioSummaryAdmin(admin.ModelAdmin):
+    list_display = ("user", "as_of", "class_totals", "updated_at")
+    search_fields = ("user__username",)
+    readonly_fields = (
+        "class_totals", "currency_totals", "change_sums", "class_currency_totals", "as_of", "updated_at"
+    )
+
+
+@admin.register(PriceRefreshJob)
+class PriceRefreshJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "status", "progress", "stocks_updated", "bonds_updated", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("user__username",)
+
+
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    list_display = ("currency", "rate_date", "rate", "source", "updated_at")
+    list_filter = ("currency", "source")
+    date_hierarchy = "rate_date"
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TmAssetsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.tm_assets"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,127 @@
+"""
+채권 분석: 만기수익률(YTM), 수정 듀레이션, 컨벡시티, 경과이자.
+
+사용자의 채권 전체를 (채권 × 이표 회차) 현금흐름 행렬로 만들어 뉴턴법을 모든 채권에
+동시에 적용한다. 계산 결과는 (채권, 가격, 표면금리, 만기, 기준일) 키로 캐시에 저장하므로
+가격이 바뀌지 않은 채권은 다음 요청에서 다시 풀지 않는다.
+
+가정
+- 이표 지급 주기는 COUPON_FREQUENCY (국고채 기준 연 2회), 이표일은 만기일에서 거꾸로 등간격
+- 기간은 실제 일수/365, 가격(%)은 경과이자를 뺀 가격(clean price)
+"""
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+COUPON_FREQUENCY = 2
+CACHE_TIMEOUT = 60 * 60 * 24
+_NEWTON_STEPS = 50
+_TOLERANCE = 1e-10
+
+METRICS = ("ytm", "mod_duration", "convexity", "accrued_pct")
+
+
+def bond_metrics(coupon_pct, price_pct, years, freq=COUPON_FREQUENCY):
+    """
+    채권별 지표 벡터 계산 (액면 100 기준).
+    - coupon_pct: 표면금리(%) 배열, price_pct: clean price(%) 배열, years: 잔존기간(년) 배열
+    반환: dict(ytm=%, mod_duration=년, convexity, accrued_pct=경과이자(액면 100 기준)) — 만기 경과 채권은 NaN
+    """
+    coupon_pct = np.asarray(coupon_pct, dtype=np.float64)
+    price_pct = np.asarray(price_pct, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    n = len(years)
+    nan = np.full(n, np.nan)
+    alive = (years > 0) & ~np.isnan(price_pct) & (price_pct > 0)
+    if not alive.any():
+        return {m: nan.copy() for m in METRICS}
+
+    period = 1.0 / freq
+    coupon = coupon_pct / freq
+    # 다음 이표일까지 남은 기간 → 경과이자 (직전 이표일 이후 경과 비율)
+    next_t = np.where(alive, np.mod(years, period), 0.0)
+    next_t = np.where(np.isclose(next_t, 0.0), period, next_t)
+    accrued = coupon * (1.0 - next_t / period)
+
+    # 현금흐름 행렬: 열 k 는 k 번째 이표일 (next_t + k*period), 만기 이후 칸은 0
+    periods = int(np.ceil(np.nanmax(np.where(alive, years, 0.0)) * freq)) + 1
+    t = next_t[:, None] + period * np.arange(periods)[None, :]
+    live = t <= years[:, None] + 1e-9
+    cash = np.where(live, coupon[:, None], 0.0)
+    last = live.sum(axis=1) - 1
+    rows = np.flatnonzero(alive)
+    cash[rows, last[rows]] += 100.0
+
+    dirty = price_pct + accrued
+    y = np.where(alive, coupon_pct / 100.0, 0.0)  # 초기값: 표면금리
+    for _ in range(_NEWTON_STEPS):
+        base = 1.0 + y[:, None] / freq
+        discount = base ** (-freq * t)
+        pv = (cash * discount).sum(axis=1)
+        # d(pv)/dy = Σ -t * cf * base^(-f t - 1)
+        dpv = (-t * cash * discount / base).sum(axis=1)
+        step = np.where(alive, (pv - dirty) / np.where(dpv == 0, -1.0, dpv), 0.0)
+        y = np.maximum(y - step, -0.99 * freq)
+        if np.all(np.abs(step) < _TOLERANCE):
+            break
+
+    base = 1.0 + y[:, None] / freq
+    discount = base ** (-freq * t)
+    pv_flows = cash * discount
+    pv = np.where(alive, pv_flows.sum(axis=1), 1.0)  # 만기 경과 채권은 현금흐름이 없음 (결과는 NaN 처리)
+    macaulay = (t * pv_flows).sum(axis=1) / pv
+    mod_duration = macaulay / (1.0 + y / freq)
+    convexity = (cash * t * (t + period) * discount / base**2).sum(axis=1) / pv
+
+    def masked(values):
+        return np.where(alive, values, np.nan)
+
+    return {
+        "ytm": masked(y * 100.0),
+        "mod_duration": masked(mod_duration),
+        "convexity": masked(convexity),
+        "accrued_pct": masked(accrued),
+    }
+
+
+def _price(bond):
+    return bond.current_price_pct if bond.current_price_pct is not None else bond.purchase_price_pct
+
+
+def _cache_key(bond, as_of):
+    return f"tm_assets:bond_analytics:{bond.pk}:{_price(bond)}:{bond.coupon_rate}:{bond.maturity_date}:{as_of}"
+
+
+def analyze_bonds(bonds, as_of=None):
+    """
+    채권 목록의 지표를 계산해 각 인스턴스에 ytm / mod_duration / convexity / accrued_interest 로 붙임.
+    캐시에 없는 채권만 한 번의 벡터 계산으로 푼다. 반환: 채권 목록
+    """
+    as_of = as_of or timezone.localdate()
+    bonds = list(bonds)
+    keys = {bond.pk: _cache_key(bond, as_of) for bond in bonds}
+    cached = cache.get_many(list(keys.values()))
+
+    missing = [bond for bond in bonds if keys[bond.pk] not in cached]
+    if missing:
+        metrics = bond_metrics(
+            [float(b.coupon_rate) for b in missing],
+            [float(_price(b)) for b in missing],
+            [(b.maturity_date - as_of).days / 365.0 for b in missing],
+        )
+        fresh = {
+            keys[bond.pk]: {m: (None if np.isnan(metrics[m][i]) else float(metrics[m][i])) for m in METRICS}
+            for i, bond in enumerate(missing)
+        }
+        cache.set_many(fresh, CACHE_TIMEOUT)
+        cached.update(fresh)
+
+    for bond in bonds:
+        result = cached[keys[bond.pk]]
+        bond.ytm = result["ytm"]
+        bond.mod_duration = result["mod_duration"]
+        bond.convexity = result["convexity"]
+        accrued = result["accrued_pct"]
+        bond.accrued_interest = None if accrued is None else float(bond.face_amount) * accrued / 100.0
+    return bonds
@@ -0,0 +1,157 @@
+"""
+환율 저장소 + 기준 통화 환산.
+
+- 가격 업데이트 커맨드가 FinanceDataReader 의 "USD/KRW" 형태 시계열을 받아 FxRate 에 일괄 upsert
+- 화면은 프로세스 내 캐시(FX_CACHE_TTL 초)에 있는 최신 환율만 사용하므로 조회 중 외부 요청이 없다
+- 환율은 모두 "통화 1단위의 원화 가격"으로 저장하고, 기준 통화 환산은 rate[통화] / rate[기준] 로 한다
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Currency, FxRate
+from .view_cache import invalidate_all
+
+logger = logging.getLogger(__name__)
+
+# 통화 → FinanceDataReader 심볼
+FX_SYMBOLS = {
+    Currency.USD: "USD/KRW",
+    Currency.JPY: "JPY/KRW",
+    Currency.EUR: "EUR/KRW",
+}
+# 저장된 환율이 없을 때 처음 받을 기간
+INITIAL_LOOKBACK_DAYS = 10
+DEFAULT_CACHE_TTL = 300
+RATE_Q = Decimal("0.000001")
+
+_cache = {"rates": None, "loaded_at": 0.0}
+_cache_lock = threading.Lock()
+
+
+def base_currency():
+    return getattr(settings, "BASE_CURRENCY", Currency.KRW)
+
+
+def fetch_fx_series(currency, start):
+    """start(date) 이후 일별 환율 Series (날짜 인덱스, KRW). 실패 시 None."""
+    try:
+        import FinanceDataReader as fdr
+    except Exception:
+        return None
+    try:
+        df = fdr.DataReader(FX_SYMBOLS[currency], start.isoformat())
+    except Exception:
+        logger.warning("FX fetch failed: %s", currency, exc_info=True)
+        return None
+    if df is None or df.empty or "Close" not in df.columns:
+        return None
+    closes = df["Close"].dropna()
+    return closes.set_axis([ts.date() for ts in closes.index])
+
+
+def refresh_fx_rates(currencies=None):
+    """저장된 마지막 날짜 이후 환율을 받아 통화별 bulk upsert. 반환: 저장 행 수"""
+    from .pricing import get_limiter
+
+    currencies = list(currencies or FX_SYMBOLS)
+    last = dict(FxRate.objects.filter(currency__in=currencies).values("currency").annotate(
+        last=Max("rate_date")).values_list("currency", "last"))
+    default_start = timezone.localdate() - timedelta(days=INITIAL_LOOKBACK_DAYS)
+    limiter = get_limiter("FDR")
+
+    saved = 0
+    for currency in currencies:
+        with limiter:
+            series = fetch_fx_series(currency, last.get(currency) or default_start)
+        if series is None or series.empty:
+            continue
+        rows = [
+            FxRate(currency=currency, rate_date=day, rate=Decimal(str(rate)).quantize(RATE_Q), source="FDR")
+            for day, rate in series.items()
+        ]
+        with transaction.atomic():
+            FxRate.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["currency", "rate_date"],
+                update_fields=["rate", "source", "updated_at"],
+            )
+        saved += len(rows)
+    invalidate_rates()
+    if saved:
+        invalidate_all()
+    return saved
+
+
+def _load_rates():
+    """통화별 최신 환율 {통화: KRW 가격} (KRW 는 1.0)."""
+    latest = FxRate.objects.values("currency").annotate(last=Max("rate_date"))
+    rates = {Currency.KRW.value: 1.0}
+    pairs = {(row["currency"], row["last"]) for row in latest}
+    if pairs:
+        days = {day for _, day in pairs}
+        for currency, day, rate in FxRate.objects.filter(rate_date__in=days).values_list(
+            "currency", "rate_date", "rate"
+        ):
+            if (currency, day) in pairs:
+                rates[currency] = float(rate)
+    return rates
+
+
+def latest_rates():
+    """프로세스 내 캐시된 최신 환율. TTL 이 지나면 DB 에서 다시 읽음 (외부 요청 없음)."""
+    ttl = getattr(settings, "FX_CACHE_TTL", DEFAULT_CACHE_TTL)
+    with _cache_lock:
+        if _cache["rates"] is None or time.monotonic() - _cache["loaded_at"] > ttl:
+            _cache["rates"] = _load_rates()
+            _cache["loaded_at"] = time.monotonic()
+        return dict(_cache["rates"])
+
+
+def invalidate_rates():
+    with _cache_lock:
+        _cache["rates"] = None
+
+
+def conversion_factors(currencies, base=None, rates=None) -> np.ndarray:
+    """통화 코드 배열 → 기준 통화 환산 계수 배열. 환율이 없는 통화는 NaN."""
+    base = base or base_currency()
+    rates = rates if rates is not None else latest_rates()
+    base_rate = rates.get(base, np.nan)
+    codes = np.asarray(currencies, dtype=object)
+    if not codes.size:
+        return np.zeros(0)
+    uniq, idx = np.unique(codes.astype(str), return_inverse=True)
+    factors = np.array([rates.get(code, np.nan) for code in uniq], dtype=np.float64) / base_rate
+    return factors[idx]
+
+
+def to_base(class_currency_totals, base=None, rates=None):
+    """
+    {자산군: {통화: 합계}} 를 기준 통화로 환산.
+    반환: (자산군별 합계, 통화별 합계(기준 통화 환산), 환율이 없어 제외된 통화 목록)
+    """
+    base = base or base_currency()
+    rates = rates if rates is not None else latest_rates()
+    class_totals, currency_totals, missing = {}, {}, set()
+    for asset_class, by_currency in class_currency_totals.items():
+        codes = list(by_currency)
+        converted = conversion_factors(codes, base, rates) * np.array([by_currency[c] for c in codes], dtype=float)
+        class_totals[asset_class] = 0.0
+        for code, value in zip(codes, converted.tolist()):
+            if np.isnan(value):
+                missing.add(code)
+                continue
+            class_totals[asset_class] += value
+            currency_totals[code] = currency_totals.get(code, 0.0) + value
+    return class_totals, currency_totals, sorted(missing)
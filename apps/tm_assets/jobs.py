@@ -0,0 +1,107 @@
+"""
+가격 새로고침 작업 큐 (DB 테이블 기반).
+
+웹 요청은 enqueue_refresh() 로 작업만 등록하고 바로 응답한다.
+run_price_worker 커맨드(Procfile 의 worker 프로세스)가 claim_next() 로 작업을 하나씩 가져가
+run_job() 으로 처리하며, 진행률/결과는 작업 행에 기록되어 상태 API 가 그대로 읽는다.
+워커가 작업 중 죽으면(배포 재시작, OOM) 작업이 RUNNING 으로 남으므로, updated_at(진행률 기록 시 갱신)이
+PRICE_JOB_STALE_SECONDS 보다 오래된 RUNNING 작업은 실패로 처리한다 — 워커 루프와 새 작업 등록 시
+fail_stale_jobs() 로 기록하고, 상태 조회(읽기 경로)는 쓰지 않고 as_seen() 으로 실패로만 보여 준다.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import BondHolding, DepositSaving, PriceRefreshJob, StockHolding
+from .pricing import refresh_holdings
+
+logger = logging.getLogger(__name__)
+
+Status = PriceRefreshJob.Status
+
+DEFAULT_STALE_SECONDS = 15 * 60
+# 실패한 작업의 오류를 포트폴리오 화면에 보여 주는 시간
+FAILED_NOTICE = timedelta(minutes=30)
+STALE_ERROR = "가격 업데이트 작업이 중단되었습니다 (워커 재시작 등). 다시 시도해 주세요."
+
+
+def stale_after():
+    return timedelta(seconds=getattr(settings, "PRICE_JOB_STALE_SECONDS", DEFAULT_STALE_SECONDS))
+
+
+def fail_stale_jobs(user=None):
+    """오래 진행 기록이 없는 RUNNING 작업을 FAILED 로 정리. 반환: 정리한 작업 수"""
+    now = timezone.now()
+    qs = PriceRefreshJob.objects.filter(status=Status.RUNNING, updated_at__lt=now - stale_after())
+    if user is not None:
+        qs = qs.filter(user=user)
+    return qs.update(status=Status.FAILED, error=STALE_ERROR, finished_at=now, updated_at=now)
+
+
+def _is_stale(job, now):
+    return job.status == Status.RUNNING and job.updated_at < now - stale_after()
+
+
+def as_seen(job):
+    """화면/상태 API 용: 멈춘 RUNNING 작업을 저장하지 않고 실패로 표시해 반환 (None 은 그대로)."""
+    now = timezone.now()
+    if job is not None and _is_stale(job, now):
+        job.status, job.error, job.finished_at = Status.FAILED, STALE_ERROR, now
+    return job
+
+
+def enqueue_refresh(user):
+    """사용자의 새로고침 작업 등록. 이미 대기/진행 중인 작업이 있으면 그 작업을 반환 (멈춘 작업은 무시)."""
+    fail_stale_jobs(user)
+    active = PriceRefreshJob.objects.filter(user=user, status__in=[Status.PENDING, Status.RUNNING]).last()
+    return active or PriceRefreshJob.objects.create(user=user)
+
+
+def current_job(user):
+    """화면에 표시할 작업: 대기/진행 중인 작업, 없으면 최근 실패한 작업(오류 안내용). 없으면 None"""
+    job = as_seen(PriceRefreshJob.objects.filter(user=user).order_by("created_at", "id").last())
+    if job is None or job.is_active:
+        return job
+    if job.status == Status.FAILED and job.finished_at and job.finished_at >= timezone.now() - FAILED_NOTICE:
+        return job
+    return None
+
+
+def claim_next():
+    """가장 오래된 대기 작업을 RUNNING 으로 바꾸며 가져옴 (조건부 UPDATE 로 워커 간 중복 방지)."""
+    for job in PriceRefreshJob.objects.filter(status=Status.PENDING).order_by("created_at", "id")[:10]:
+        claimed = PriceRefreshJob.objects.filter(pk=job.pk, status=Status.PENDING).update(
+            status=Status.RUNNING, started_at=timezone.now(), updated_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job, workers=1):
+    """작업 1건 처리: 사용자 보유자산 일괄 갱신 후 결과 기록."""
+
+    def progress(pct):
+        PriceRefreshJob.objects.filter(pk=job.pk).update(progress=pct, updated_at=timezone.now())
+
+    try:
+        result = refresh_holdings(
+            stocks=StockHolding.objects.filter(user_id=job.user_id),
+            bonds=BondHolding.objects.filter(user_id=job.user_id),
+            deposits=DepositSaving.objects.filter(user_id=job.user_id),
+            workers=workers,
+            progress=progress,
+        )
+    except Exception as exc:
+        logger.exception("Price refresh job %s failed", job.pk)
+        job.status, job.error = Status.FAILED, str(exc)
+    else:
+        job.status, job.progress = Status.DONE, 100
+        job.stocks_updated, job.bonds_updated = result.stocks_updated, result.bonds_updated
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "progress", "stocks_updated", "bonds_updated", "error", "finished_at", "updated_at"])
+    return job
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.tm_assets.retention import BATCH_SIZE, apply_retention, intraday_days, retention_days
+
+
+class Command(BaseCommand):
+    help = "Roll old intraday price/value history up to daily rows and delete rows beyond the retention horizon"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days", type=int, default=None,
+            help="delete rows older than this (default: settings.PRICE_HISTORY_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--intraday-days", type=int, default=None,
+            help="keep one row per day for rows older than this (default: settings.PRICE_HISTORY_INTRADAY_DAYS)",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="only count rows that would be deleted")
+
+    def handle(self, *args, **options):
+        retention = options["retention_days"] if options["retention_days"] is not None else retention_days()
+        intraday = options["intraday_days"] if options["intraday_days"] is not None else intraday_days()
+        if intraday > retention:
+            self.stderr.write(self.style.ERROR("--intraday-days must not exceed --retention-days"))
+            return
+
+        report = apply_retention(retention, intraday, options["batch_size"], options["dry_run"])
+        verb = "would delete" if options["dry_run"] else "deleted"
+        for name, (compacted, purged) in report.items():
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: {verb} {compacted} intraday rows, {purged} expired rows")
+            )
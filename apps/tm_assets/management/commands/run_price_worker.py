@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.tm_assets.jobs import claim_next, fail_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued price refresh jobs (PriceRefreshJob)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="process pending jobs and exit")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between queue polls")
+        parser.add_argument("--workers", type=int, default=1, help="threads for quote fetching per job")
+
+    def handle(self, *args, **options):
+        while True:
+            # 장시간 실행되므로 끊기거나 CONN_MAX_AGE 가 지난 연결은 매 반복마다 정리
+            close_old_connections()
+            fail_stale_jobs()
+            job = claim_next()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+            job = run_job(job, workers=options["workers"])
+            self.stdout.write(
+                f"Job #{job.pk} ({job.user}): {job.status} - "
+                f"stocks {job.stocks_updated}, bonds {job.bonds_updated}"
+            )
@@ -2,15 +2,26 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 
 from apps.tm_assets.models import StockHolding, BondHolding
-from apps.tm_assets.models import DepositSaving, DepositValueHistory
+from apps.tm_assets.models import DepositSaving
+from apps.tm_assets.fx import refresh_fx_rates
+from apps.tm_assets.pricing import CHUNK_SIZE, refresh_holdings
 
 
 class Command(BaseCommand):
-    help = "Update stock and bond prices using FinanceDataReader and pykrx"
+    help = "Update stock and bond prices and FX rates using FinanceDataReader and pykrx"
 
     def add_arguments(self, parser):
         parser.add_argument("--user", type=str, default=None, help="username to limit update")
-        parser.add_argument("--only", type=str, choices=["stock", "bond"], default=None)
+        parser.add_argument("--only", type=str, choices=["stock", "bond", "fx"], default=None)
+        parser.add_argument(
+            "--chunk-size", type=int, default=CHUNK_SIZE, help="rows per bulk write transaction"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="threads for quote fetching (per-provider limits: settings.PRICE_PROVIDER_LIMITS)",
+        )
 
     def handle(self, *args, **options):
         username = options.get("user")
@@ -25,40 +36,38 @@ class Command(BaseCommand):
                 self.stderr.write(self.style.ERROR(f"User '{username}' not found"))
                 return
 
-        total_stock = total_bond = 0
-        ok_stock = ok_bond = 0
+        def scoped(model):
+            qs = model.objects.all()
+            return qs.filter(user=user) if user else qs
 
-        if only in (None, "stock"):
-            qs = StockHolding.objects.all()
-            if user:
-                qs = qs.filter(user=user)
-            total_stock = qs.count()
-            for s in qs.iterator():
-                if s.update_price_via_fdr():
-                    ok_stock += 1
-
-        if only in (None, "bond"):
-            qs = BondHolding.objects.all()
-            if user:
-                qs = qs.filter(user=user)
-            total_bond = qs.count()
-            for b in qs.iterator():
-                if b.update_price_via_pykrx():
-                    ok_bond += 1
+        # 환율은 사용자와 무관하게 통화별 1회 조회 후 bulk upsert
+        if only in (None, "fx"):
+            self.stdout.write(self.style.SUCCESS(f"FX: {refresh_fx_rates()} rates saved"))
+            if only == "fx":
+                return
 
-        # snapshot deposits
-        if only is None:
-            dqs = DepositSaving.objects.all()
-            if user:
-                dqs = dqs.filter(user=user)
-            for d in dqs.iterator():
-                try:
-                    DepositValueHistory.objects.create(deposit=d, value=d.estimated_value())
-                except Exception:
-                    pass
+        # 종목/채권코드는 중복 없이 한 번씩만 조회, 기록은 청크 단위 bulk 연산
+        result = refresh_holdings(
+            stocks=scoped(StockHolding) if only in (None, "stock") else None,
+            bonds=scoped(BondHolding) if only in (None, "bond") else None,
+            # snapshot deposits
+            deposits=scoped(DepositSaving) if only is None else None,
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Stocks: {ok_stock}/{total_stock} updated, Bonds: {ok_bond}/{total_bond} updated"
+                f"Stocks: {result.stocks_updated}/{result.stocks_total} updated "
+                f"({result.krx_days_fetched} KRX snapshots, {result.tickers_fetched} tickers fetched), "
+                f"Bonds: {result.bonds_updated}/{result.bonds_total} updated "
+                f"({result.codes_fetched} codes fetched), "
+                f"Deposits: {result.deposits_snapshotted} snapshots"
             )
         )
+        stats = result.fetch_stats
+        self.stdout.write(
+            f"Fetched {stats.count} quotes in {stats.elapsed:.2f}s "
+            f"({stats.throughput:.2f} quotes/sec), "
+            f"latency p50 {stats.percentile(50) * 1000:.0f}ms / p95 {stats.percentile(95) * 1000:.0f}ms"
+        )
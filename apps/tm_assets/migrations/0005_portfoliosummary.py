@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_account', '0002_user_profile_image'),
+        ('tm_assets', '0004_alter_bondholding_bond_code_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='portfolio_summary', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='사용자')),
+                ('class_totals', models.JSONField(default=dict, verbose_name='자산군별 합계')),
+                ('currency_totals', models.JSONField(default=dict, verbose_name='통화별 합계')),
+                ('change_sums', models.JSONField(default=dict, verbose_name='변동 합계')),
+                ('as_of', models.DateField(verbose_name='기준일')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
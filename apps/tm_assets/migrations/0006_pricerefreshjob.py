@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_assets', '0005_portfoliosummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRefreshJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('PENDING', '대기'), ('RUNNING', '진행중'), ('DONE', '완료'), ('FAILED', '실패')], default='PENDING', max_length=16, verbose_name='상태')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='진행률(%)')),
+                ('stocks_updated', models.PositiveIntegerField(default=0, verbose_name='주식 갱신')),
+                ('bonds_updated', models.PositiveIntegerField(default=0, verbose_name='채권 갱신')),
+                ('error', models.TextField(blank=True, verbose_name='오류')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_refresh_jobs', to=settings.AUTH_USER_MODEL, verbose_name='사용자')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='tm_assets_job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_assets', '0006_pricerefreshjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bondpricehistory',
+            index=models.Index(fields=['bond', '-recorded_at', '-id'], name='tm_assets_bondhist_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='depositvaluehistory',
+            index=models.Index(fields=['deposit', '-recorded_at', '-id'], name='tm_assets_deposithist_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='stockpricehistory',
+            index=models.Index(fields=['stock', '-recorded_at', '-id'], name='tm_assets_stockhist_recent'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:29
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, Subquery, Window
+from django.db.models.functions import RowNumber, TruncDate
+
+
+def backfill_recorded_on(apps, schema_editor):
+    """기존 스냅샷의 날짜를 한 번의 UPDATE 로 채우고, (예적금, 날짜)별로 가장 늦은 1행만 남김."""
+    DepositValueHistory = apps.get_model('tm_assets', 'DepositValueHistory')
+    DepositValueHistory.objects.update(recorded_on=TruncDate('recorded_at'))
+
+    duplicates = (
+        DepositValueHistory.objects.annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F('deposit_id'), F('recorded_on')],
+                order_by=[F('recorded_at').desc(), F('id').desc()],
+            )
+        )
+        .filter(rank__gt=1)
+        .values('pk')
+    )
+    # 이력 모델에는 시그널/역참조가 없어 DELETE ... WHERE id IN (윈도 서브쿼리) 한 번으로 끝남
+    DepositValueHistory.objects.filter(pk__in=Subquery(duplicates)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_assets', '0007_history_recent_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='depositvaluehistory',
+            name='recorded_on',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.RunPython(backfill_recorded_on, migrations.RunPython.noop),
+    ]
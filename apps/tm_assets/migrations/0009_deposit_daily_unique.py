@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_assets', '0008_deposit_daily_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='depositvaluehistory',
+            constraint=models.UniqueConstraint(fields=('deposit', 'recorded_on'), name='tm_assets_deposithist_daily'),
+        ),
+    ]
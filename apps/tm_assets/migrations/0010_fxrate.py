@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_assets', '0009_deposit_daily_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfoliosummary',
+            name='class_currency_totals',
+            field=models.JSONField(default=dict, verbose_name='자산군·통화별 합계'),
+        ),
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('KRW', '원화(KRW)'), ('USD', '달러(USD)'), ('JPY', '엔(JPY)'), ('EUR', '유로(EUR)')], max_length=3, verbose_name='통화')),
+                ('rate_date', models.DateField(verbose_name='기준일')),
+                ('rate', models.DecimalField(decimal_places=6, max_digits=18, verbose_name='환율(KRW)')),
+                ('source', models.CharField(blank=True, max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-rate_date', 'currency'],
+                'constraints': [models.UniqueConstraint(fields=('currency', 'rate_date'), name='tm_assets_fxrate_daily')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# (인덱스 이름, 테이블, 컬럼) — 검색의 icontains 는 PostgreSQL 에서 UPPER(col::text) LIKE 로 실행되므로 같은 식에 색인
+SEARCH_INDEXES = [
+    ('tm_assets_deposit_bank_trgm', 'tm_assets_depositsaving', 'bank_name'),
+    ('tm_assets_deposit_product_trgm', 'tm_assets_depositsaving', 'product_name'),
+    ('tm_assets_stock_ticker_trgm', 'tm_assets_stockholding', 'ticker'),
+    ('tm_assets_stock_name_trgm', 'tm_assets_stockholding', 'name'),
+    ('tm_assets_bond_name_trgm', 'tm_assets_bondholding', 'name'),
+    ('tm_assets_bond_issuer_trgm', 'tm_assets_bondholding', 'issuer'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """PostgreSQL 에서만 pg_trgm GIN 인덱스 생성 (SQLite 개발 DB 는 user_id 인덱스로 사용자 범위만 좁힘)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_assets', '0010_fxrate'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
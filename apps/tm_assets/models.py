@@ -11,6 +11,42 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
+class LastChangeQuerySet(models.QuerySet):
+    """보유자산 쿼리셋에 최근 2개 가격(최신/직전)을 상관 서브쿼리로 주석 처리.
+
+    목록 전체의 변동값을 쿼리 1회로 계산하기 위함. 하위 클래스는
+    history_model / history_fk / history_field 를 지정한다.
+    """
+
+    history_model: str = ""
+    history_fk: str = ""
+    history_field: str = ""
+
+    def with_last_change(self):
+        model = self.model._meta.apps.get_model("tm_assets", self.history_model)
+        recent = (
+            model.objects.filter(**{self.history_fk: models.OuterRef("pk")})
+            .order_by("-recorded_at", "-id")
+            .values(self.history_field)
+        )
+        return self.annotate(
+            last_price=models.Subquery(recent[:1]),
+            prev_price=models.Subquery(recent[1:2]),
+        )
+
+
+class DepositSavingQuerySet(LastChangeQuerySet):
+    history_model, history_fk, history_field = "DepositValueHistory", "deposit", "value"
+
+
+class StockHoldingQuerySet(LastChangeQuerySet):
+    history_model, history_fk, history_field = "StockPriceHistory", "stock", "price"
+
+
+class BondHoldingQuerySet(LastChangeQuerySet):
+    history_model, history_fk, history_field = "BondPriceHistory", "bond", "price_pct"
+
+
 class Currency(models.TextChoices):
     KRW = "KRW", "원화(KRW)"
     USD = "USD", "달러(USD)"
@@ -69,6 +105,8 @@ class DepositSaving(TimeStampedModel):
         max_digits=18, decimal_places=2, null=True, blank=True, verbose_name="평가액(직접입력)"
     )
 
+    objects = DepositSavingQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.bank_name} {self.product_name} ({self.product_type})"
 
@@ -90,7 +128,7 @@ class DepositSaving(TimeStampedModel):
         # 단리
         if self.compounding == Compounding.NONE:
             years = days / 365.0
-            return self.principal_amount * (1 + rate * years)
+            return round(float(self.principal_amount) * (1 + rate * years), 2)
 
         # 복리 근사
         if self.compounding == Compounding.MONTHLY:
@@ -107,9 +145,7 @@ class DepositSaving(TimeStampedModel):
         return round(value, 2)
 
     def get_last_change(self):
-        from .models import deposit_last_change  # local import to avoid cyc.
-        delta, pct = deposit_last_change(self)
-        return delta, pct
+        return deposit_last_change(self)
 
 
 class StockHolding(TimeStampedModel):
@@ -134,6 +170,8 @@ class StockHolding(TimeStampedModel):
     )
     last_price_updated_at = models.DateTimeField(null=True, blank=True)
 
+    objects = StockHoldingQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.ticker} ({self.market})"
 
@@ -144,40 +182,19 @@ class StockHolding(TimeStampedModel):
     def update_price_via_fdr(self):
         """FinanceDataReader로 최신 종가 조회 후 current_price 업데이트.
         시장 구분은 보조정보로 사용하며, FDR은 KR/US를 모두 지원.
+        일괄 갱신 파이프라인(pricing.refresh_holdings)을 이 종목 1건에 적용.
         반환: 성공 여부(bool)
         """
-        try:
-            import FinanceDataReader as fdr
-        except Exception:
+        from .pricing import refresh_holdings
+
+        result = refresh_holdings(stocks=StockHolding.objects.filter(pk=self.pk))
+        if not result.stocks_updated:
             return False
+        self.refresh_from_db(fields=["current_price", "last_price_updated_at", "updated_at"])
+        return True
 
     def get_last_change(self):
-        from .models import stock_last_change
-        delta, pct = stock_last_change(self)
-        return delta, pct
-
-        try:
-            df = fdr.DataReader(self.ticker)
-            if df is None or df.empty:
-                return False
-            # 종가 컬럼 우선
-            close = df["Close"].iloc[-1]
-            prev_price = self.current_price
-            self.current_price = close
-            self.last_price_updated_at = timezone.now()
-            self.save(update_fields=["current_price", "last_price_updated_at", "updated_at"])
-            try:
-                StockPriceHistory.objects.create(
-                    stock=self,
-                    price=self.current_price,
-                    recorded_at=self.last_price_updated_at,
-                    source="FDR",
-                )
-            except Exception:
-                pass
-            return True
-        except Exception:
-            return False
+        return stock_last_change(self)
 
 
 class BondHolding(TimeStampedModel):
@@ -208,6 +225,8 @@ class BondHolding(TimeStampedModel):
     bond_code = models.CharField(max_length=32, blank=True, help_text="KRX 채권 코드/ISIN (pykrx 조회용)", verbose_name="채권코드")
     last_price_updated_at = models.DateTimeField(null=True, blank=True)
 
+    objects = BondHoldingQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.currency})"
 
@@ -219,57 +238,19 @@ class BondHolding(TimeStampedModel):
 
     def update_price_via_pykrx(self):
         """pykrx로 채권 현재가(%)를 업데이트. KRX 코드가 필요할 수 있음.
-        구현은 가용 엔드포인트에 따라 단순화.
+        일괄 갱신 파이프라인(pricing.refresh_holdings)을 이 채권 1건에 적용.
         반환: 성공 여부(bool)
         """
-        try:
-            from pykrx import bond
-        except Exception:
-            return False
-
-    def get_last_change(self):
-        from .models import bond_last_change
-        delta_pct, pct = bond_last_change(self)
-        return delta_pct, pct
+        from .pricing import refresh_holdings
 
-        code = self.bond_code or None
-        if not code:
+        result = refresh_holdings(bonds=BondHolding.objects.filter(pk=self.pk))
+        if not result.bonds_updated:
             return False
+        self.refresh_from_db(fields=["current_price_pct", "last_price_updated_at", "updated_at"])
+        return True
 
-        try:
-            # 예시: 일별 시세 DataFrame을 받아 마지막 값 사용 (엔드포인트는 환경에 맞게 조정)
-            # 실제 사용 가능한 API는 pykrx 버전에 따라 다를 수 있습니다.
-            # 존재하지 않으면 False 반환
-            today = timezone.localdate().strftime("%Y%m%d")
-            try:
-                df = bond.get_bond_ohlcv_by_date(today, today, code)
-            except Exception:
-                df = None
-
-            if df is None or df.empty:
-                return False
-
-            # 종가 또는 평가가격에 해당하는 컬럼 추정
-            for col in ["종가", "Close", "close", "수익률", "Price"]:
-                if col in df.columns:
-                    val = float(df[col].iloc[-1])
-                    # % 기준 가격으로 가정
-                    self.current_price_pct = val
-                    self.last_price_updated_at = timezone.now()
-                    self.save(update_fields=["current_price_pct", "last_price_updated_at", "updated_at"])
-                    try:
-                        BondPriceHistory.objects.create(
-                            bond=self,
-                            price_pct=self.current_price_pct,
-                            recorded_at=self.last_price_updated_at,
-                            source="pykrx",
-                        )
-                    except Exception:
-                        pass
-                    return True
-            return False
-        except Exception:
-            return False
+    def get_last_change(self):
+        return bond_last_change(self)
 
 
 class StockPriceHistory(models.Model):
@@ -280,6 +261,10 @@ class StockPriceHistory(models.Model):
 
     class Meta:
         ordering = ["-recorded_at", "-id"]
+        indexes = [
+            # "보유자산 1건의 최근 N개" 조회용
+            models.Index(fields=["stock", "-recorded_at", "-id"], name="tm_assets_stockhist_recent"),
+        ]
 
 
 class BondPriceHistory(models.Model):
@@ -290,15 +275,116 @@ class BondPriceHistory(models.Model):
 
     class Meta:
         ordering = ["-recorded_at", "-id"]
+        indexes = [
+            # "보유자산 1건의 최근 N개" 조회용
+            models.Index(fields=["bond", "-recorded_at", "-id"], name="tm_assets_bondhist_recent"),
+        ]
 
 
 class DepositValueHistory(models.Model):
+    """예적금 평가액 스냅샷. 예적금 1건당 하루 1행 (같은 날 다시 저장하면 덮어씀)."""
+
     deposit = models.ForeignKey(DepositSaving, on_delete=models.CASCADE, related_name="value_history")
     recorded_at = models.DateTimeField(default=timezone.now)
+    recorded_on = models.DateField(default=timezone.localdate)
     value = models.DecimalField(max_digits=18, decimal_places=2)
 
     class Meta:
         ordering = ["-recorded_at", "-id"]
+        constraints = [
+            models.UniqueConstraint(fields=["deposit", "recorded_on"], name="tm_assets_deposithist_daily"),
+        ]
+        indexes = [
+            # "보유자산 1건의 최근 N개" 조회용
+            models.Index(fields=["deposit", "-recorded_at", "-id"], name="tm_assets_deposithist_recent"),
+        ]
+
+
+# 이력 모델 → 보유자산 FK 필드명 (시그널, 이력 정리에서 공용)
+HISTORY_MODELS = {StockPriceHistory: "stock", BondPriceHistory: "bond", DepositValueHistory: "deposit"}
+
+
+class PortfolioSummary(models.Model):
+    """사용자별 포트폴리오 합계(자산군/통화/변동). 보유내역·가격 변경 시 증분 갱신."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="portfolio_summary",
+        verbose_name="사용자",
+    )
+    class_totals = models.JSONField(default=dict, verbose_name="자산군별 합계")
+    currency_totals = models.JSONField(default=dict, verbose_name="통화별 합계")
+    change_sums = models.JSONField(default=dict, verbose_name="변동 합계")
+    # {자산군: {통화: 합계}} — 기준 통화 환산은 조회 시점 환율로 (fx.to_base)
+    class_currency_totals = models.JSONField(default=dict, verbose_name="자산군·통화별 합계")
+    # 예적금 평가액 계산 기준일 (날짜가 바뀌면 다시 계산)
+    as_of = models.DateField(verbose_name="기준일")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} 포트폴리오 요약 ({self.as_of})"
+
+    @property
+    def total(self):
+        return sum(self.class_totals.values())
+
+
+class FxRate(models.Model):
+    """일별 환율. rate = 해당 통화 1단위의 원화(KRW) 가격."""
+
+    currency = models.CharField(max_length=3, choices=Currency.choices, verbose_name="통화")
+    rate_date = models.DateField(verbose_name="기준일")
+    rate = models.DecimalField(max_digits=18, decimal_places=6, verbose_name="환율(KRW)")
+    source = models.CharField(max_length=20, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-rate_date", "currency"]
+        constraints = [
+            models.UniqueConstraint(fields=["currency", "rate_date"], name="tm_assets_fxrate_daily"),
+        ]
+
+    def __str__(self):
+        return f"{self.currency}/KRW {self.rate} ({self.rate_date})"
+
+
+class PriceRefreshJob(TimeStampedModel):
+    """가격 새로고침 작업 큐. 웹 요청은 작업만 등록하고 run_price_worker 가 처리."""
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "대기"
+        RUNNING = "RUNNING", "진행중"
+        DONE = "DONE", "완료"
+        FAILED = "FAILED", "실패"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="price_refresh_jobs",
+        verbose_name="사용자",
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING, verbose_name="상태"
+    )
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="진행률(%)")
+    stocks_updated = models.PositiveIntegerField(default=0, verbose_name="주식 갱신")
+    bonds_updated = models.PositiveIntegerField(default=0, verbose_name="채권 갱신")
+    error = models.TextField(blank=True, verbose_name="오류")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [models.Index(fields=["status", "created_at"], name="tm_assets_job_status_idx")]
+
+    def __str__(self):
+        return f"{self.user} 가격 새로고침 #{self.pk} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in (self.Status.PENDING, self.Status.RUNNING)
 
 
 # Convenience helpers to compute last change
@@ -312,21 +398,23 @@ def _last_change_from_history(values: list[float]):
     return delta, (round(pct, 2) if pct is not None else None)
 
 
-def _get_two_prices_qs(qs, field):
-    qs = qs.values_list(field, flat=True)[:2]
-    return list(qs)
+def _get_two_prices(obj, related, field):
+    """with_last_change() 주석이 있으면 재사용, 없으면 최근 2건 조회."""
+    if hasattr(obj, "last_price"):
+        return [v for v in (obj.last_price, obj.prev_price) if v is not None]
+    return list(getattr(obj, related).values_list(field, flat=True)[:2])
 
 
 def stock_last_change(stock: "StockHolding"):
-    prices = _get_two_prices_qs(stock.price_history, "price")
+    prices = _get_two_prices(stock, "price_history", "price")
     return _last_change_from_history(prices)
 
 
 def bond_last_change(bond: "BondHolding"):
-    prices = _get_two_prices_qs(bond.price_history, "price_pct")
+    prices = _get_two_prices(bond, "price_history", "price_pct")
     return _last_change_from_history(prices)
 
 
 def deposit_last_change(deposit: "DepositSaving"):
-    vals = _get_two_prices_qs(deposit.value_history, "value")
+    vals = _get_two_prices(deposit, "value_history", "value")
     return _last_change_from_history(vals)
@@ -0,0 +1,128 @@
+"""
+로컬 OHLCV 가격 저장소.
+
+종목마다 NumPy 구조화 배열 파일(.npy) 1개를 settings.PRICE_STORE_DIR 아래에 두고,
+읽을 때는 메모리 맵(mmap)으로 열어 파싱 비용 없이 사용한다. 마감된 거래일 봉은 변하지
+않으므로 공급자에게는 마지막 저장일 이후 구간만 요청하고, 새 봉만 덧붙인다.
+(마지막 저장일의 봉은 장중 값일 수 있어 다시 받은 값으로 덮어쓴다.)
+
+여러 워커/커맨드가 같은 디렉터리를 공유하므로 쓰기는 파일 잠금 + 임시 파일 교체로 원자적으로 한다.
+"""
+
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows 개발 환경
+    fcntl = None
+
+BAR_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def store_dir() -> Path:
+    path = Path(getattr(settings, "PRICE_STORE_DIR", Path(settings.BASE_DIR) / "var" / "price_store"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _path(provider: str, symbol: str) -> Path:
+    return store_dir() / f"{provider}_{_UNSAFE.sub('_', symbol)}.npy"
+
+
+@contextmanager
+def _locked(path: Path):
+    if fcntl is None:
+        yield
+        return
+    with open(path.with_suffix(".lock"), "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def read_bars(provider: str, symbol: str, start=None) -> np.ndarray:
+    """저장된 봉 배열(날짜 오름차순, mmap). start(date) 가 있으면 그 날짜 이후만."""
+    path = _path(provider, symbol)
+    if not path.exists():
+        return np.empty(0, dtype=BAR_DTYPE)
+    bars = np.load(path, mmap_mode="r")
+    if start is not None:
+        bars = bars[np.searchsorted(bars["date"], np.datetime64(start, "D")):]
+    return bars
+
+
+def last_date(provider: str, symbol: str):
+    bars = read_bars(provider, symbol)
+    return bars["date"][-1].astype(object) if bars.size else None
+
+
+def bars_from_frame(df) -> np.ndarray:
+    """공급자 DataFrame(Open/High/Low/Close/Volume, 날짜 인덱스) → 봉 배열."""
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars["date"] = np.array(df.index, dtype="datetime64[D]")
+    for col in ("open", "high", "low", "close", "volume"):
+        src = col.capitalize()
+        bars[col] = df[src].to_numpy(dtype="f8") if src in df.columns else np.nan
+    bars = bars[~np.isnan(bars["close"])]
+    return bars[np.argsort(bars["date"], kind="stable")]
+
+
+def append_bars(provider: str, symbol: str, new: np.ndarray) -> np.ndarray:
+    """새 봉을 저장소에 병합. 새 봉의 첫 날짜 이후 저장분은 새 값으로 교체."""
+    if not new.size:
+        return read_bars(provider, symbol)
+    path = _path(provider, symbol)
+    with _locked(path):
+        old = _load(path)
+        keep = old[old["date"] < new["date"][0]]
+        merged = np.concatenate([keep, new.astype(BAR_DTYPE)])
+        _save(path, merged)
+    return merged
+
+
+def merge_bars(provider: str, symbol: str, new: np.ndarray) -> np.ndarray:
+    """새 봉을 날짜별로 병합 (같은 날짜는 새 값, 나머지 저장분은 유지). 중간이 빈 봉 묶음용."""
+    if not new.size:
+        return read_bars(provider, symbol)
+    path = _path(provider, symbol)
+    with _locked(path):
+        old = _load(path)
+        keep = old[~np.isin(old["date"], new["date"])]
+        merged = np.concatenate([keep, new.astype(BAR_DTYPE)])
+        merged = merged[np.argsort(merged["date"], kind="stable")]
+        _save(path, merged)
+    return merged
+
+
+def _load(path: Path) -> np.ndarray:
+    return np.load(path) if path.exists() else np.empty(0, dtype=BAR_DTYPE)
+
+
+def _save(path: Path, bars: np.ndarray):
+    """임시 파일에 쓴 뒤 교체 (읽는 쪽은 항상 완전한 파일을 본다)."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.save(fh, bars)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,589 @@
+"""
+보유자산 가격 일괄 갱신 파이프라인.
+
+1) 대상 보유내역에서 중복 없는 티커/채권코드를 모은다
+2) 종목(코드)마다 시세를 한 번만 조회한다 (FinanceDataReader / pykrx)
+   주식은 마지막으로 저장된 가격 이후 구간만 요청하고, 그 사이 빠진 거래일은 이력에 채운다
+   (공급자 응답은 로컬 OHLCV 저장소에 쌓여 이미 받은 거래일은 다시 요청하지 않는다)
+   국내 주식은 거래일마다 KRX 전 종목 시세표를 1번만 받아 보유 티커에 한꺼번에 매칭한다
+   (매칭된 종목의 일별 봉은 가격 저장소에도 남긴다)
+   채권은 당일 시세 스냅샷(채권코드 → 가격)을 프로세스 안에서 공유해 코드당 하루 1회만 요청한다
+3) 조회 결과를 청크 단위 트랜잭션 안에서 bulk_update / bulk_create 로 기록한다
+   예적금 평가액 스냅샷은 (예적금, 날짜)당 1행으로 upsert 한다
+
+workers > 1 이면 시세 조회만 스레드 풀에서 병렬로 수행하고(공급자별 동시 요청 수 ·
+초당 요청 수 제한 적용), DB 기록은 항상 호출한 스레드에서 한다.
+
+bulk 연산은 시그널을 발생시키지 않으므로 마지막에 영향을 받은 사용자의
+PortfolioSummary 를 다시 계산하고 화면 캐시를 무효화한다.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import price_store
+from .models import BondPriceHistory, DepositValueHistory, Market, StockPriceHistory
+from .summary import rebuild_summaries
+from .valuation import value_holdings
+from .view_cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+STOCK_PRICE_Q = Decimal("0.0001")
+BOND_PRICE_Q = Decimal("0.001")
+
+# 저장된 가격이 없는 종목은 최근 N일만 조회 (휴장일을 넘겨 최소 1개 종가 확보)
+INITIAL_LOOKBACK_DAYS = 10
+# 빠진 거래일을 채울 때 쓰는 기록 시각 (장 마감 근사)
+BACKFILL_TIME = dt_time(15, 30)
+
+# 국내 종목은 최근 N일 안쪽 구간이면 거래일별 KRX 전 종목 시세표로 가격을 매김
+# (그보다 오래된 구간이 필요한 종목과 시세표에 없는 종목은 종목별 조회)
+KRX_SNAPSHOT_DAYS = 10
+
+# 당일 KRX 시세표(장중 값)를 다시 받기까지의 시간(초)
+KRX_TODAY_TTL = 300
+# KRX 시세표 열 → 가격 저장소 봉 필드
+KRX_BAR_COLUMNS = {"시가": "Open", "고가": "High", "저가": "Low", "종가": "Close", "거래량": "Volume"}
+
+# 채권 시세 조회 실패 코드를 다시 묻기까지의 시간(초)
+BOND_MISS_TTL = 600
+
+# 공급자별 기본 제한 (settings.PRICE_PROVIDER_LIMITS 로 덮어씀)
+DEFAULT_PROVIDER_LIMITS = {
+    "FDR": {"concurrency": 4, "rps": 5.0},
+    "pykrx": {"concurrency": 2, "rps": 2.0},
+}
+
+
+class ProviderLimiter:
+    """공급자 1개에 대한 동시 요청 수(세마포어) + 초당 요청 수(최소 간격) 제한."""
+
+    def __init__(self, concurrency=1, rps=None):
+        self._slots = threading.BoundedSemaphore(max(1, int(concurrency)))
+        self._interval = 1.0 / rps if rps else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def __enter__(self):
+        self._slots.acquire()
+        if self._interval:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._next_at - now
+                self._next_at = max(now, self._next_at) + self._interval
+            if wait > 0:
+                time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+        return False
+
+
+def get_limiter(provider):
+    limits = {**DEFAULT_PROVIDER_LIMITS, **getattr(settings, "PRICE_PROVIDER_LIMITS", {})}
+    return ProviderLimiter(**limits.get(provider, {}))
+
+
+@dataclass
+class FetchStats:
+    """시세 조회 처리량/지연 통계."""
+
+    latencies: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.elapsed += other.elapsed
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.count / self.elapsed if self.elapsed > 0 else 0.0
+
+    def percentile(self, q):
+        return float(np.percentile(self.latencies, q)) if self.latencies else 0.0
+
+
+@dataclass
+class RefreshResult:
+    stocks_total: int = 0
+    stocks_updated: int = 0
+    bonds_total: int = 0
+    bonds_updated: int = 0
+    deposits_snapshotted: int = 0
+    tickers_fetched: int = 0
+    krx_days_fetched: int = 0
+    codes_fetched: int = 0
+    fetch_stats: FetchStats = field(default_factory=FetchStats)
+
+
+def fetch_stock_bars(ticker, start=None):
+    """start(date) 이후 일별 종가 조회.
+    로컬 가격 저장소(price_store)에 이미 있는 구간은 다시 받지 않고, 마지막 저장일부터만
+    FinanceDataReader 로 요청해 저장소에 덧붙인 뒤 저장소에서 읽어 반환한다.
+    반환: 날짜(date) 인덱스의 종가 Series (오래된 순), 실패 시 None.
+    """
+    try:
+        import FinanceDataReader as fdr
+    except Exception:
+        return None
+    start = start or timezone.localdate() - timedelta(days=INITIAL_LOOKBACK_DAYS)
+    stored = price_store.read_bars("FDR", ticker)
+    fetch_from = start
+    if stored.size and stored["date"][0] <= np.datetime64(start, "D"):
+        fetch_from = max(start, stored["date"][-1].astype(object))
+    try:
+        df = fdr.DataReader(ticker, fetch_from.isoformat())
+        if df is None or df.empty:
+            return None
+        price_store.append_bars("FDR", ticker, price_store.bars_from_frame(df))
+    except Exception:
+        logger.warning("FDR fetch failed: %s", ticker, exc_info=True)
+        return None
+    bars = price_store.read_bars("FDR", ticker, start)
+    if not bars.size:
+        return None
+    return pd.Series(bars["close"], index=bars["date"].astype(object).tolist())
+
+
+def fetch_bond_price(code, day=None):
+    """pykrx로 채권 현재가(%) 조회. 실패 시 None.
+    실제 사용 가능한 API는 pykrx 버전에 따라 다를 수 있어 존재하지 않으면 None.
+    """
+    try:
+        from pykrx import bond
+    except Exception:
+        return None
+    day = (day or timezone.localdate()).strftime("%Y%m%d")
+    try:
+        df = bond.get_bond_ohlcv_by_date(day, day, code)
+    except Exception:
+        return None
+    if df is None or df.empty:
+        return None
+    # 종가 또는 평가가격에 해당하는 컬럼 추정 (% 기준 가격으로 가정)
+    for col in ["종가", "Close", "close", "수익률", "Price"]:
+        if col in df.columns:
+            return float(df[col].iloc[-1])
+    return None
+
+
+def _chunks(qs, size):
+    chunk = []
+    for obj in qs.iterator(chunk_size=size):
+        chunk.append(obj)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _quantize(value, q):
+    return Decimal(str(value)).quantize(q)
+
+
+def fetch_quotes(keys, fetch, provider, workers=1):
+    """
+    keys 마다 fetch(key) 를 한 번씩 호출해 {key: 값} dict 와 FetchStats 를 반환.
+    workers > 1 이면 스레드 풀에서 병렬 조회 (공급자 제한은 항상 적용).
+    """
+    limiter = get_limiter(provider)
+    stats = FetchStats()
+
+    def timed(key):
+        with limiter:
+            started = time.perf_counter()
+            value = fetch(key)
+            return key, value, time.perf_counter() - started
+
+    started = time.perf_counter()
+    if workers > 1 and len(keys) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"quotes-{provider}") as pool:
+            results = list(pool.map(timed, keys))
+    else:
+        results = [timed(key) for key in keys]
+    stats.elapsed = time.perf_counter() - started
+
+    quotes = {}
+    for key, value, latency in results:
+        stats.latencies.append(latency)
+        if value is not None:
+            quotes[key] = value
+    return quotes, stats
+
+
+def fetch_stock_quotes(starts, workers=1):
+    """{티커: 조회 시작일} → 티커별 종가 Series dict (조회 실패 티커는 제외)와 조회 통계."""
+    return fetch_quotes(list(starts), lambda ticker: fetch_stock_bars(ticker, starts[ticker]), "FDR", workers)
+
+
+def fetch_krx_snapshot(day):
+    """pykrx 전 종목(KOSPI/KOSDAQ/KONEX) 일별 OHLCV 표 (티커 인덱스). 휴장일/실패 시 None."""
+    try:
+        from pykrx import stock
+    except Exception:
+        return None
+    try:
+        df = stock.get_market_ohlcv(day.strftime("%Y%m%d"), market="ALL")
+    except Exception:
+        logger.warning("KRX snapshot fetch failed: %s", day, exc_info=True)
+        return None
+    if df is None or df.empty or "종가" not in df.columns:
+        return None
+    df = df[df["종가"] > 0]
+    return None if df.empty else df
+
+
+# {일자: (시세표, 마감 후 조회 여부, 조회 시각(monotonic))}
+_krx_snapshots = {}
+_krx_snapshots_lock = threading.Lock()
+
+
+def _krx_snapshot_fresh(day, entry, today, now):
+    """마감된 날짜의 표는 계속 유효, 당일(장중) 표는 KRX_TODAY_TTL 초 동안만."""
+    _, final, fetched_at = entry
+    return final or (day == today and now - fetched_at < KRX_TODAY_TTL)
+
+
+def krx_snapshots(days, workers=1):
+    """
+    거래일별 전 종목 시세표 {일자: DataFrame} 와 조회 통계.
+    지난 날짜의 표는 바뀌지 않으므로 프로세스 안에 보관해 다시 요청하지 않고,
+    당일 표는 KRX_TODAY_TTL 초 동안만 재사용한다.
+    """
+    today = timezone.localdate()
+    now = time.monotonic()
+    with _krx_snapshots_lock:
+        todo = [
+            d for d in days
+            if d not in _krx_snapshots or not _krx_snapshot_fresh(d, _krx_snapshots[d], today, now)
+        ]
+    fetched, stats = fetch_quotes(todo, fetch_krx_snapshot, "pykrx", workers)
+    oldest = today - timedelta(days=2 * KRX_SNAPSHOT_DAYS)
+    now = time.monotonic()
+    with _krx_snapshots_lock:
+        for day in list(_krx_snapshots):
+            if day < oldest:
+                del _krx_snapshots[day]
+        _krx_snapshots.update((d, (df, d < today, now)) for d, df in fetched.items())
+        snapshots = {d: _krx_snapshots[d][0] for d in days if d in _krx_snapshots}
+    return snapshots, stats
+
+
+def store_krx_bars(snapshots, tickers):
+    """시세표에서 매칭된 티커의 일별 봉을 가격 저장소(KRX)에 날짜별로 병합."""
+    frames = {
+        day: df.reindex(columns=list(KRX_BAR_COLUMNS)).rename(columns=KRX_BAR_COLUMNS)
+        for day, df in snapshots.items()
+    }
+    for ticker in tickers:
+        rows = {day: df.loc[ticker] for day, df in frames.items() if ticker in df.index}
+        if rows:
+            price_store.merge_bars("KRX", ticker, price_store.bars_from_frame(pd.DataFrame(rows).T))
+
+
+def _latest_krx_snapshot(before, workers=1):
+    """before 이전(미포함) 가장 최근 거래일 시세표 {일자: DataFrame} (최대 KRX_SNAPSHOT_DAYS 일 전까지)와 조회 통계."""
+    stats = FetchStats()
+    for n in range(1, KRX_SNAPSHOT_DAYS + 1):
+        day = before - timedelta(days=n)
+        if day.weekday() >= 5:
+            continue
+        snapshots, day_stats = krx_snapshots([day], workers)
+        stats.merge(day_stats)
+        if snapshots:
+            return snapshots, stats
+    return {}, stats
+
+
+def fetch_kr_stock_quotes(starts, workers=1):
+    """
+    국내 티커 {티커: 조회 시작일} → (티커별 종가 Series dict, 시세표로 못 구한 {티커: 시작일}, 조회 통계).
+    필요한 거래일마다 시세표를 1번씩 받아 (일자 × 티커) 종가 표로 펼친 뒤 보유 티커 열만 골라낸다.
+    시작일 이후 거래일이 없으면(주말/휴장일/장 시작 전) 직전 거래일 표로 상장 여부만 확인한다 —
+    가장 최근 표에 있는 티커는 새 가격이 없을 뿐이므로 건너뛰고, 없는 티커만 종목별 조회로 넘긴다.
+    """
+    today = timezone.localdate()
+    window_start = today - timedelta(days=KRX_SNAPSHOT_DAYS)
+    eligible = {t: start for t, start in starts.items() if start >= window_start}
+    misses = {t: start for t, start in starts.items() if start < window_start}
+    if not eligible:
+        return {}, misses, FetchStats()
+
+    first = min(eligible.values())
+    days = [first + timedelta(days=n) for n in range((today - first).days + 1)]
+    snapshots, stats = krx_snapshots([d for d in days if d.weekday() < 5], workers)
+    if not snapshots:
+        snapshots, more = _latest_krx_snapshot(first, workers)
+        stats.merge(more)
+    if not snapshots:
+        return {}, {**misses, **eligible}, stats
+
+    closes = (
+        pd.concat({day: df["종가"] for day, df in snapshots.items()}, names=["day", "ticker"])
+        .unstack("ticker")
+        .reindex(columns=list(eligible))
+        .sort_index()
+        .astype(float)
+    )
+    listed = snapshots[max(snapshots)].index
+    quotes = {}
+    for ticker, start in eligible.items():
+        series = closes[ticker]
+        series = series[series.index >= start].dropna()
+        if not series.empty:
+            quotes[ticker] = series
+        elif ticker not in listed:
+            misses[ticker] = start
+    store_krx_bars(snapshots, quotes)
+    return quotes, misses, stats
+
+
+def _with_last_recorded(stocks):
+    """보유내역별 마지막 저장 가격 시각(최신 이력, 없으면 last_price_updated_at)."""
+    return stocks.annotate(
+        last_recorded=Coalesce(Max("price_history__recorded_at"), "last_price_updated_at")
+    )
+
+
+def stock_fetch_starts(stocks):
+    """
+    티커별 조회 시작일. 같은 티커를 가진 보유내역 중 가장 오래 갱신되지 않은 날짜부터
+    요청해 모든 보유내역의 빠진 거래일을 한 번에 채울 수 있게 한다.
+    저장된 가격이 없는 보유내역이 있으면 최소 INITIAL_LOOKBACK_DAYS 는 조회.
+    """
+    lookback = timezone.localdate() - timedelta(days=INITIAL_LOOKBACK_DAYS)
+    starts = {}
+    for ticker, last in _with_last_recorded(stocks).values_list("ticker", "last_recorded").order_by():
+        day = timezone.localdate(last) if last else lookback
+        starts[ticker] = min(day, starts.get(ticker, day))
+    return starts
+
+
+class BondQuoteSnapshot:
+    """
+    하루치 채권 시세 스냅샷 {채권코드: 현재가(%)}.
+    같은 프로세스의 여러 갱신 실행(워커의 사용자별 작업, 단건 갱신 등)이 공유해
+    채권코드마다 하루 한 번만 조회한다. 조회 실패 코드는 BOND_MISS_TTL 초 동안 다시 묻지 않는다.
+    """
+
+    def __init__(self, day):
+        self.day = day
+        self.quotes = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+
+    def pending(self, codes):
+        """아직 조회하지 않은(또는 실패 후 TTL 이 지난) 코드 목록."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                code for code in codes
+                if code not in self.quotes and now - self._misses.get(code, -BOND_MISS_TTL) >= BOND_MISS_TTL
+            ]
+
+    def update(self, requested, fetched):
+        now = time.monotonic()
+        with self._lock:
+            self.quotes.update(fetched)
+            for code in requested:
+                if code not in fetched:
+                    self._misses[code] = now
+
+    def lookup(self, codes):
+        with self._lock:
+            return {code: self.quotes[code] for code in codes if code in self.quotes}
+
+
+_bond_snapshots = {}
+_bond_snapshots_lock = threading.Lock()
+
+
+def bond_snapshot(day=None):
+    """기준일의 채권 시세 스냅샷 (지난 날짜 스냅샷은 버림)."""
+    day = day or timezone.localdate()
+    with _bond_snapshots_lock:
+        snapshot = _bond_snapshots.get(day)
+        if snapshot is None:
+            _bond_snapshots.clear()
+            snapshot = _bond_snapshots[day] = BondQuoteSnapshot(day)
+        return snapshot
+
+
+def fetch_bond_quotes(codes, day=None, workers=1):
+    """채권코드별 현재가(%) dict (조회 실패 코드는 제외)와 조회 통계.
+    당일 스냅샷에 없는 코드만 pykrx 로 조회한다."""
+    snapshot = bond_snapshot(day)
+    todo = snapshot.pending(list(codes))
+    fetched, stats = fetch_quotes(todo, lambda code: fetch_bond_price(code, snapshot.day), "pykrx", workers)
+    snapshot.update(todo, fetched)
+    return snapshot.lookup(codes), stats
+
+
+def write_stock_quotes(stocks, quotes, chunk_size=CHUNK_SIZE, source="FDR"):
+    """
+    조회된 종가 Series 를 보유내역/이력에 일괄 기록.
+    마지막 종가는 현재가로, 마지막 저장일 이후 빠진 거래일 종가는 이력으로 채운다.
+    반환: (갱신 건수, 사용자 id 집합)
+    """
+    now = timezone.now()
+    tz = timezone.get_current_timezone()
+    updated, user_ids = 0, set()
+    for chunk in _chunks(_with_last_recorded(stocks.filter(ticker__in=list(quotes))), chunk_size):
+        history = []
+        for s in chunk:
+            closes = quotes[s.ticker]
+            latest_day = closes.index[-1]
+            last_day = timezone.localdate(s.last_recorded) if s.last_recorded else None
+            if last_day is not None:
+                for day, close in closes.items():
+                    if last_day < day < latest_day:
+                        history.append(StockPriceHistory(
+                            stock=s,
+                            price=_quantize(close, STOCK_PRICE_Q),
+                            recorded_at=datetime.combine(day, BACKFILL_TIME, tzinfo=tz),
+                            source=source,
+                        ))
+            s.current_price = _quantize(closes.iloc[-1], STOCK_PRICE_Q)
+            s.last_price_updated_at = s.updated_at = now
+            history.append(StockPriceHistory(stock=s, price=s.current_price, recorded_at=now, source=source))
+            user_ids.add(s.user_id)
+        with transaction.atomic():
+            type(chunk[0]).objects.bulk_update(
+                chunk, ["current_price", "last_price_updated_at", "updated_at"], batch_size=chunk_size
+            )
+            StockPriceHistory.objects.bulk_create(history, batch_size=chunk_size)
+        updated += len(chunk)
+    return updated, user_ids
+
+
+def write_bond_quotes(bonds, quotes, chunk_size=CHUNK_SIZE, source="pykrx"):
+    """조회된 채권 현재가(%)를 보유내역/이력에 일괄 기록. 반환: (갱신 건수, 사용자 id 집합)"""
+    now = timezone.now()
+    updated, user_ids = 0, set()
+    for chunk in _chunks(bonds.filter(bond_code__in=list(quotes)), chunk_size):
+        history = []
+        for b in chunk:
+            b.current_price_pct = _quantize(quotes[b.bond_code], BOND_PRICE_Q)
+            b.last_price_updated_at = b.updated_at = now
+            history.append(BondPriceHistory(bond=b, price_pct=b.current_price_pct, recorded_at=now, source=source))
+            user_ids.add(b.user_id)
+        with transaction.atomic():
+            type(chunk[0]).objects.bulk_update(
+                chunk, ["current_price_pct", "last_price_updated_at", "updated_at"], batch_size=chunk_size
+            )
+            BondPriceHistory.objects.bulk_create(history, batch_size=chunk_size)
+        updated += len(chunk)
+    return updated, user_ids
+
+
+def snapshot_deposits(deposits, chunk_size=CHUNK_SIZE):
+    """
+    예적금 평가액 스냅샷 일괄 저장 (예적금당 하루 1행).
+    같은 날 다시 실행하면 (deposit, recorded_on) 충돌 행의 값/시각만 갱신한다.
+    반환: (저장 건수, 사용자 id 집합)
+    """
+    now = timezone.now()
+    today = timezone.localdate(now)
+    saved, user_ids = 0, set()
+    for chunk in _chunks(deposits, chunk_size):
+        value_holdings(chunk, [], [])
+        history = [
+            DepositValueHistory(
+                deposit=d, value=_quantize(d.est_value, Decimal("0.01")), recorded_at=now, recorded_on=today
+            )
+            for d in chunk
+        ]
+        with transaction.atomic():
+            DepositValueHistory.objects.bulk_create(
+                history,
+                batch_size=chunk_size,
+                update_conflicts=True,
+                unique_fields=["deposit", "recorded_on"],
+                update_fields=["value", "recorded_at"],
+            )
+        saved += len(history)
+        user_ids.update(d.user_id for d in chunk)
+    return saved, user_ids
+
+
+def refresh_holdings(stocks=None, bonds=None, deposits=None, chunk_size=CHUNK_SIZE, workers=1, progress=None):
+    """
+    주어진 쿼리셋의 가격을 일괄 갱신. None 인 자산군은 건너뜀.
+    티커/채권코드는 중복 없이 한 번씩만 조회한다.
+    progress: 자산군 단계가 끝날 때마다 진행률(0~100)을 받는 콜백 (선택)
+    """
+    result = RefreshResult()
+    user_ids = set()
+    stages = sum(qs is not None for qs in (stocks, bonds, deposits)) or 1
+    done = [0]
+
+    def step():
+        done[0] += 1
+        if progress:
+            progress(int(100 * done[0] / stages))
+
+    if stocks is not None:
+        result.stocks_total = stocks.count()
+        starts = stock_fetch_starts(stocks)
+        # 국내 종목: 거래일별 전 종목 시세표 → 나머지(해외/표에 없는 종목)만 종목별 조회
+        kr_quotes = {}
+        if getattr(settings, "PRICE_KRX_SNAPSHOT", True):
+            kr_tickers = set(stocks.filter(market=Market.KR).values_list("ticker", flat=True))
+            kr_quotes, misses, stats = fetch_kr_stock_quotes(
+                {t: start for t, start in starts.items() if t in kr_tickers}, workers=workers
+            )
+            result.fetch_stats.merge(stats)
+            result.krx_days_fetched = stats.count
+            # 시세표로 못 구한 티커만 종목별 조회 (새 거래일이 없는 티커는 건너뜀)
+            starts = {t: start for t, start in starts.items() if t not in kr_tickers or t in misses}
+        quotes, stats = fetch_stock_quotes(starts, workers=workers)
+        result.fetch_stats.merge(stats)
+        result.tickers_fetched = len(starts)
+        for source, found in (("KRX", kr_quotes), ("FDR", quotes)):
+            if not found:
+                continue
+            updated, touched = write_stock_quotes(stocks, found, chunk_size, source=source)
+            result.stocks_updated += updated
+            user_ids |= touched
+        step()
+
+    if bonds is not None:
+        result.bonds_total = bonds.count()
+        codes = sorted(set(bonds.exclude(bond_code="").values_list("bond_code", flat=True)))
+        quotes, stats = fetch_bond_quotes(codes, workers=workers)
+        result.fetch_stats.merge(stats)
+        result.codes_fetched = stats.count
+        result.bonds_updated, touched = write_bond_quotes(bonds, quotes, chunk_size)
+        user_ids |= touched
+        step()
+
+    if deposits is not None:
+        result.deposits_snapshotted, touched = snapshot_deposits(deposits, chunk_size)
+        user_ids |= touched
+        step()
+
+    rebuild_summaries(user_ids)
+    invalidate_user(*user_ids)
+    return result
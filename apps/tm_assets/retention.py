@@ -0,0 +1,105 @@
+"""
+가격/평가액 이력 보존 정책.
+
+- 압축: intraday 보존 기간이 지난 행은 (보유자산, 날짜)마다 그날 마지막 행 1개만 남김 (일별 종가)
+- 삭제: 전체 보존 기간이 지난 행은 삭제
+
+이력 모델에는 삭제 시그널이 없으므로 pk 배치 단위의 빠른 DELETE 로 처리된다.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import F, Min, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import HISTORY_MODELS
+from .view_cache import invalidate_all
+
+DEFAULT_RETENTION_DAYS = 365 * 5
+DEFAULT_INTRADAY_DAYS = 30
+BATCH_SIZE = 1000
+
+
+def retention_days():
+    return getattr(settings, "PRICE_HISTORY_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+
+
+def intraday_days():
+    return getattr(settings, "PRICE_HISTORY_INTRADAY_DAYS", DEFAULT_INTRADAY_DAYS)
+
+
+def _delete_in_batches(model, ids, batch_size):
+    """확정된 pk 목록을 batch_size 씩 삭제."""
+    deleted = 0
+    for i in range(0, len(ids), batch_size):
+        deleted += model.objects.filter(pk__in=ids[i:i + batch_size]).delete()[0]
+    return deleted
+
+
+def _local_days(model, before):
+    """before 이전 이력이 있는 날마다 (하루 시작, 다음날 시작) 구간 (현지 자정 기준, 이력 없는 날은 건너뜀)."""
+    tz = timezone.get_current_timezone()
+    rows = model.objects.filter(recorded_at__lt=before)
+    first = rows.aggregate(first=Min("recorded_at"))["first"]
+    while first is not None:
+        day = timezone.localdate(first)
+        start = timezone.make_aware(datetime.combine(day, time.min), tz)
+        end = min(timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz), before)
+        yield start, end
+        first = rows.filter(recorded_at__gte=end).aggregate(first=Min("recorded_at"))["first"]
+
+
+def compact_history(model, before, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    before 이전 행을 (보유자산, 날짜)별 마지막 1행으로 압축. 반환: 삭제(대상) 행 수
+    날짜 파티션은 하루를 넘지 않으므로 하루 구간씩 윈도 쿼리를 돌려 메모리와 쿼리 비용을 하루치로 제한한다.
+    """
+    fk = HISTORY_MODELS[model]
+    deleted = 0
+    for start, end in _local_days(model, before):
+        extra = (
+            model.objects.filter(recorded_at__gte=start, recorded_at__lt=end)
+            .annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=[F(f"{fk}_id")],
+                    order_by=[F("recorded_at").desc(), F("id").desc()],
+                )
+            )
+            .filter(rank__gt=1)
+            .values_list("pk", flat=True)
+        )
+        # 삭제 중에 윈도 결과가 바뀌지 않도록 그날 대상 pk 를 먼저 확정
+        ids = list(extra)
+        deleted += len(ids) if dry_run else _delete_in_batches(model, ids, batch_size)
+    return deleted
+
+
+def purge_history(model, before, batch_size=BATCH_SIZE, dry_run=False):
+    """before 이전 행 삭제. 반환: 삭제(대상) 행 수 (한 번에 batch_size 개 pk 만 읽음)"""
+    qs = model.objects.filter(recorded_at__lt=before)
+    if dry_run:
+        return qs.count()
+    deleted = 0
+    while True:
+        ids = list(qs.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += model.objects.filter(pk__in=ids).delete()[0]
+
+
+def apply_retention(retention=None, intraday=None, batch_size=BATCH_SIZE, dry_run=False):
+    """모든 이력 모델에 보존 정책 적용. 반환: {모델명: (압축 삭제 수, 기간 만료 삭제 수)}"""
+    now = timezone.now()
+    retention = retention_days() if retention is None else retention
+    intraday = intraday_days() if intraday is None else intraday
+    report = {}
+    for model in HISTORY_MODELS:
+        purged = purge_history(model, now - timedelta(days=retention), batch_size, dry_run)
+        compacted = compact_history(model, now - timedelta(days=intraday), batch_size, dry_run)
+        report[model.__name__] = (compacted, purged)
+    if not dry_run:
+        invalidate_all()
+    return report
@@ -0,0 +1,100 @@
+"""
+보유자산/가격 이력 변경 시 PortfolioSummary 증분 갱신 + 화면 캐시 무효화.
+
+- 보유자산 생성·수정·삭제: 변경 전/후 기여분 차이 반영
+- 가격/평가액 이력 추가: 해당 보유자산의 변동 기여분 차이 반영
+bulk_create/bulk_update 는 시그널이 발생하지 않으므로 호출한 쪽에서
+summary.rebuild_summaries() / view_cache.invalidate_user() 로 갱신한다.
+
+이력 모델에는 삭제 시그널을 달지 않는다 (Django 의 빠른 일괄 삭제 유지).
+이력 삭제는 보유자산 삭제의 연쇄 삭제이거나 이력 정리 커맨드이며, 둘 다 따로 무효화한다.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import HISTORY_MODELS, BondHolding, DepositSaving, PortfolioSummary, StockHolding
+from .summary import apply_contribution, holding_contribution
+from .view_cache import invalidate_user
+
+HOLDING_MODELS = (DepositSaving, StockHolding, BondHolding)
+
+
+def _tracked(user_id):
+    return PortfolioSummary.objects.filter(pk=user_id).exists()
+
+
+def _holding_before_save(sender, instance, raw=False, **kwargs):
+    instance._summary_before = None
+    if raw or instance.pk is None or not _tracked(instance.user_id):
+        return
+    old = sender.objects.filter(pk=instance.pk).first()
+    if old is not None:
+        instance._summary_before = holding_contribution(old)
+
+
+def _holding_after_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_user(instance.user_id)
+    if not _tracked(instance.user_id):
+        return
+    # 조회 시점의 주석(last_price 등)이 아닌 현재 이력 기준으로 계산
+    fresh = sender.objects.get(pk=instance.pk)
+    apply_contribution(instance.user_id, old=getattr(instance, "_summary_before", None), new=holding_contribution(fresh))
+
+
+def _holding_before_delete(sender, instance, **kwargs):
+    # 삭제 후에는 이력이 함께 지워지므로 변동 기여분을 미리 계산.
+    # 메모리의 인스턴스는 오래됐거나 주석이 붙어 있을 수 있어 저장된 행 기준 (이미 없으면 건너뜀)
+    instance._summary_before = None
+    if not _tracked(instance.user_id):
+        return
+    stored = sender.objects.filter(pk=instance.pk).first()
+    if stored is not None:
+        instance._summary_before = holding_contribution(stored)
+
+
+def _holding_after_delete(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+    before = getattr(instance, "_summary_before", None)
+    if before is not None:
+        apply_contribution(instance.user_id, old=before)
+
+
+def _history_holding(sender, instance):
+    fk = HISTORY_MODELS[sender]
+    model = sender._meta.get_field(fk).related_model
+    return model.objects.filter(pk=getattr(instance, f"{fk}_id")).first()
+
+
+def _history_before_save(sender, instance, raw=False, **kwargs):
+    instance._summary_before = None
+    if raw or not instance._state.adding:
+        return
+    holding = _history_holding(sender, instance)
+    if holding is not None and _tracked(holding.user_id):
+        instance._summary_before = holding_contribution(holding)
+
+
+def _history_after_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_summary_before", None)
+    holding = _history_holding(sender, instance)
+    if holding is None:
+        return
+    invalidate_user(holding.user_id)
+    if created and before is not None:
+        apply_contribution(holding.user_id, old=before, new=holding_contribution(holding))
+
+
+for _model in HOLDING_MODELS:
+    receiver(pre_save, sender=_model)(_holding_before_save)
+    receiver(post_save, sender=_model)(_holding_after_save)
+    receiver(pre_delete, sender=_model)(_holding_before_delete)
+    receiver(post_delete, sender=_model)(_holding_after_delete)
+
+for _model in HISTORY_MODELS:
+    receiver(pre_save, sender=_model)(_history_before_save)
+    receiver(post_save, sender=_model)(_history_after_save)
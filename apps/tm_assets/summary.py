@@ -0,0 +1,109 @@
+"""
+사용자별 포트폴리오 요약(PortfolioSummary) 유지.
+
+보유자산 한 건이 합계에 기여하는 값(자산군, 통화, 평가액, 변동)을 변경 전/후로 구해
+차이만 요약 행에 반영한다. 요약 행이 없거나 기준일(as_of)이 지났으면 평가 엔진으로
+전체를 다시 계산한다 (예적금 평가액은 날짜에 따라 달라지므로).
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BondHolding, DepositSaving, PortfolioSummary, StockHolding
+from .valuation import ASSET_CLASSES, value_portfolio
+
+
+def holding_contribution(obj):
+    """보유자산 1건의 (자산군, 통화, 평가액, 변동) 기여분."""
+    delta, _ = obj.get_last_change()
+    delta = delta or 0.0
+    if isinstance(obj, DepositSaving):
+        return "CASH", obj.currency, float(obj.estimated_value()), delta
+    if isinstance(obj, StockHolding):
+        return "STOCK", obj.currency, float(obj.estimated_value()), delta * float(obj.quantity)
+    if isinstance(obj, BondHolding):
+        return "BOND", obj.currency, float(obj.estimated_value()), float(obj.face_amount) * delta / 100.0
+    raise TypeError(f"Unsupported holding type: {type(obj).__name__}")
+
+
+def _add(map_, key, amount):
+    map_[key] = map_.get(key, 0.0) + amount
+
+
+def apply_contribution(user_id, old=None, new=None):
+    """변경 전(old)/후(new) 기여분의 차이를 요약 행에 반영.
+
+    요약 행이 없으면 아무것도 하지 않는다(다음 조회 때 전체 계산).
+    기준일이 지난 행은 증분 대신 전체 재계산.
+    """
+    today = timezone.localdate()
+    with transaction.atomic():
+        summary = PortfolioSummary.objects.select_for_update().filter(pk=user_id).first()
+        if summary is None:
+            return None
+        if summary.as_of != today:
+            return rebuild_summary(summary.user, as_of=today)
+
+        for sign, contrib in ((-1, old), (1, new)):
+            if contrib is None:
+                continue
+            asset_class, currency, value, change = contrib
+            _add(summary.class_totals, asset_class, sign * value)
+            _add(summary.currency_totals, currency, sign * value)
+            _add(summary.change_sums.setdefault(asset_class, {}), currency, sign * change)
+            _add(summary.class_currency_totals.setdefault(asset_class, {}), currency, sign * value)
+        # 모든 보유자산이 빠진 통화는 제거
+        summary.currency_totals = {k: v for k, v in summary.currency_totals.items() if abs(v) > 1e-6}
+        summary.class_currency_totals = {
+            c: {k: v for k, v in by_currency.items() if abs(v) > 1e-6}
+            for c, by_currency in summary.class_currency_totals.items()
+        }
+        summary.change_sums = {
+            c: {k: v for k, v in by_currency.items() if k in summary.class_currency_totals.get(c, {})}
+            for c, by_currency in summary.change_sums.items()
+        }
+        summary.save(
+            update_fields=["class_totals", "currency_totals", "change_sums", "class_currency_totals", "updated_at"]
+        )
+    return summary
+
+
+def rebuild_summary(user, as_of=None):
+    """평가 엔진으로 사용자의 요약 행을 처음부터 다시 계산해 저장."""
+    as_of = as_of or timezone.localdate()
+    valuation = value_portfolio(user, as_of=as_of)
+    summary, _ = PortfolioSummary.objects.update_or_create(
+        user=user,
+        defaults={
+            "class_totals": valuation.class_totals,
+            "currency_totals": valuation.currency_totals,
+            "change_sums": valuation.change_sums,
+            "class_currency_totals": valuation.class_currency_totals,
+            "as_of": as_of,
+        },
+    )
+    return summary
+
+
+def get_summary(user):
+    """요약 행 1건 조회. 없거나 기준일이 지났으면 다시 계산."""
+    summary = PortfolioSummary.objects.filter(user=user).first()
+    if (
+        summary is None
+        or summary.as_of != timezone.localdate()
+        or not summary.class_currency_totals
+        # 통화 구분 없이 합산하던 이전 형식의 변동 합계
+        or not all(isinstance(v, dict) for v in summary.change_sums.values())
+    ):
+        summary = rebuild_summary(user)
+    for asset_class in ASSET_CLASSES:
+        summary.class_totals.setdefault(asset_class, 0.0)
+        summary.change_sums.setdefault(asset_class, {})
+        summary.class_currency_totals.setdefault(asset_class, {})
+    return summary
+
+
+def rebuild_summaries(user_ids):
+    """bulk 갱신 후 호출: 요약 행이 있는 사용자만 다시 계산 (없으면 다음 조회 때 생성)."""
+    for summary in PortfolioSummary.objects.filter(pk__in=list(user_ids)).select_related("user"):
+        rebuild_summary(summary.user)
@@ -1,3 +1,1142 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.tm_assets import price_store, views
+from apps.tm_assets.bond_analytics import bond_metrics
+from apps.tm_assets.fx import invalidate_rates, latest_rates, refresh_fx_rates, to_base
+from apps.tm_assets.models import (
+    BondHolding,
+    BondPriceHistory,
+    Compounding,
+    DepositSaving,
+    DepositValueHistory,
+    FxRate,
+    Market,
+    PortfolioSummary,
+    PriceRefreshJob,
+    StockHolding,
+    StockPriceHistory,
+    stock_last_change,
+)
+from apps.tm_assets.jobs import claim_next, enqueue_refresh
+from apps.tm_assets.pricing import (
+    INITIAL_LOOKBACK_DAYS,
+    fetch_kr_stock_quotes,
+    fetch_quotes,
+    fetch_stock_bars,
+    krx_snapshots,
+    refresh_holdings,
+    stock_fetch_starts,
+)
+from apps.tm_assets.retention import compact_history, purge_history
+from apps.tm_assets.summary import get_summary
+from apps.tm_assets.timeseries import lttb, value_series
+from apps.tm_assets.valuation import value_holdings, value_portfolio
+
+User = get_user_model()
+
+
+def make_holdings(user):
+    """테스트용 예적금/주식/채권 보유내역 생성."""
+    deposits = [
+        DepositSaving.objects.create(
+            user=user,
+            product_type=DepositSaving.ProductType.DEPOSIT,
+            bank_name="국민은행",
+            product_name=f"정기예금 {compounding}",
+            principal_amount=Decimal("10000000"),
+            annual_rate=Decimal("3.50"),
+            compounding=compounding,
+            start_date=date(2024, 1, 1),
+            maturity_date=date(2025, 1, 1) if compounding == Compounding.NONE else None,
+        )
+        for compounding in Compounding.values
+    ]
+    deposits.append(
+        DepositSaving.objects.create(
+            user=user,
+            product_type=DepositSaving.ProductType.SAVING,
+            bank_name="신한은행",
+            product_name="자유적금",
+            principal_amount=Decimal("500000"),
+            annual_rate=Decimal("4.00"),
+            start_date=date(2024, 6, 1),
+            currency="USD",
+            current_value_manual=Decimal("510000"),
+        )
+    )
+    stocks = [
+        StockHolding.objects.create(
+            user=user, market=Market.KR, ticker="005930", name="삼성전자",
+            quantity=Decimal("10"), average_price=Decimal("70000"), current_price=Decimal("75000"),
+        ),
+        StockHolding.objects.create(
+            user=user, market=Market.US, ticker="AAPL", name="Apple Inc.",
+            quantity=Decimal("2.5"), average_price=Decimal("180"), currency="USD",
+        ),
+    ]
+    bonds = [
+        BondHolding.objects.create(
+            user=user, name="국고채 3년", issuer="대한민국", face_amount=Decimal("10000000"),
+            coupon_rate=Decimal("3.20"), purchase_price_pct=Decimal("98.500"),
+            current_price_pct=Decimal("99.100"), maturity_date=date(2027, 6, 10),
+        ),
+    ]
+    return deposits, stocks, bonds
+
+
+def closes(*prices, end=None):
+    """provider 응답 대용: 오래된 순 일별 종가 Series (마지막 값이 end 일자)."""
+    end = end or timezone.localdate()
+    days = [end - timedelta(days=len(prices) - 1 - i) for i in range(len(prices))]
+    return pd.Series(prices, index=days, dtype=float)
+
+
+class ValuationEngineTest(TestCase):
+    """
+    Tests for the vectorized portfolio valuation engine.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username="investor", password="pw", nickname="Investor")
+        self.deposits, self.stocks, self.bonds = make_holdings(self.user)
+
+    def test_values_match_model_methods(self):
+        """
+        Engine values must match the per-object estimated_value() results
+        (deposits up to half-cent rounding).
+        """
+        as_of = date(2024, 9, 15)
+        valuation = value_portfolio(self.user, as_of=as_of)
+        expected = {d.pk: float(d.estimated_value(as_of=as_of)) for d in self.deposits}
+        for d in valuation.deposits:
+            self.assertAlmostEqual(d.est_value, expected[d.pk], delta=0.011)
+        for s in valuation.stocks:
+            self.assertAlmostEqual(s.est_value, float(s.estimated_value()), places=4)
+        for b in valuation.bonds:
+            self.assertAlmostEqual(b.est_value, float(b.estimated_value()), places=4)
+
+    def test_class_and_currency_totals(self):
+        """
+        Class totals and currency totals must add up to the same grand total.
+        """
+        valuation = value_portfolio(self.user, as_of=date(2024, 9, 15))
+        self.assertAlmostEqual(valuation.class_totals["STOCK"], 750000 + 450, places=4)
+        self.assertAlmostEqual(valuation.class_totals["BOND"], 9910000, places=4)
+        self.assertAlmostEqual(sum(valuation.currency_totals.values()), valuation.total, places=2)
+        self.assertAlmostEqual(valuation.currency_totals["USD"], 510000 + 450, places=4)
+
+    def test_empty_portfolio(self):
+        """
+        A user without holdings gets zero totals and no currency buckets.
+        """
+        other = User.objects.create_user(username="empty", password="pw", nickname="Empty")
+        valuation = value_portfolio(other)
+        self.assertEqual(valuation.class_totals, {"CASH": 0.0, "STOCK": 0.0, "BOND": 0.0})
+        self.assertEqual(valuation.currency_totals, {})
+
+    def test_portfolio_pages_render(self):
+        """
+        Portfolio pages render the precomputed values.
+        """
+        self.client.login(username="investor", password="pw")
+        for name in ["portfolio", "allocation", "deposits_list", "stocks_list", "bonds_list"]:
+            response = self.client.get(reverse(f"tm_assets:{name}"))
+            self.assertEqual(response.status_code, 200, name)
+        response = self.client.get(reverse("tm_assets:stocks_list"))
+        self.assertContains(response, "750000")
+
+
+class LastChangeAnnotationTest(TestCase):
+    """
+    Tests for the batched latest/previous price annotations.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username="investor", password="pw", nickname="Investor")
+        self.deposits, self.stocks, self.bonds = make_holdings(self.user)
+        self.client.login(username="investor", password="pw")
+        cache.clear()
+
+    def add_history(self, stock, prices):
+        for i, price in enumerate(prices):
+            StockPriceHistory.objects.create(
+                stock=stock, price=Decimal(price), recorded_at=timezone.now() + timedelta(minutes=i)
+            )
+
+    def test_annotation_matches_per_row_helper(self):
+        """
+        with_last_change() must give the same delta/pct as the per-row query.
+        """
+        self.add_history(self.stocks[0], ["70000", "72000", "75000"])
+        annotated = StockHolding.objects.with_last_change().get(pk=self.stocks[0].pk)
+        self.assertEqual(annotated.get_last_change(), stock_last_change(self.stocks[0]))
+        self.assertEqual(annotated.get_last_change(), (3000.0, 4.17))
+        self.assertEqual(
+            StockHolding.objects.with_last_change().get(pk=self.stocks[1].pk).get_last_change(),
+            (None, None),
+        )
+
+    def test_change_sums(self):
+        """
+        Change sums are weighted by quantity/face amount.
+        """
+        self.add_history(self.stocks[0], ["74000", "75000"])
+        BondPriceHistory.objects.create(bond=self.bonds[0], price_pct=Decimal("99.000"))
+        BondPriceHistory.objects.create(
+            bond=self.bonds[0], price_pct=Decimal("99.100"), recorded_at=timezone.now() + timedelta(minutes=1)
+        )
+        valuation = value_portfolio(self.user)
+        self.assertAlmostEqual(valuation.change_sums["STOCK"]["KRW"], 10000.0)
+        self.assertAlmostEqual(valuation.change_sums["BOND"]["KRW"], 10000.0, places=4)
+        self.assertEqual(valuation.change_sums["CASH"], {"KRW": 0.0, "USD": 0.0})
+
+    def test_list_page_query_count_is_constant(self):
+        """
+        The stock list must not issue per-row history queries.
+        """
+        for s in self.stocks:
+            self.add_history(s, ["100", "110"])
+        latest_rates()  # 환율 캐시는 프로세스당 TTL 마다 1회 로드
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse("tm_assets:stocks_list"))
+        for i in range(5):
+            stock = StockHolding.objects.create(
+                user=self.user, market=Market.KR, ticker=f"00000{i}",
+                quantity=Decimal("1"), average_price=Decimal("100"),
+            )
+            self.add_history(stock, ["100", "105"])
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse("tm_assets:stocks_list"))
+        self.assertEqual(len(small), len(large))
+
+
+class PortfolioSummaryTest(TestCase):
+    """
+    Tests for the incrementally maintained PortfolioSummary.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username="investor", password="pw", nickname="Investor")
+        self.deposits, self.stocks, self.bonds = make_holdings(self.user)
+        get_summary(self.user)
+
+    def assertMatchesRebuild(self):
+        incremental = PortfolioSummary.objects.get(user=self.user)
+        expected = value_portfolio(self.user)
+        for key, value in expected.class_totals.items():
+            self.assertAlmostEqual(incremental.class_totals[key], value, places=2)
+        for key, by_currency in expected.change_sums.items():
+            for currency, value in by_currency.items():
+                self.assertAlmostEqual(incremental.change_sums.get(key, {}).get(currency, 0.0), value, places=2)
+        self.assertEqual(set(incremental.currency_totals), set(expected.currency_totals))
+        for key, value in expected.currency_totals.items():
+            self.assertAlmostEqual(incremental.currency_totals[key], value, places=2)
+
+    def test_create_edit_delete_holding(self):
+        """
+        Holding create/edit/delete keep the summary equal to a full rebuild.
+        """
+        stock = StockHolding.objects.create(
+            user=self.user, market=Market.US, ticker="MSFT", quantity=Decimal("3"),
+            average_price=Decimal("400"), currency="EUR",
+        )
+        self.assertMatchesRebuild()
+        stock.current_price = Decimal("420")
+        stock.save()
+        self.assertMatchesRebuild()
+        stock.delete()
+        self.assertMatchesRebuild()
+        self.assertNotIn("EUR", PortfolioSummary.objects.get(user=self.user).currency_totals)
+
+    def test_price_history_updates_change_sums(self):
+        """
+        New price/value history rows update the change sums.
+        """
+        stock = self.stocks[0]
+        for i, price in enumerate(["74000", "75000", "73000"]):
+            StockPriceHistory.objects.create(
+                stock=stock, price=Decimal(price), recorded_at=timezone.now() + timedelta(minutes=i)
+            )
+            self.assertMatchesRebuild()
+        yesterday = timezone.now() - timedelta(days=1)
+        DepositValueHistory.objects.create(
+            deposit=self.deposits[0], value=Decimal("10000000"),
+            recorded_at=yesterday, recorded_on=timezone.localdate(yesterday),
+        )
+        DepositValueHistory.objects.create(deposit=self.deposits[0], value=Decimal("10010000"))
+        self.assertMatchesRebuild()
+        self.assertAlmostEqual(PortfolioSummary.objects.get(user=self.user).change_sums["STOCK"]["KRW"], -20000.0)
+
+    def test_deleting_stale_instance_uses_stored_row(self):
+        """
+        Deleting an out-of-date instance subtracts the stored contribution, not the in-memory one.
+        """
+        stale = StockHolding.objects.get(pk=self.stocks[0].pk)
+        StockHolding.objects.filter(pk=stale.pk).update(quantity=Decimal("20"))
+        PortfolioSummary.objects.filter(user=self.user).delete()
+        get_summary(self.user)
+        stale.delete()
+        self.assertMatchesRebuild()
+
+    def test_stale_summary_is_rebuilt(self):
+        """
+        A summary from a previous day is recomputed on read.
+        """
+        PortfolioSummary.objects.filter(user=self.user).update(as_of=date(2000, 1, 1), class_totals={})
+        summary = get_summary(self.user)
+        self.assertEqual(summary.as_of, timezone.localdate())
+        self.assertMatchesRebuild()
+
+    def test_legacy_flat_change_sums_are_rebuilt(self):
+        """
+        Change sums stored before they were split per currency are recomputed on read.
+        """
+        PortfolioSummary.objects.filter(user=self.user).update(change_sums={"CASH": 0.0, "STOCK": 1.0, "BOND": 0.0})
+        summary = get_summary(self.user)
+        self.assertIsInstance(summary.change_sums["STOCK"], dict)
+        self.assertMatchesRebuild()
+
+    def test_user_delete_cascades(self):
+        """
+        Deleting the user removes holdings and the summary without errors.
+        """
+        self.user.delete()
+        self.assertFalse(PortfolioSummary.objects.exists())
+
+
+@override_settings(PRICE_KRX_SNAPSHOT=False)
+class BatchRefreshTest(TestCase):
+    """
+    Tests for the de-duplicated bulk price refresh pipeline.
+    """
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f"investor{i}", password="pw", nickname=f"Investor{i}")
+            for i in range(3)
+        ]
+        for user in self.users:
+            make_holdings(user)
+            BondHolding.objects.filter(user=user).update(bond_code="KR103502GE97")
+        get_summary(self.users[0])
+        snapshots = patch.dict("apps.tm_assets.pricing._bond_snapshots", clear=True)
+        snapshots.start()
+        self.addCleanup(snapshots.stop)
+
+    @patch("apps.tm_assets.pricing.fetch_bond_price", return_value=99.5)
+    @patch("apps.tm_assets.pricing.fetch_stock_bars", side_effect=lambda t, start: {"005930": closes(80000.0)}.get(t))
+    def test_each_ticker_fetched_once(self, fetch_stock, fetch_bond):
+        """
+        Shared tickers/codes are fetched once and written in bulk.
+        """
+        result = refresh_holdings(
+            stocks=StockHolding.objects.all(), bonds=BondHolding.objects.all(), deposits=DepositSaving.objects.all()
+        )
+        self.assertEqual(fetch_stock.call_count, 2)  # 005930, AAPL
+        self.assertEqual(fetch_bond.call_count, 1)
+        self.assertEqual((result.stocks_updated, result.stocks_total), (3, 6))
+        self.assertEqual(result.bonds_updated, 3)
+        self.assertEqual(result.deposits_snapshotted, DepositSaving.objects.count())
+        self.assertEqual(StockPriceHistory.objects.count(), 3)
+        self.assertEqual(
+            set(StockHolding.objects.filter(ticker="005930").values_list("current_price", flat=True)),
+            {Decimal("80000")},
+        )
+        self.assertFalse(BondHolding.objects.exclude(current_price_pct=Decimal("99.5")).exists())
+        # bulk 연산 후 기존 요약 행은 다시 계산됨
+        summary = PortfolioSummary.objects.get(user=self.users[0])
+        self.assertAlmostEqual(summary.class_totals["STOCK"], 800000 + 450, places=4)
+
+    def test_deposit_snapshots_once_per_day(self):
+        """
+        Repeated runs on the same day upsert one snapshot row per deposit.
+        """
+        deposits = DepositSaving.objects.all()
+        refresh_holdings(deposits=deposits)
+        DepositSaving.objects.filter(pk=deposits[0].pk).update(current_value_manual=Decimal("12345"))
+        with CaptureQueriesContext(connection) as ctx:
+            result = refresh_holdings(deposits=deposits)
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(result.deposits_snapshotted, deposits.count())
+        self.assertEqual(DepositValueHistory.objects.count(), deposits.count())
+        row = DepositValueHistory.objects.get(deposit=deposits[0])
+        self.assertEqual((row.value, row.recorded_on), (Decimal("12345"), timezone.localdate()))
+
+    def test_bond_snapshot_shared_across_runs(self):
+        """
+        Bond quotes are fetched once per code per day, across separate refresh runs.
+        """
+        BondHolding.objects.filter(user=self.users[2]).update(bond_code="KR2000000001")
+        with patch("apps.tm_assets.pricing.fetch_bond_price", side_effect=lambda code, day: 99.5) as fetch_bond:
+            for user in self.users:
+                refresh_holdings(bonds=BondHolding.objects.filter(user=user))
+            self.assertTrue(BondHolding.objects.first().update_price_via_pykrx())
+            result = refresh_holdings(bonds=BondHolding.objects.all())
+        self.assertEqual(fetch_bond.call_count, 2)
+        self.assertEqual((result.bonds_updated, result.codes_fetched), (3, 0))
+
+    def test_bond_snapshot_retries_misses_after_ttl(self):
+        """
+        Failed codes are not re-requested until BOND_MISS_TTL passes.
+        """
+        bonds = BondHolding.objects.all()
+        with patch("apps.tm_assets.pricing.fetch_bond_price", return_value=None) as fetch_bond:
+            refresh_holdings(bonds=bonds)
+            refresh_holdings(bonds=bonds)
+            self.assertEqual(fetch_bond.call_count, 1)
+            with patch("apps.tm_assets.pricing.BOND_MISS_TTL", 0):
+                refresh_holdings(bonds=bonds)
+            self.assertEqual(fetch_bond.call_count, 2)
+
+    @patch("apps.tm_assets.pricing.fetch_stock_bars", return_value=closes(81000.0))
+    def test_single_holding_method(self, fetch_stock):
+        """
+        update_price_via_fdr() runs the same pipeline for one holding.
+        """
+        stock = StockHolding.objects.filter(ticker="005930").first()
+        self.assertTrue(stock.update_price_via_fdr())
+        self.assertEqual(stock.current_price, Decimal("81000"))
+        self.assertEqual(fetch_stock.call_count, 1)
+        self.assertEqual(stock.price_history.count(), 1)
+
+
+@override_settings(PRICE_KRX_SNAPSHOT=False)
+class ConcurrentFetchTest(TestCase):
+    """
+    Tests for the worker-pool quote fetching and provider limits.
+    """
+    def test_concurrency_limit(self):
+        """
+        No more than `concurrency` fetches run at the same time.
+        """
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def fetch(key):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return float(key)
+
+        limits = {"FDR": {"concurrency": 2, "rps": None}}
+        with self.settings(PRICE_PROVIDER_LIMITS=limits):
+            quotes, stats = fetch_quotes([str(i) for i in range(8)], fetch, "FDR", workers=6)
+        self.assertEqual(quotes, {str(i): float(i) for i in range(8)})
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(stats.count, 8)
+        self.assertGreater(stats.percentile(95), 0.0)
+
+    def test_rate_limit(self):
+        """
+        Requests are spaced to the configured requests-per-second.
+        """
+        with self.settings(PRICE_PROVIDER_LIMITS={"pykrx": {"concurrency": 4, "rps": 50.0}}):
+            _, stats = fetch_quotes(list("abcdef"), lambda key: None, "pykrx", workers=4)
+        self.assertGreaterEqual(stats.elapsed, 5 / 50.0 * 0.9)
+
+    @patch("apps.tm_assets.pricing.fetch_stock_bars", return_value=closes(100.0))
+    def test_command_reports_throughput(self, fetch_stock):
+        """
+        update_asset_prices --workers prints throughput and latency percentiles.
+        """
+        user = User.objects.create_user(username="investor", password="pw", nickname="Investor")
+        make_holdings(user)
+        out = StringIO()
+        call_command("update_asset_prices", "--only", "stock", "--workers", "4", stdout=out)
+        self.assertIn("Stocks: 2/2 updated", out.getvalue())
+        self.assertIn("quotes/sec", out.getvalue())
+        self.assertIn("p95", out.getvalue())
+
+
+@override_settings(PRICE_KRX_SNAPSHOT=False)
+class IncrementalFetchTest(TestCase):
+    """
+    Tests for date-bounded stock fetches and trading-day backfill.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username="investor", password="pw", nickname="Investor")
+        _, self.stocks, _ = make_holdings(self.user)
+        self.today = timezone.localdate()
+
+    def test_fetch_starts(self):
+        """
+        Fetch starts at the oldest last-stored date per ticker, or the lookback window.
+        """
+        samsung = self.stocks[0]
+        StockPriceHistory.objects.create(stock=samsung, price=Decimal("1"), recorded_at=timezone.now() - timedelta(days=3))
+        StockPriceHistory.objects.create(stock=samsung, price=Decimal("1"), recorded_at=timezone.now() - timedelta(days=30))
+        starts = stock_fetch_starts(StockHolding.objects.all())
+        self.assertEqual(starts["005930"], self.today - timedelta(days=3))
+        self.assertEqual(starts["AAPL"], self.today - timedelta(days=INITIAL_LOOKBACK_DAYS))
+
+    def test_backfills_missing_days(self):
+        """
+        Days between the last stored price and the latest bar are backfilled once.
+        """
+        samsung = self.stocks[0]
+        StockPriceHistory.objects.create(stock=samsung, price=Decimal("70000"), recorded_at=timezone.now() - timedelta(days=4))
+        bars = closes(70000.0, 71000.0, 72000.0, 73000.0, 74000.0)
+        with patch("apps.tm_assets.pricing.fetch_stock_bars", return_value=bars) as fetch:
+            refresh_holdings(stocks=StockHolding.objects.filter(pk=samsung.pk))
+        fetch.assert_called_once_with("005930", self.today - timedelta(days=4))
+        prices = list(samsung.price_history.values_list("price", flat=True))
+        # 최신 → 과거: 현재가, 빠진 3거래일, 기존 이력
+        self.assertEqual(prices, [Decimal(p) for p in ["74000", "73000", "72000", "71000", "70000"]])
+        samsung.refresh_from_db()
+        self.assertEqual(samsung.current_price, Decimal("74000"))
+
+
+class PriceStoreTest(TestCase):
+    """
+    Tests for the on-disk OHLCV price store.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = self.settings(PRICE_STORE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def frame(self, start, prices):
+        index = pd.date_range(start, periods=len(prices), freq="D")
+        return pd.DataFrame({"Open": prices, "High": prices, "Low": prices, "Close": prices, "Volume": 1.0}, index=index)
+
+    def test_append_replaces_tail(self):
+        """
+        Appending overwrites bars from the first new date and keeps older bars.
+        """
+        price_store.append_bars("FDR", "005930", price_store.bars_from_frame(self.frame("2024-01-01", [1.0, 2.0, 3.0])))
+        price_store.append_bars("FDR", "005930", price_store.bars_from_frame(self.frame("2024-01-03", [3.5, 4.0])))
+        bars = price_store.read_bars("FDR", "005930")
+        self.assertEqual(bars["close"].tolist(), [1.0, 2.0, 3.5, 4.0])
+        self.assertEqual(price_store.last_date("FDR", "005930"), date(2024, 1, 4))
+        self.assertEqual(price_store.read_bars("FDR", "005930", start=date(2024, 1, 3))["close"].tolist(), [3.5, 4.0])
+        self.assertEqual(price_store.read_bars("FDR", "BRK/B").size, 0)
+
+    def test_merge_keeps_bars_outside_new_dates(self):
+        """
+        Merging replaces only the dates present in the new bars, so gaps keep stored values.
+        """
+        price_store.merge_bars("KRX", "005930", price_store.bars_from_frame(self.frame("2024-01-01", [1.0, 2.0, 3.0])))
+        new = price_store.bars_from_frame(self.frame("2024-01-01", [1.5, 0.0, 3.5, 4.0]))
+        price_store.merge_bars("KRX", "005930", new[new["close"] != 0.0])
+        self.assertEqual(price_store.read_bars("KRX", "005930")["close"].tolist(), [1.5, 2.0, 3.5, 4.0])
+
+    def test_fetch_requests_only_new_bars(self):
+        """
+        fetch_stock_bars asks the provider only from the last stored date.
+        """
+        today = timezone.localdate()
+        first = self.frame(today - timedelta(days=5), [10.0, 11.0, 12.0, 13.0, 14.0])
+        with patch("FinanceDataReader.DataReader", return_value=first) as reader:
+            series = fetch_stock_bars("AAPL", today - timedelta(days=5))
+        reader.assert_called_once_with("AAPL", (today - timedelta(days=5)).isoformat())
+        self.assertEqual(series.tolist(), [10.0, 11.0, 12.0, 13.0, 14.0])
+
+        second = self.frame(today - timedelta(days=1), [14.5, 15.0])
+        with patch("FinanceDataReader.DataReader", return_value=second) as reader:
+            series = fetch_stock_bars("AAPL", today - timedelta(days=2))
+        reader.assert_called_once_with("AAPL", (today - timedelta(days=1)).isoformat())
+        self.assertEqual(series.tolist(), [13.0, 14.5, 15.0])
+        self.assertEqual(series.index[-1], today)
+
+
+@override_settings(PRICE_KRX_SNAPSHOT=False)
+class RefreshJobQueueTest(TestCase):
+    """
+    Tests for the background price refresh job queue.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username="investor", password="pw", nickname="Investor")
+        make_holdings(self.user)
+        self.client.login(username="investor", password="pw")
+        cache.clear()
+
+    @patch("apps.tm_assets.pricing.fetch_stock_bars")
+    def test_view_enqueues_without_fetching(self, fetch_stock):
+        """
+        refresh_prices only enqueues a job, and repeat clicks reuse it.
+        """
+        response = self.client.get(reverse("tm_assets:refresh_prices"))
+        self.assertRedirects(response, reverse("tm_assets:portfolio"))
+        self.client.get(reverse("tm_assets:refresh_prices"))
+        fetch_stock.assert_not_called()
+        self.assertEqual(PriceRefreshJob.objects.filter(status=PriceRefreshJob.Status.PENDING).count(), 1)
+        response = self.client.get(reverse("tm_assets:portfolio"))
+        self.assertContains(response, 'id="refresh-job"')
+
+    @patch("apps.tm_assets.pricing.fetch_stock_bars", return_value=closes(90000.0))
+    def test_worker_processes_job(self, fetch_stock):
+        """
+        The worker command claims the job, refreshes prices and reports via the status endpoint.
+        """
+        job = enqueue_refresh(self.user)
+        status_url = reverse("tm_assets:refresh_status", args=[job.pk])
+        self.assertEqual(self.client.get(status_url).json()["done"], False)
+
+        call_command("run_price_worker", "--once", stdout=StringIO())
+
+        data = self.client.get(status_url).json()
+        self.assertEqual(data["status"], "DONE")
+        self.assertEqual(data["progress"], 100)
+        self.assertEqual(data["stocks_updated"], 2)
+        self.assertTrue(data["done"])
+        self.assertIsNone(claim_next())
+
+    def _stale_running_job(self):
+        job = enqueue_refresh(self.user)
+        claim_next()
+        old = timezone.now() - timedelta(hours=1)
+        PriceRefreshJob.objects.filter(pk=job.pk).update(started_at=old, updated_at=old)
+        return job
+
+    def test_dead_worker_job_is_failed_and_replaced(self):
+        """
+        A RUNNING job with no progress for too long is failed, and a new refresh can be queued.
+        """
+        job = self._stale_running_job()
+        fresh = enqueue_refresh(self.user)
+        self.assertNotEqual(fresh.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PriceRefreshJob.Status.FAILED)
+        self.assertTrue(job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_live_running_job_is_reused(self):
+        """
+        A RUNNING job with recent progress is still returned by enqueue_refresh.
+        """
+        job = enqueue_refresh(self.user)
+        claim_next()
+        self.assertEqual(enqueue_refresh(self.user).pk, job.pk)
+
+    def test_stale_job_status_reports_failure(self):
+        """
+        The status endpoint and portfolio page report the error instead of polling a dead job forever.
+        """
+        job = self._stale_running_job()
+        data = self.client.get(reverse("tm_assets:refresh_status", args=[job.pk])).json()
+        self.assertEqual(data["status"], "FAILED")
+        self.assertTrue(data["done"])
+        self.assertTrue(data["error"])
+
+        response = self.client.get(reverse("tm_assets:portfolio"))
+        self.assertNotContains(response, 'id="refresh-job"')
+        self.assertContains(response, "가격 업데이트에 실패했습니다")
+        # 읽기 경로는 쓰지 않음 — 실제 정리는 워커 루프가 함
+        job.refresh_from_db()
+        self.assertEqual(job.status, PriceRefreshJob.Status.RUNNING)
+
+    def test_worker_loop_fails_stale_jobs_and_recycles_connections(self):
+        """
+        Each worker iteration closes old connections and fails dead RUNNING jobs.
+        """
+        job = self._stale_running_job()
+        with patch("apps.tm_assets.management.commands.run_price_worker.close_old_connections") as close:
+            call_command("run_price_worker", "--once", stdout=StringIO())
+        close.assert_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, PriceRefreshJob.Status.FAILED)
+
+    def test_status_of_other_users_job_is_forbidden(self):
+        """
+        Users cannot read other users' job status.
+        """
+        other = User.objects.create_user(username="other", password="pw", nickname="Other")
+        job = enqueue_refresh(other)
+        response = self.client.get(reverse("tm_assets:refresh_status", args=[job.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class HistoryRetentionTest(TestCase):
+    """
+    Tests for the price history compaction/retention command.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="pw", nickname="Owner")
+        _, self.stocks, _ = make_holdings(self.user)
+        self.stock = self.stocks[0]
+        StockPriceHistory.objects.all().delete()
+        now = timezone.localtime()
+
+        def at(days_ago, hour):
+            return (now - timedelta(days=days_ago)).replace(hour=hour, minute=0, second=0, microsecond=0)
+
+        # 오래된 날 (압축 대상): 하루 3건, 보존 기간 밖: 1건, 최근: 하루 2건
+        for hour, price in ((10, 100), (12, 101), (15, 102)):
+            StockPriceHistory.objects.create(stock=self.stock, price=price, recorded_at=at(60, hour))
+        StockPriceHistory.objects.create(stock=self.stock, price=90, recorded_at=at(4000, 12))
+        for hour, price in ((10, 110), (15, 111)):
+            StockPriceHistory.objects.create(stock=self.stock, price=price, recorded_at=at(1, hour))
+
+    def test_dry_run_deletes_nothing(self):
+        """
+        --dry-run only reports counts.
+        """
+        out = StringIO()
+        call_command("compact_price_history", "--dry-run", stdout=out)
+        self.assertIn("StockPriceHistory: would delete 2 intraday rows, 1 expired rows", out.getvalue())
+        self.assertEqual(StockPriceHistory.objects.count(), 6)
+
+    def test_compacts_old_days_and_purges_expired_rows(self):
+        """
+        Old days keep only their closing row, recent days stay intact and expired rows are deleted.
+        """
+        call_command("compact_price_history", "--batch-size", "1", stdout=StringIO())
+        prices = list(StockPriceHistory.objects.filter(stock=self.stock).values_list("price", flat=True))
+        self.assertEqual([float(p) for p in prices], [111.0, 110.0, 102.0])
+        delta, _ = stock_last_change(self.stock)
+        self.assertEqual(delta, 1.0)
+
+    def test_batches_never_load_more_than_batch_size_ids(self):
+        """
+        Purging reads at most batch_size ids per query; compaction works one day at a time.
+        """
+        for i in range(5):
+            StockPriceHistory.objects.create(
+                stock=self.stock, price=80 + i, recorded_at=timezone.now() - timedelta(days=3000, minutes=i)
+            )
+        before = timezone.now() - timedelta(days=365 * 5)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(purge_history(StockPriceHistory, before, batch_size=2), 6)
+        limited = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and "LIMIT 2" in q["sql"]]
+        self.assertEqual(len(limited), 4)
+        self.assertEqual(compact_history(StockPriceHistory, timezone.now(), batch_size=1, dry_run=True), 3)
+
+
+class ValueSeriesTest(TestCase):
+    """
+    Tests for the downsampled portfolio value time-series endpoint.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="pw", nickname="Owner")
+        self.client.login(username="owner", password="pw")
+        _, self.stocks, self.bonds = make_holdings(self.user)
+        self.today = timezone.localdate()
+
+    def at(self, day):
+        return timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=12))
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        """
+        LTTB returns the requested count, keeps the first/last point and the spike.
+        """
+        y = np.zeros(1000)
+        y[437] = 100.0
+        idx = lttb(np.arange(1000, dtype=float), y, 50)
+        self.assertEqual(len(idx), 50)
+        self.assertEqual((idx[0], idx[-1]), (0, 999))
+        self.assertIn(437, idx)
+        self.assertTrue(np.all(np.diff(idx) > 0))
+
+    def test_series_carries_values_forward(self):
+        """
+        Daily values are forward-filled per holding, seeded from before the range and weighted.
+        """
+        stock, bond = self.stocks[0], self.bonds[0]
+        StockPriceHistory.objects.create(stock=stock, price=100, recorded_at=self.at(self.today - timedelta(days=10)))
+        StockPriceHistory.objects.create(stock=stock, price=110, recorded_at=self.at(self.today - timedelta(days=2)))
+        BondPriceHistory.objects.create(bond=bond, price_pct=99, recorded_at=self.at(self.today - timedelta(days=1)))
+
+        series = value_series(self.user, self.today - timedelta(days=4), self.today)
+        self.assertEqual(series.raw_points, 5)
+        self.assertEqual(series.by_class["STOCK"], [1000.0, 1000.0, 1100.0, 1100.0, 1100.0])
+        self.assertEqual(series.by_class["BOND"], [0.0, 0.0, 0.0, 9900000.0, 9900000.0])
+        self.assertEqual(series.total[-1], 1100.0 + 9900000.0)
+
+    def test_series_is_converted_to_base_currency(self):
+        """
+        Foreign-currency holdings are converted before summing; holdings without a rate are left out.
+        """
+        invalidate_rates()
+        self.addCleanup(invalidate_rates)
+        krw, usd = self.stocks
+        day = self.at(self.today - timedelta(days=1))
+        StockPriceHistory.objects.create(stock=krw, price=1000, recorded_at=day)
+        StockPriceHistory.objects.create(stock=usd, price=200, recorded_at=day)
+        series = value_series(self.user, self.today, self.today)
+        self.assertEqual(series.by_class["STOCK"], [10000.0])
+        self.assertEqual(series.as_dict()["missing_rates"], ["USD"])
+
+        FxRate.objects.create(currency="USD", rate_date=self.today, rate=Decimal("1000"))
+        invalidate_rates()
+        series = value_series(self.user, self.today, self.today)
+        self.assertEqual(series.currency, "KRW")
+        self.assertEqual(series.missing_rates, [])
+        self.assertEqual(series.by_class["STOCK"], [10000.0 + 2.5 * 200 * 1000])
+        series = value_series(self.user, self.today, self.today, base="USD")
+        self.assertEqual(series.by_class["STOCK"], [10.0 + 500.0])
+        data = self.client.get(reverse("tm_assets:value_series"), {"start": self.today.isoformat(), "base": "USD"}).json()
+        self.assertEqual((data["currency"], data["series"]["STOCK"]), ("USD", [510.0]))
+
+    def test_endpoint_downsamples(self):
+        """
+        The JSON endpoint caps the point count and rejects bad parameters.
+        """
+        stock = self.stocks[0]
+        StockPriceHistory.objects.bulk_create(
+            StockPriceHistory(stock=stock, price=1000 + i % 37, recorded_at=self.at(self.today - timedelta(days=i)))
+            for i in range(800)
+        )
+        url = reverse("tm_assets:value_series")
+        data = self.client.get(url, {"start": (self.today - timedelta(days=799)).isoformat(), "points": 100}).json()
+        self.assertEqual(data["raw_points"], 800)
+        self.assertEqual(data["points"], 100)
+        self.assertEqual(len(data["series"]["STOCK"]), 100)
+        self.assertEqual(data["dates"][-1], self.today.isoformat())
+        self.assertEqual(self.client.get(url, {"start": "bad"}).status_code, 400)
+
+    def test_endpoint_rejects_out_of_range_dates(self):
+        """
+        Dates outside the supported range, or spans over MAX_SPAN_DAYS, return 400 instead of crashing.
+        """
+        url = reverse("tm_assets:value_series")
+        cases = {
+            "before pandas range": {"start": "0001-01-01", "end": "2026-01-01"},
+            "end at date.max": {"end": "9999-12-31"},
+            "start at date.max": {"start": "9999-12-31", "end": "9999-12-31"},
+            "span over limit": {"start": "2000-01-01", "end": "2020-01-01"},
+            "reversed": {"start": "2020-01-02", "end": "2020-01-01"},
+        }
+        for label, params in cases.items():
+            with self.subTest(label):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+        self.assertEqual(
+            self.client.get(url, {"start": "2016-01-01", "end": "2025-12-31"}).status_code, 200
+        )
+
+
+class FxRateTest(TestCase):
+    """
+    Tests for the FX rate store and base-currency totals.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="pw", nickname="Owner")
+        self.client.login(username="owner", password="pw")
+        invalidate_rates()
+        self.addCleanup(invalidate_rates)
+        cache.clear()
+
+    def rates(self, usd, day=None):
+        return pd.Series([usd], index=[day or timezone.localdate()], dtype=float)
+
+    def test_refresh_upserts_daily_rates(self):
+        """
+        Rates are stored once per currency/day and refreshed rows are updated in place.
+        """
+        with patch("apps.tm_assets.fx.fetch_fx_series", side_effect=lambda c, start: self.rates(1300.0)):
+            self.assertEqual(refresh_fx_rates(), 3)
+        with patch("apps.tm_assets.fx.fetch_fx_series", side_effect=lambda c, start: self.rates(1310.5)):
+            refresh_fx_rates(["USD"])
+        self.assertEqual(FxRate.objects.count(), 3)
+        self.assertEqual(FxRate.objects.get(currency="USD").rate, Decimal("1310.5"))
+        self.assertEqual(latest_rates()["USD"], 1310.5)
+
+    def test_latest_rates_are_cached_in_process(self):
+        """
+        Page views read cached rates; only the newest row per currency is used.
+        """
+        FxRate.objects.create(currency="USD", rate_date=date(2025, 1, 1), rate=Decimal("1200"))
+        FxRate.objects.create(currency="USD", rate_date=date(2025, 1, 2), rate=Decimal("1400"))
+        self.assertEqual(latest_rates(), {"KRW": 1.0, "USD": 1400.0})
+        with self.assertNumQueries(0):
+            latest_rates()
+
+    def test_totals_are_converted_to_base_currency(self):
+        """
+        Holdings are converted with one factor per currency; missing rates are reported.
+        """
+        FxRate.objects.create(currency="USD", rate_date=timezone.localdate(), rate=Decimal("1000"))
+        make_holdings(self.user)
+        valuation = value_portfolio(self.user)
+        self.assertNotIn("JPY", valuation.currency_totals)
+
+        converted = value_holdings(valuation.deposits, valuation.stocks, valuation.bonds, base_currency="KRW")
+        apple = next(s for s in converted.stocks if s.ticker == "AAPL")
+        self.assertAlmostEqual(apple.base_value, 450 * 1000)
+        self.assertAlmostEqual(converted.base_class_totals["STOCK"], 750000 + 450000)
+
+        class_totals, currency_totals, missing = to_base(get_summary(self.user).class_currency_totals, "USD")
+        self.assertAlmostEqual(class_totals["STOCK"], 750 + 450)
+        self.assertAlmostEqual(currency_totals["USD"], 510000 + 450)
+        self.assertEqual(missing, [])
+
+        StockHolding.objects.create(
+            user=self.user, market=Market.US, ticker="7203", name="Toyota",
+            quantity=Decimal("1"), average_price=Decimal("3000"), currency="JPY",
+        )
+        response = self.client.get(reverse("tm_assets:allocation"))
+        self.assertEqual(response.context["missing_rates"], ["JPY"])
+        self.assertEqual(response.context["class_change_sums"]["STOCK"], 0.0)
+        self.assertEqual(response.context["base_currency"], "KRW")
+        ratios = {i["label"]: i["ratio"] for i in response.context["currency_items"]}
+        self.assertAlmostEqual(sum(ratios.values()), 100.0, places=1)
+
+
+    def test_list_pages_report_missing_rates(self):
+        """
+        List totals that leave out a currency without a rate say so.
+        """
+        make_holdings(self.user)
+        response = self.client.get(reverse("tm_assets:stocks_list"))
+        self.assertEqual(response.context["missing_rates"], ["USD"])
+        self.assertAlmostEqual(response.context["total"], 750000)
+        self.assertContains(response, "환율 정보가 없어 합계에서 제외된 통화: USD")
+        response = self.client.get(reverse("tm_assets:bonds_list"))
+        self.assertEqual(response.context["missing_rates"], [])
+        self.assertNotContains(response, "환율 정보가 없어")
+
+    def test_change_sums_are_converted_to_base_currency(self):
+        """
+        Change sums from different currencies are converted before they are added.
+        """
+        FxRate.objects.create(currency="USD", rate_date=timezone.localdate(), rate=Decimal("1000"))
+        _, stocks, _ = make_holdings(self.user)
+        for stock, prices in zip(stocks, (["74000", "75000"], ["180", "190"])):
+            for i, price in enumerate(prices):
+                StockPriceHistory.objects.create(
+                    stock=stock, price=Decimal(price), recorded_at=timezone.now() + timedelta(minutes=i)
+                )
+        expected = 10 * 1000 + 2.5 * 10 * 1000
+        valuation = value_portfolio(self.user)
+        self.assertEqual(valuation.change_sums["STOCK"], {"KRW": 10000.0, "USD": 25.0})
+        response = self.client.get(reverse("tm_assets:stocks_list"))
+        self.assertAlmostEqual(response.context["change_sum"], expected)
+        response = self.client.get(reverse("tm_assets:allocation"), {"base": "USD"})
+        self.assertAlmostEqual(response.context["class_change_sums"]["STOCK"], expected / 1000)
+
+
+class BondAnalyticsTest(TestCase):
+    """
+    Tests for the vectorized bond yield/duration/accrued interest engine.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_par_bond_metrics(self):
+        """
+        A par bond yields its coupon; known duration/convexity values are reproduced.
+        """
+        metrics = bond_metrics([5.0, 5.0, 3.0], [100.0, 100.0, 100.0], [10.0, 3.0, -0.5])
+        self.assertAlmostEqual(metrics["ytm"][0], 5.0, places=6)
+        self.assertAlmostEqual(metrics["ytm"][1], 5.0, places=6)
+        self.assertAlmostEqual(metrics["mod_duration"][0], 7.7946, places=3)
+        self.assertAlmostEqual(metrics["convexity"][0], 73.63, places=1)
+        self.assertEqual(metrics["accrued_pct"][0], 0.0)
+        self.assertTrue(np.isnan(metrics["ytm"][2]))  # 만기 경과
+
+    def test_discount_bond_and_accrued(self):
+        """
+        Below-par prices give yields above the coupon; accrued interest follows the coupon period.
+        """
+        metrics = bond_metrics([4.0], [98.0], [2.25])  # 직전 이표일 후 3개월
+        self.assertGreater(metrics["ytm"][0], 4.0)
+        self.assertAlmostEqual(metrics["accrued_pct"][0], 1.0)
+
+    def test_bonds_list_uses_cache(self):
+        """
+        bonds_list shows analytics and reuses cached results while the price is unchanged.
+        """
+        user = User.objects.create_user(username="owner", password="pw", nickname="Owner")
+        self.client.login(username="owner", password="pw")
+        _, _, bonds = make_holdings(user)
+        with patch("apps.tm_assets.bond_analytics.bond_metrics", wraps=bond_metrics) as solver:
+            response = self.client.get(reverse("tm_assets:bonds_list"))
+            self.client.get(reverse("tm_assets:bonds_list"))
+            self.assertEqual(solver.call_count, 1)
+            self.assertIsNotNone(response.context["bonds"][0].ytm)
+            self.assertContains(response, "YTM(%)")
+
+            bonds[0].current_price_pct = Decimal("97.000")
+            bonds[0].save()
+            response = self.client.get(reverse("tm_assets:bonds_list"))
+            self.assertEqual(solver.call_count, 2)
+        self.assertGreater(response.context["bonds"][0].ytm, 3.2)
+
+
+class KrxSnapshotTest(TestCase):
+    """
+    Tests for pricing KR holdings from per-day KRX market snapshots.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="pw", nickname="Owner")
+        _, self.stocks, _ = make_holdings(self.user)
+        self.missing = StockHolding.objects.create(
+            user=self.user, market=Market.KR, ticker="999999", name="상장폐지",
+            quantity=Decimal("1"), average_price=Decimal("1000"),
+        )
+        self.today = timezone.localdate()
+        self.start = self.today - timedelta(days=5)
+        StockPriceHistory.objects.create(
+            stock=self.stocks[0], price=Decimal("70000"),
+            recorded_at=timezone.make_aware(datetime.combine(self.start, datetime.min.time())),
+        )
+        snapshots = patch.dict("apps.tm_assets.pricing._krx_snapshots", clear=True)
+        snapshots.start()
+        self.addCleanup(snapshots.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = self.settings(PRICE_STORE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    @staticmethod
+    def market(day):
+        return pd.DataFrame(
+            {"시가": [1.0, 1.0], "종가": [70000.0 + day.day, 180000.0]},
+            index=pd.Index(["005930", "000660"], name="티커"),
+        )
+
+    def test_kr_holdings_priced_from_snapshots(self):
+        """
+        One snapshot per weekday prices KR holdings; US names and misses fall back to per-ticker fetches.
+        """
+        # 가격 이력이 없는 종목이 있어 INITIAL_LOOKBACK_DAYS 전부터 필요
+        first = self.today - timedelta(days=INITIAL_LOOKBACK_DAYS)
+        days = [first + timedelta(days=n) for n in range(INITIAL_LOOKBACK_DAYS + 1)]
+        weekdays = [d for d in days if d.weekday() < 5]
+        with patch("apps.tm_assets.pricing.fetch_krx_snapshot", side_effect=self.market) as fetch_krx, \
+                patch("apps.tm_assets.pricing.fetch_stock_bars", return_value=closes(190.0)) as fetch_stock:
+            result = refresh_holdings(stocks=StockHolding.objects.all())
+            self.assertEqual(sorted(c.args[0] for c in fetch_krx.call_args_list), weekdays)
+            self.assertEqual(sorted(c.args[0] for c in fetch_stock.call_args_list), ["999999", "AAPL"])
+            self.assertEqual(
+                (result.krx_days_fetched, result.tickers_fetched, result.stocks_updated), (len(weekdays), 2, 3)
+            )
+
+            samsung = StockHolding.objects.get(pk=self.stocks[0].pk)
+            self.assertEqual(samsung.current_price, Decimal(70000 + weekdays[-1].day))
+            sources = set(samsung.price_history.exclude(recorded_at__date=self.start).values_list("source", flat=True))
+            self.assertEqual(sources, {"KRX"})
+            self.assertEqual(samsung.price_history.count(), 1 + len([d for d in weekdays if d > self.start]))
+
+            # 매칭된 종가는 가격 저장소에도 쌓임
+            bars = price_store.read_bars("KRX", "005930")
+            self.assertEqual(bars["date"].astype(object).tolist(), weekdays)
+            self.assertEqual(bars["close"][-1], 70000.0 + weekdays[-1].day)
+            self.assertEqual(price_store.read_bars("KRX", "000660").size, 0)
+
+            # 지난 거래일 시세표는 프로세스 안에서 재사용, 당일 표는 KRX_TODAY_TTL 동안만
+            fetch_krx.reset_mock()
+            refresh_holdings(stocks=StockHolding.objects.filter(market=Market.KR))
+            self.assertEqual(fetch_krx.call_count, 0)
+            with patch("apps.tm_assets.pricing.KRX_TODAY_TTL", 0):
+                refresh_holdings(stocks=StockHolding.objects.filter(market=Market.KR))
+            self.assertEqual([c.args[0] for c in fetch_krx.call_args_list], [d for d in weekdays if d == self.today])
+
+    def test_no_new_trading_day_is_a_no_op(self):
+        """
+        With no weekday since the start, only tickers missing from the last trading day's table fall back.
+        """
+        sunday = self.today + timedelta(days=6 - self.today.weekday())
+        saturday, friday = sunday - timedelta(days=1), sunday - timedelta(days=2)
+        with patch("apps.tm_assets.pricing.timezone.localdate", return_value=sunday), \
+                patch("apps.tm_assets.pricing.fetch_krx_snapshot", side_effect=self.market) as fetch_krx:
+            quotes, misses, _ = fetch_kr_stock_quotes({"005930": saturday, "999999": saturday})
+        self.assertEqual(quotes, {})
+        self.assertEqual(misses, {"999999": saturday})
+        self.assertEqual([c.args[0] for c in fetch_krx.call_args_list], [friday])
+
+    def test_intraday_snapshot_is_refetched_after_close(self):
+        """
+        A table cached while its day was today is fetched again once the day has passed.
+        """
+        with patch("apps.tm_assets.pricing.fetch_krx_snapshot", side_effect=self.market) as fetch_krx:
+            krx_snapshots([self.today])
+            with patch("apps.tm_assets.pricing.timezone.localdate", return_value=self.today + timedelta(days=1)):
+                krx_snapshots([self.today])
+                krx_snapshots([self.today])
+        self.assertEqual(fetch_krx.call_count, 2)
+
+    def test_falls_back_when_snapshot_unavailable(self):
+        """
+        Without KRX data every ticker is fetched individually.
+        """
+        with patch("apps.tm_assets.pricing.fetch_krx_snapshot", return_value=None), \
+                patch("apps.tm_assets.pricing.fetch_stock_bars", return_value=closes(80000.0)) as fetch_stock:
+            result = refresh_holdings(stocks=StockHolding.objects.all())
+        self.assertEqual(fetch_stock.call_count, 3)
+        self.assertEqual(result.stocks_updated, 3)
+
+
+class ViewCacheTest(TestCase):
+    """
+    Tests for the per-user page context cache and its invalidation.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="owner", password="pw", nickname="Owner")
+        self.other = User.objects.create_user(username="other", password="pw", nickname="Other")
+        _, self.stocks, _ = make_holdings(self.user)
+        make_holdings(self.other)
+        self.client.login(username="owner", password="pw")
+        self.url = reverse("tm_assets:stocks_list")
+
+    def builds(self):
+        return patch("apps.tm_assets.views._stocks_list_context", wraps=views._stocks_list_context)
+
+    def test_repeat_visits_hit_cache(self):
+        """
+        Repeat visits reuse the cached context; the query param variant is cached separately.
+        """
+        with self.builds() as build:
+            self.client.get(self.url)
+            response = self.client.get(self.url)
+            self.assertEqual(build.call_count, 1)
+            self.assertEqual(len(response.context["stocks"]), 2)
+            self.client.get(self.url, {"base": "USD"})
+            self.assertEqual(build.call_count, 2)
+
+    def test_changes_invalidate_only_the_owner(self):
+        """
+        Holding saves/deletes, new history rows and bulk refreshes rebuild the owner's pages only.
+        """
+        with self.builds() as build:
+            self.client.get(self.url)
+            stock = self.stocks[0]
+            stock.quantity = Decimal("20")
+            stock.save()
+            self.assertEqual(self.client.get(self.url).context["total"], 20 * 75000)  # USD 종목은 환율 없음
+            StockPriceHistory.objects.create(stock=stock, price=Decimal("76000"))
+            self.client.get(self.url)
+            self.stocks[1].delete()
+            self.assertEqual(len(self.client.get(self.url).context["stocks"]), 1)
+            self.assertEqual(build.call_count, 4)
+
+            other_stock = StockHolding.objects.filter(user=self.other).first()
+            other_stock.quantity = Decimal("1")
+            other_stock.save()
+            self.client.get(self.url)
+            self.assertEqual(build.call_count, 4)
+
+            with override_settings(PRICE_KRX_SNAPSHOT=False), \
+                    patch("apps.tm_assets.pricing.fetch_stock_bars", return_value=closes(80000.0)):
+                refresh_holdings(stocks=StockHolding.objects.filter(user=self.user))
+            self.assertEqual(self.client.get(self.url).context["stocks"][0].current_price, Decimal("80000"))
+            self.assertEqual(build.call_count, 5)
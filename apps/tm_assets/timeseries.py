@@ -0,0 +1,174 @@
+"""
+포트폴리오 평가액 시계열.
+
+세 이력 테이블(주식 가격 / 채권 가격 / 예적금 평가액)에서 기간 내 행을 읽어
+보유자산별 일별 마지막 값으로 맞춘 뒤 빈 날은 직전 값으로 채우고(ffill) 자산군별로 합산한다.
+기간 시작 이전의 마지막 값도 함께 읽어 첫날부터 값이 이어지게 한다.
+이력이 하나도 없는 보유자산은 시계열에 포함되지 않는다.
+합산 전에 캐시된 최신 환율로 기준 통화로 환산하며, 환율이 없는 통화의 보유자산은 제외하고
+제외된 통화를 missing_rates 로 알려 준다.
+
+여러 해 구간도 화면에는 수백 개 점이면 충분하므로 LTTB(Largest-Triangle-Three-Buckets)로
+합계 곡선의 모양을 유지하는 점만 골라 보내고, 자산군별 곡선도 같은 날짜로 맞춘다.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .fx import base_currency, conversion_factors
+from .models import BondHolding, BondPriceHistory, DepositSaving, DepositValueHistory, StockHolding, StockPriceHistory
+from .valuation import ASSET_CLASSES
+
+DEFAULT_POINTS = 300
+MAX_POINTS = 2000
+# 조회 가능 구간: pandas Timestamp 범위 안쪽 + 최대 기간(일)
+MIN_DATE = date(1900, 1, 1)
+MAX_DATE = date(2200, 12, 31)
+MAX_SPAN_DAYS = 3660
+
+# 자산군 → (보유자산 모델, 이력 모델, 이력 FK, 이력 값 필드)
+_SOURCES = {
+    "CASH": (DepositSaving, DepositValueHistory, "deposit", "value"),
+    "STOCK": (StockHolding, StockPriceHistory, "stock", "price"),
+    "BOND": (BondHolding, BondPriceHistory, "bond", "price_pct"),
+}
+
+
+def lttb(x, y, threshold) -> np.ndarray:
+    """
+    LTTB 다운샘플링. 선택된 점의 인덱스 배열 반환 (첫/마지막 점은 항상 포함).
+    x, y: 같은 길이의 1차원 float 배열 (x 오름차순)
+    """
+    n = len(x)
+    if threshold >= n or n < 3:
+        return np.arange(n)
+    threshold = max(threshold, 3)
+
+    every = (n - 2) / (threshold - 2)  # 첫/마지막 점 사이를 threshold-2 개 버킷으로
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        # 다음 버킷의 평균점 (마지막 버킷이면 마지막 점)
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # 직전 선택점 a, 버킷 후보, 다음 버킷 평균점이 이루는 삼각형 넓이가 최대인 후보
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+@dataclass
+class ValueSeries:
+    dates: list = field(default_factory=list)
+    total: list = field(default_factory=list)
+    by_class: dict = field(default_factory=dict)
+    raw_points: int = 0
+    currency: str = ""
+    # 환율이 없어 합계에서 빠진 통화 (비어 있지 않으면 합계가 불완전)
+    missing_rates: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "currency": self.currency,
+            "missing_rates": self.missing_rates,
+            "dates": self.dates,
+            "total": self.total,
+            "series": self.by_class,
+            "raw_points": self.raw_points,
+            "points": len(self.dates),
+        }
+
+
+def _class_frame(user, asset_class, start_at, end_at, base, missing) -> pd.DataFrame:
+    """
+    자산군 1개의 (날짜, 보유자산) 값 행. 주식은 수량, 채권은 액면/100 을 곱해 평가액으로,
+    여기에 통화별 환산 계수를 곱해 기준 통화(base) 금액으로. 환율이 없는 통화는 missing(set)에 추가.
+    """
+    holding_model, history_model, fk, value_field = _SOURCES[asset_class]
+    holdings = holding_model.objects.filter(user=user)
+    if asset_class == "STOCK":
+        held = [(pk, cur, float(q)) for pk, cur, q in holdings.values_list("pk", "currency", "quantity")]
+    elif asset_class == "BOND":
+        held = [(pk, cur, float(face) / 100) for pk, cur, face in holdings.values_list("pk", "currency", "face_amount")]
+    else:
+        held = [(pk, cur, 1.0) for pk, cur in holdings.values_list("pk", "currency")]
+    factors = conversion_factors([cur for _, cur, _ in held], base)
+    # 환율이 없는 통화의 보유자산은 제외
+    weights = {pk: w * f for (pk, _, w), f in zip(held, factors.tolist()) if not np.isnan(f)}
+    missing.update(cur for (_, cur, _), f in zip(held, factors.tolist()) if np.isnan(f))
+    if not weights:
+        return pd.DataFrame(columns=["at", "day", "holding", "value"])
+
+    rows = list(
+        history_model.objects.filter(
+            **{f"{fk}__in": list(weights)}, recorded_at__gte=start_at, recorded_at__lt=end_at
+        ).values_list("recorded_at", f"{fk}_id", value_field)
+    )
+    # 기간 시작 직전 값 (보유자산별 1행)
+    before = history_model.objects.filter(**{fk: OuterRef("pk")}, recorded_at__lt=start_at).order_by(
+        "-recorded_at", "-id"
+    )
+    seeds = holdings.filter(pk__in=list(weights)).annotate(
+        seed_value=Subquery(before.values(value_field)[:1]),
+    ).exclude(seed_value=None).values_list("pk", "seed_value")
+    rows = [(at, timezone.localtime(at).date(), pk, value) for at, pk, value in rows]
+    rows += [(start_at - timedelta(microseconds=1), start_at.date(), pk, value) for pk, value in seeds]
+    if not rows:
+        return pd.DataFrame(columns=["at", "day", "holding", "value"])
+
+    df = pd.DataFrame(rows, columns=["at", "day", "holding", "value"])
+    df["value"] = df["value"].astype(float) * df["holding"].map(weights).astype(float)
+    return df
+
+
+def check_range(start, end):
+    """조회 구간 검사. 범위 밖/역순/MAX_SPAN_DAYS 초과면 ValueError."""
+    if not (MIN_DATE <= start <= end <= MAX_DATE):
+        raise ValueError(f"start/end must satisfy {MIN_DATE} <= start <= end <= {MAX_DATE}")
+    if (end - start).days > MAX_SPAN_DAYS:
+        raise ValueError(f"range must not exceed {MAX_SPAN_DAYS} days")
+
+
+def value_series(user, start, end, points=DEFAULT_POINTS, base=None) -> ValueSeries:
+    """start~end(포함, date) 일별 평가액 시계열(기준 통화 base)을 points 개 이하로 줄여 반환."""
+    check_range(start, end)
+    base = base or base_currency()
+    tz = timezone.get_current_timezone()
+    start_at = timezone.make_aware(datetime.combine(start, time.min), tz)
+    end_at = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+    days = pd.date_range(start, end, freq="D").date
+
+    columns, missing = {}, set()
+    for asset_class in ASSET_CLASSES:
+        df = _class_frame(user, asset_class, start_at, end_at, base, missing)
+        if df.empty:
+            columns[asset_class] = np.zeros(len(days))
+            continue
+        # 보유자산별 그날 마지막 값 → 전체 날짜로 펼쳐 직전 값으로 채움 → 합산
+        daily = (
+            df.sort_values("at")
+            .groupby(["day", "holding"])["value"].last()
+            .unstack("holding")
+            .reindex(days)
+            .ffill()
+        )
+        columns[asset_class] = daily.sum(axis=1, min_count=1).fillna(0.0).to_numpy()
+
+    total = np.sum([columns[c] for c in ASSET_CLASSES], axis=0) if len(days) else np.zeros(0)
+    idx = lttb(np.arange(len(days), dtype=np.float64), total, points)
+    return ValueSeries(
+        dates=[days[i].isoformat() for i in idx],
+        total=np.round(total[idx], 2).tolist(),
+        by_class={c: np.round(columns[c][idx], 2).tolist() for c in ASSET_CLASSES},
+        raw_points=len(days),
+        currency=base,
+        missing_rates=sorted(missing),
+    )
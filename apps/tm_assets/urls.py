@@ -20,5 +20,7 @@ urlpatterns = [
     path("bonds/<int:pk>/edit/", views.edit_bond, name="edit_bond"),
     path("bonds/<int:pk>/delete/", views.delete_bond, name="delete_bond"),
     path("refresh/", views.refresh_prices, name="refresh_prices"),
+    path("refresh/<int:pk>/status/", views.refresh_status, name="refresh_status"),
+    path("api/value-series/", views.value_series_api, name="value_series"),
     path("test/", views.test_view, name="test_view"),
 ]
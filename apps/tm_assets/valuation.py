@@ -0,0 +1,207 @@
+"""
+보유자산 일괄 평가 엔진.
+
+사용자의 예적금/주식/채권을 자산군별 쿼리 1회로 읽어 컬럼 배열(NumPy)로 옮긴 뒤,
+평가액 · 자산군별 합계 · 통화별 합계를 벡터 연산 한 번으로 계산한다.
+계산 결과는 각 인스턴스의 ``est_value`` 속성에도 붙여 두어 템플릿이 그대로 읽는다.
+계산식은 모델의 ``estimated_value()`` 와 동일하다.
+쿼리셋이 ``with_last_change()`` 로 주석 처리되어 있으면 자산군별 변동 합계도 함께 계산한다.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+
+import numpy as np
+from django.utils import timezone
+
+from .fx import conversion_factors
+from .models import BondHolding, Compounding, DepositSaving, StockHolding
+
+ASSET_CLASSES = ("CASH", "STOCK", "BOND")
+
+# 복리 주기별 (기간 일수, 연간 복리 횟수) — DepositSaving.estimated_value 와 동일한 근사
+_COMPOUNDING_PERIODS = {
+    Compounding.MONTHLY: (30, 12),
+    Compounding.QUARTERLY: (91, 4),
+    Compounding.ANNUALLY: (365, 1),
+}
+
+
+def _floats(values) -> np.ndarray:
+    """Decimal/None 시퀀스를 float 배열로 변환 (None → NaN)."""
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _dates(values) -> np.ndarray:
+    return np.array([np.datetime64("NaT") if v is None else v for v in values], dtype="datetime64[D]")
+
+
+def deposit_values(principal, annual_rate, compounding, start, maturity, manual, as_of: date) -> np.ndarray:
+    """
+    예적금 평가액 벡터 계산.
+    - principal / annual_rate / manual: float 배열 (manual 은 미입력 시 NaN)
+    - compounding: Compounding 값 배열
+    - start / maturity: datetime64[D] 배열 (maturity 미입력 시 NaT)
+    """
+    as_of64 = np.datetime64(as_of, "D")
+    end = np.where(np.isnat(maturity), as_of64, np.minimum(maturity, as_of64))
+    days = (end - start).astype(np.int64)
+    rate = annual_rate / 100.0
+
+    # 단리
+    values = np.round(principal * (1 + rate * (days / 365.0)), 2)
+
+    # 복리 근사 (주기별 기간 수는 내림)
+    for kind, (period_days, per_year) in _COMPOUNDING_PERIODS.items():
+        mask = compounding == kind
+        if mask.any():
+            periods = np.maximum(0, days[mask] // period_days)
+            compounded = principal[mask] * (1 + rate[mask] / per_year) ** periods
+            values[mask] = np.round(compounded, 2)
+
+    values = np.where(days <= 0, principal, values)
+    return np.where(np.isnan(manual), values, manual)
+
+
+def stock_values(quantity, average_price, current_price) -> np.ndarray:
+    price = np.where(np.isnan(current_price), average_price, current_price)
+    return price * quantity
+
+
+def bond_values(face_amount, purchase_price_pct, current_price_pct) -> np.ndarray:
+    price_pct = np.where(np.isnan(current_price_pct), purchase_price_pct, current_price_pct)
+    return face_amount * (price_pct / 100)
+
+
+def _last_deltas(objs) -> np.ndarray:
+    """with_last_change() 주석(last_price/prev_price)으로 최근 변동값 배열 계산 (없으면 0)."""
+    last = _floats(getattr(o, "last_price", None) for o in objs)
+    prev = _floats(getattr(o, "prev_price", None) for o in objs)
+    return np.nan_to_num(last - prev)
+
+
+@dataclass
+class PortfolioValuation:
+    deposits: list = field(default_factory=list)
+    stocks: list = field(default_factory=list)
+    bonds: list = field(default_factory=list)
+    class_totals: dict = field(default_factory=dict)
+    currency_totals: dict = field(default_factory=dict)
+    # {자산군: {통화: 변동 합계}} — 통화가 다른 변동은 더하지 않는다
+    change_sums: dict = field(default_factory=dict)
+    class_currency_totals: dict = field(default_factory=dict)
+    # base_currency 를 지정해 평가한 경우에만 채워짐
+    base_currency: str = ""
+    base_class_totals: dict = field(default_factory=dict)
+    base_change_sums: dict = field(default_factory=dict)
+    # 환율이 없어 기준 통화 합계에서 제외된 통화
+    missing_rates: list = field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        return sum(self.class_totals.values())
+
+
+def _by_currency(objs, values) -> dict:
+    """보유자산별 값 배열을 {통화: 합계} 로 묶음."""
+    by_currency = {}
+    for obj, val in zip(objs, values.tolist()):
+        by_currency[obj.currency] = by_currency.get(obj.currency, 0.0) + val
+    return by_currency
+
+
+def _attach(objs, values):
+    for obj, val in zip(objs, values.tolist()):
+        obj.est_value = val
+
+
+def value_holdings(deposits, stocks, bonds, as_of=None, base_currency=None) -> PortfolioValuation:
+    """이미 로드된 보유자산 목록을 한 번에 평가.
+    base_currency 를 주면 캐시된 최신 환율로 각 인스턴스에 ``base_value`` 도 붙인다 (환율 없으면 None).
+    """
+    as_of = as_of or timezone.localdate()
+    deposits, stocks, bonds = list(deposits), list(stocks), list(bonds)
+
+    d_vals = deposit_values(
+        _floats(d.principal_amount for d in deposits),
+        _floats(d.annual_rate for d in deposits),
+        np.array([d.compounding for d in deposits], dtype=object),
+        _dates(d.start_date for d in deposits),
+        _dates(d.maturity_date for d in deposits),
+        _floats(d.current_value_manual for d in deposits),
+        as_of,
+    )
+    s_vals = stock_values(
+        _floats(s.quantity for s in stocks),
+        _floats(s.average_price for s in stocks),
+        _floats(s.current_price for s in stocks),
+    )
+    b_vals = bond_values(
+        _floats(b.face_amount for b in bonds),
+        _floats(b.purchase_price_pct for b in bonds),
+        _floats(b.current_price_pct for b in bonds),
+    )
+    _attach(deposits, d_vals)
+    _attach(stocks, s_vals)
+    _attach(bonds, b_vals)
+
+    # 통화별 합계: 세 자산군을 이어 붙여 통화 코드별 bincount
+    values = np.concatenate([d_vals, s_vals, b_vals])
+    currencies = np.array([o.currency for o in (*deposits, *stocks, *bonds)], dtype=object)
+    currency_totals = {}
+    if values.size:
+        codes, idx = np.unique(currencies.astype(str), return_inverse=True)
+        sums = np.bincount(idx, weights=values)
+        currency_totals = dict(zip(codes.tolist(), sums.tolist()))
+
+    class_totals = dict(zip(ASSET_CLASSES, (float(d_vals.sum()), float(s_vals.sum()), float(b_vals.sum()))))
+
+    # 자산군·통화별 합계 (기준 통화 환산용)
+    class_currency_totals = {
+        asset_class: _by_currency(objs, vals)
+        for asset_class, objs, vals in zip(ASSET_CLASSES, (deposits, stocks, bonds), (d_vals, s_vals, b_vals))
+    }
+
+    # 평가액 기준 변동: 예적금은 평가액 변동, 주식은 가격변동*수량, 채권은 액면총액*(변동%/100)
+    changes = (
+        _last_deltas(deposits),
+        _last_deltas(stocks) * _floats(s.quantity for s in stocks),
+        _last_deltas(bonds) * _floats(b.face_amount for b in bonds) / 100.0,
+    )
+    change_sums = {
+        asset_class: _by_currency(objs, c)
+        for asset_class, objs, c in zip(ASSET_CLASSES, (deposits, stocks, bonds), changes)
+    }
+    valuation = PortfolioValuation(
+        deposits, stocks, bonds, class_totals, currency_totals, change_sums, class_currency_totals
+    )
+
+    if base_currency:
+        # 보유자산 전체를 환산 계수 배열 곱 한 번으로 기준 통화로 변환
+        factors = conversion_factors(currencies, base_currency)
+        base_vals = values * factors
+        sizes = np.cumsum([len(deposits), len(stocks)])
+        for objs, part in zip((deposits, stocks, bonds), np.split(base_vals, sizes)):
+            for obj, val in zip(objs, part.tolist()):
+                obj.base_value = None if np.isnan(val) else val
+        valuation.base_currency = base_currency
+        valuation.base_class_totals = {
+            c: float(np.nansum(part)) for c, part in zip(ASSET_CLASSES, np.split(base_vals, sizes))
+        }
+        # 변동도 같은 계수로 환산 (환율 없는 통화는 제외)
+        base_changes = np.concatenate(changes) * factors
+        valuation.missing_rates = sorted(set(currencies[np.isnan(factors)].astype(str).tolist()))
+        valuation.base_change_sums = {
+            c: float(np.nansum(part)) for c, part in zip(ASSET_CLASSES, np.split(base_changes, sizes))
+        }
+    return valuation
+
+
+def value_portfolio(user, as_of=None) -> PortfolioValuation:
+    """사용자의 전체 보유자산을 자산군별 쿼리 1회씩으로 읽어 평가."""
+    return value_holdings(
+        DepositSaving.objects.filter(user=user).with_last_change().order_by("-created_at"),
+        StockHolding.objects.filter(user=user).with_last_change().order_by("-created_at"),
+        BondHolding.objects.filter(user=user).with_last_change().order_by("-created_at"),
+        as_of=as_of,
+    )
@@ -0,0 +1,57 @@
+"""
+자산 화면(포트폴리오/자산비율/예적금·주식·채권 목록) 컨텍스트의 사용자별 캐시.
+
+키에 사용자별 버전 토큰과 전체 버전 토큰을 넣어 두고, 데이터가 바뀌면 토큰만 새로 발급해
+이전 캐시를 한 번에 무효화한다 (키 삭제 없이 자연 만료).
+- 사용자 토큰: 보유자산 저장/삭제, 이력 추가 시그널과 일괄 갱신 파이프라인에서 갱신
+- 전체 토큰: 환율 갱신, 이력 정리처럼 모든 사용자 화면에 영향을 주는 작업에서 갱신
+예적금 평가액은 날짜에 따라 달라지므로 키에 기준일도 포함한다.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+DEFAULT_TIMEOUT = 60 * 10
+
+_GLOBAL_TOKEN = "tm_assets:views:token"
+
+
+def _user_token_key(user_id):
+    return f"tm_assets:views:token:{user_id}"
+
+
+def _new_token():
+    return str(time.time_ns())
+
+
+def _tokens(user_id):
+    """(사용자 토큰, 전체 토큰). 없으면(만료/축출 포함) 새로 발급 — 이전 키와 겹치지 않음."""
+    keys = [_user_token_key(user_id), _GLOBAL_TOKEN]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _new_token(), None)
+            found[key] = cache.get(key)
+    return found[keys[0]], found[keys[1]]
+
+
+def invalidate_user(*user_ids):
+    cache.set_many({_user_token_key(uid): _new_token() for uid in user_ids}, None)
+
+
+def invalidate_all():
+    cache.set(_GLOBAL_TOKEN, _new_token(), None)
+
+
+def cached_context(user, page, build, variant=""):
+    """page 컨텍스트를 캐시에서 읽고, 없으면 build() 결과를 저장해 반환."""
+    user_token, global_token = _tokens(user.pk)
+    key = f"tm_assets:views:{page}:{user.pk}:{variant}:{timezone.localdate()}:{user_token}:{global_token}"
+    context = cache.get(key)
+    if context is None:
+        context = build()
+        cache.set(key, context, getattr(settings, "TM_ASSETS_VIEW_CACHE_TIMEOUT", DEFAULT_TIMEOUT))
+    return context
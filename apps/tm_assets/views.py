@@ -2,58 +2,59 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.shortcuts import redirect, render
 from django.urls import reverse
-from django.http import HttpResponseForbidden, HttpResponseNotAllowed
+from django.utils import timezone
+from django.http import HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse
 
 import json
+from datetime import date, timedelta
 
 from .forms import DepositSavingForm, StockHoldingForm, BondHoldingForm
 from .models import (
+    BondHolding,
+    Currency,
     DepositSaving,
+    PriceRefreshJob,
     StockHolding,
-    BondHolding,
-    DepositValueHistory,
-    stock_last_change,
-    bond_last_change,
-    deposit_last_change,
 )
+from . import fx
+from .bond_analytics import analyze_bonds
+from .jobs import as_seen, current_job, enqueue_refresh
+from .summary import get_summary
+from .timeseries import DEFAULT_POINTS, MAX_POINTS, check_range, value_series
+from .valuation import value_holdings, value_portfolio
+from .view_cache import cached_context
+
+
+def _base_currency(request):
+    """?base=USD 처럼 지정한 기준 통화 (없거나 잘못되면 settings.BASE_CURRENCY)."""
+    base = request.GET.get("base", "").upper()
+    return base if base in Currency.values else fx.base_currency()
+
+
+def _portfolio_context(user, base):
+    valuation = value_portfolio(user)
+    # 합계는 요약 테이블 1행에서 읽고, 캐시된 최신 환율로 기준 통화 환산
+    summary = get_summary(user)
+    class_totals, currency_totals, missing_rates = fx.to_base(summary.class_currency_totals, base)
+    return {
+        "deposits": valuation.deposits,
+        "stocks": valuation.stocks,
+        "bonds": valuation.bonds,
+        "totals_by_currency": currency_totals,
+        "class_totals": class_totals,
+        "base_currency": base,
+        "missing_rates": missing_rates,
+    }
 
 
 @login_required
 def portfolio_index(request):
-    deposits = DepositSaving.objects.filter(user=request.user).order_by("-created_at")
-    stocks = StockHolding.objects.filter(user=request.user).order_by("-created_at")
-    bonds = BondHolding.objects.filter(user=request.user).order_by("-created_at")
-
-    # 통화별 합계 계산 (간단 집계)
-    def add_c(map_, currency, amount):
-        map_[currency] = map_.get(currency, 0) + float(amount)
-
-    totals_by_currency = {}
-    class_totals = {"CASH": 0.0, "STOCK": 0.0, "BOND": 0.0}
+    base = _base_currency(request)
+    context = cached_context(request.user, "portfolio", lambda: _portfolio_context(request.user, base), base)
 
-    for d in deposits:
-        val = d.estimated_value()
-        add_c(totals_by_currency, d.currency, val)
-        class_totals["CASH"] += float(val)
-
-    for s in stocks:
-        val = s.estimated_value()
-        add_c(totals_by_currency, s.currency, val)
-        class_totals["STOCK"] += float(val)
-
-    for b in bonds:
-        val = b.estimated_value()
-        add_c(totals_by_currency, b.currency, val)
-        class_totals["BOND"] += float(val)
-
-    context = {
-        "deposits": deposits,
-        "stocks": stocks,
-        "bonds": bonds,
-        "totals_by_currency": totals_by_currency,
-        "class_totals": class_totals,
-    }
-    return render(request, "tm_assets/portfolio.html", context)
+    # 진행 중인 가격 새로고침 작업 (있으면 화면에서 상태 폴링) 또는 최근 실패 안내 — 캐시하지 않음
+    refresh_job = current_job(request.user)
+    return render(request, "tm_assets/portfolio.html", {**context, "refresh_job": refresh_job})
 
 
 @login_required
@@ -196,39 +197,59 @@ def delete_bond(request, pk):
 
 @login_required
 def refresh_prices(request):
-    updated_s = updated_b = 0
-    for s in StockHolding.objects.filter(user=request.user):
-        if s.update_price_via_fdr():
-            updated_s += 1
-    for b in BondHolding.objects.filter(user=request.user):
-        if b.update_price_via_pykrx():
-            updated_b += 1
-    # 예적금은 평가액 스냅샷 저장
-    deposits = DepositSaving.objects.filter(user=request.user)
-    now = None
-    for d in deposits:
-        val = d.estimated_value()
-        try:
-            # 같은 시각 중복 저장 방지까지는 두지 않음(간단 구현)
-            DepositValueHistory.objects.create(deposit=d, value=val)
-        except Exception:
-            pass
-    messages.info(request, f"가격 업데이트 완료 - 주식 {updated_s} / 채권 {updated_b}")
+    # 작업만 등록하고 바로 응답 (run_price_worker 가 처리, 포트폴리오 화면이 상태를 폴링)
+    enqueue_refresh(request.user)
+    messages.info(request, "가격 업데이트를 시작했습니다. 완료되면 화면이 갱신됩니다.")
     return redirect(reverse("tm_assets:portfolio"))
 
 
-# ----- New pages: allocation + details -----
+@login_required
+def refresh_status(request, pk):
+    try:
+        job = as_seen(PriceRefreshJob.objects.get(pk=pk, user=request.user))
+    except PriceRefreshJob.DoesNotExist:
+        return HttpResponseForbidden()
+    return JsonResponse({
+        "id": job.pk,
+        "status": job.status,
+        "progress": job.progress,
+        "done": not job.is_active,
+        "stocks_updated": job.stocks_updated,
+        "bonds_updated": job.bonds_updated,
+        "error": job.error,
+    })
+
 
 @login_required
-def allocation(request):
-    deposits = DepositSaving.objects.filter(user=request.user)
-    stocks = StockHolding.objects.filter(user=request.user)
-    bonds = BondHolding.objects.filter(user=request.user)
+def value_series_api(request):
+    """
+    평가액 시계열 JSON. ?start=YYYY-MM-DD&end=YYYY-MM-DD&points=N&base=USD
+    기본 구간은 최근 1년, points 는 최대 MAX_POINTS. 구간은 MIN_DATE~MAX_DATE, 최대 MAX_SPAN_DAYS 일.
+    """
+    try:
+        end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else timezone.localdate()
+        start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else end - timedelta(days=365)
+        points = int(request.GET.get("points", DEFAULT_POINTS))
+        check_range(start, end)
+    except (ValueError, OverflowError) as exc:
+        return JsonResponse({"error": f"invalid start/end/points: {exc}"}, status=400)
+    if points < 1:
+        return JsonResponse({"error": "invalid start/end/points"}, status=400)
+
+    series = value_series(request.user, start, end, points=min(points, MAX_POINTS), base=_base_currency(request))
+    return JsonResponse({"start": start.isoformat(), "end": end.isoformat(), **series.as_dict()})
+
+
+# ----- New pages: allocation + details -----
+
+def _allocation_context(user, base):
+    summary = get_summary(user)
+    base_class_totals, base_currency_totals, missing_rates = fx.to_base(summary.class_currency_totals, base)
 
     class_totals = {
-        "예적금": sum(float(d.estimated_value()) for d in deposits),
-        "주식": sum(float(s.estimated_value()) for s in stocks),
-        "채권": sum(float(b.estimated_value()) for b in bonds),
+        "예적금": base_class_totals["CASH"],
+        "주식": base_class_totals["STOCK"],
+        "채권": base_class_totals["BOND"],
     }
     total_sum = sum(class_totals.values()) or 0.0
     if total_sum > 0:
@@ -241,16 +262,10 @@ def allocation(request):
         for k in ["예적금", "주식", "채권"]
     ]
 
-    # 통화별 비중도 함께 제공
-    currency_totals = {}
-    for d in deposits:
-        currency_totals[d.currency] = currency_totals.get(d.currency, 0.0) + float(d.estimated_value())
-    for s in stocks:
-        currency_totals[s.currency] = currency_totals.get(s.currency, 0.0) + float(s.estimated_value())
-    for b in bonds:
-        currency_totals[b.currency] = currency_totals.get(b.currency, 0.0) + float(b.estimated_value())
+    # 통화별 비중도 함께 제공 (금액은 원래 통화, 비중은 기준 통화 환산값 기준)
+    currency_totals = summary.currency_totals
     currency_ratios = (
-        {k: round(v * 100.0 / total_sum, 2) for k, v in currency_totals.items()} if total_sum > 0 else {}
+        {k: round(v * 100.0 / total_sum, 2) for k, v in base_currency_totals.items()} if total_sum > 0 else {}
     )
     currency_items = [
         {"label": k, "ratio": currency_ratios.get(k, 0), "total": v}
@@ -262,13 +277,10 @@ def allocation(request):
     currency_json_labels = json.dumps([i["label"] for i in currency_items], ensure_ascii=False)
     currency_json_data = json.dumps([i["ratio"] for i in currency_items])
 
-    # 변동 합계(간단 합산)
-    cash_change = sum((deposit_last_change(d)[0] or 0.0) for d in deposits)
-    stock_change = sum(((stock_last_change(s)[0] or 0.0) * float(s.quantity)) for s in stocks)
-    bond_change = sum((float(b.face_amount) * (bond_last_change(b)[0] or 0.0) / 100.0) for b in bonds)
-    class_change_sums = {"CASH": cash_change, "STOCK": stock_change, "BOND": bond_change}
+    # 변동 합계도 기준 통화로 환산 (환율 없는 통화는 제외)
+    class_change_sums, _, _ = fx.to_base(summary.change_sums, base)
 
-    context = {
+    return {
         "class_items": class_items,
         "currency_items": currency_items,
         "class_json_labels": class_json_labels,
@@ -277,59 +289,78 @@ def allocation(request):
         "currency_json_data": currency_json_data,
         "class_change_sums": class_change_sums,
         "total_sum": total_sum,
+        "base_currency": base,
+        "missing_rates": missing_rates,
     }
+
+
+@login_required
+def allocation(request):
+    base = _base_currency(request)
+    context = cached_context(request.user, "allocation", lambda: _allocation_context(request.user, base), base)
     return render(request, "tm_assets/allocation.html", context)
 
 
+def _deposits_list_context(user, base):
+    qs = DepositSaving.objects.filter(user=user).with_last_change().order_by("-created_at")
+    valuation = value_holdings(qs, [], [], base_currency=base)
+    return {
+        "deposits": valuation.deposits,
+        "total": valuation.base_class_totals["CASH"],
+        "base_currency": base,
+        # 변동 합계
+        "change_sum": valuation.base_change_sums["CASH"],
+        "missing_rates": valuation.missing_rates,
+    }
+
+
 @login_required
 def deposits_list(request):
-    deposits = DepositSaving.objects.filter(user=request.user).order_by("-created_at")
-    total = sum(float(d.estimated_value()) for d in deposits)
-    # 변동 합계
-    change_sum = 0.0
-    for d in deposits:
-        delta, _ = deposit_last_change(d)
-        if delta is not None:
-            change_sum += float(delta)
-    return render(
-        request,
-        "tm_assets/deposits_list.html",
-        {"deposits": deposits, "total": total, "change_sum": change_sum},
-    )
+    base = _base_currency(request)
+    context = cached_context(request.user, "deposits_list", lambda: _deposits_list_context(request.user, base), base)
+    return render(request, "tm_assets/deposits_list.html", context)
+
+
+def _stocks_list_context(user, base):
+    qs = StockHolding.objects.filter(user=user).with_last_change().order_by("-created_at")
+    valuation = value_holdings([], qs, [], base_currency=base)
+    return {
+        "stocks": valuation.stocks,
+        "total": valuation.base_class_totals["STOCK"],
+        "base_currency": base,
+        # 평가액 기준 변동 = 가격변동 * 수량
+        "change_sum": valuation.base_change_sums["STOCK"],
+        "missing_rates": valuation.missing_rates,
+    }
 
 
 @login_required
 def stocks_list(request):
-    stocks = StockHolding.objects.filter(user=request.user).order_by("-created_at")
-    total = sum(float(s.estimated_value()) for s in stocks)
-    change_sum = 0.0
-    for s in stocks:
-        delta, pct = stock_last_change(s)
-        if delta is not None:
-            # 평가액 기준 변동 = 가격변동 * 수량
-            change_sum += float(delta) * float(s.quantity)
-    return render(
-        request,
-        "tm_assets/stocks_list.html",
-        {"stocks": stocks, "total": total, "change_sum": change_sum},
-    )
+    base = _base_currency(request)
+    context = cached_context(request.user, "stocks_list", lambda: _stocks_list_context(request.user, base), base)
+    return render(request, "tm_assets/stocks_list.html", context)
+
+
+def _bonds_list_context(user, base):
+    qs = BondHolding.objects.filter(user=user).with_last_change().order_by("-created_at")
+    valuation = value_holdings([], [], qs, base_currency=base)
+    # YTM/듀레이션/경과이자 (가격이 그대로인 채권은 캐시 사용)
+    bonds = analyze_bonds(valuation.bonds)
+    return {
+        "bonds": bonds,
+        "total": valuation.base_class_totals["BOND"],
+        "base_currency": base,
+        # 평가액 기준 변동 = 액면총액 * (delta_pct/100)
+        "change_sum": valuation.base_change_sums["BOND"],
+        "missing_rates": valuation.missing_rates,
+    }
 
 
 @login_required
 def bonds_list(request):
-    bonds = BondHolding.objects.filter(user=request.user).order_by("-created_at")
-    total = sum(float(b.estimated_value()) for b in bonds)
-    change_sum = 0.0
-    for b in bonds:
-        delta_pct, _ = bond_last_change(b)
-        if delta_pct is not None:
-            # 평가액 기준 변동 = 액면총액 * (delta_pct/100)
-            change_sum += float(b.face_amount) * float(delta_pct) / 100.0
-    return render(
-        request,
-        "tm_assets/bonds_list.html",
-        {"bonds": bonds, "total": total, "change_sum": change_sum},
-    )
+    base = _base_currency(request)
+    context = cached_context(request.user, "bonds_list", lambda: _bonds_list_context(request.user, base), base)
+    return render(request, "tm_assets/bonds_list.html", context)
 
 
 @login_required
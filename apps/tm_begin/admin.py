@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import NewsItem
+
+
+@admin.register(NewsItem)
+class NewsItemAdmin(admin.ModelAdmin):
+    list_display = ("title", "source", "published_at", "created_at")
+    list_filter = ("source",)
+    search_fields = ("title", "link")
+    date_hierarchy = "published_at"
@@ -3,4 +3,4 @@ from django.apps import AppConfig
 
 class TmBeginConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "tm_begin"
+    name = "apps.tm_begin"
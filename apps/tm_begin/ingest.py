@@ -0,0 +1,103 @@
+"""
+뉴스 수집: Investing.com RSS → NewsItem.
+
+- 이미 저장된 기사(key)는 fetch_rss_many 의 seen 으로 걸러 정리(clean_text/요약 추출)와 이미지 스크랩을 건너뜀
+- 새 기사만 bulk_create(ignore_conflicts) — 두 워커가 동시에 수집해도 중복 행이 생기지 않음
+- 이미지 없이 저장된 최근 기사도 매 수집마다 일부씩 og:image 를 다시 찾아 채움 (캐시·스크랩 상한 공유)
+- 저장 직후 검색 색인(search.index_pending) 생성
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import NewsItem
+from .search import index_pending
+from .utils import news_cache
+from .utils.rss_fetch import fetch_rss_many, resolve_images
+
+# ---- RSS 설정 ----
+INVESTING_FEEDS = [
+    "https://kr.investing.com/rss/news.rss",
+    "https://kr.investing.com/rss/news_14.rss",  # 경제 지표
+    "https://kr.investing.com/rss/news_301.rss", # 외환
+]
+BATCH_SIZE = 500
+# 본문 og:image 스크랩 상한 (수집 1회, 새 기사/기존 기사 각각)
+SCRAPE_LIMIT = 8
+# 이미지 없이 저장된 기사 중 다시 확인할 최근 기사 수와 소요 상한(초)
+IMAGE_RETRY_BATCH = 100
+IMAGE_RETRY_DEADLINE = 10.0
+
+_URL_MAX = NewsItem._meta.get_field("link").max_length
+_TITLE_MAX = NewsItem._meta.get_field("title").max_length
+_PUBLISHED_MAX = NewsItem._meta.get_field("published").max_length
+
+
+def stored_keys(keys):
+    """keys 중 이미 저장된 기사 키 집합."""
+    found = set()
+    for i in range(0, len(keys), BATCH_SIZE):
+        found.update(NewsItem.objects.filter(key__in=keys[i:i + BATCH_SIZE]).values_list("key", flat=True))
+    return found
+
+
+def _to_row(item, now):
+    ts = item["ts"]
+    img = item["img"]
+    return NewsItem(
+        key=item["key"],
+        link=item["link"],
+        title=item["title"][:_TITLE_MAX],
+        summary=item["summary"],
+        published=item["published"][:_PUBLISHED_MAX],
+        published_at=datetime.fromtimestamp(ts, tz=dt_timezone.utc) if ts is not None else now,
+        source=item["source"],
+        img=img if img and len(img) <= _URL_MAX else None,
+    )
+
+
+def backfill_images(store, timings=None):
+    """
+    이미지 없이 저장된 최근 기사(IMAGE_RETRY_BATCH 건)의 og:image 를 캐시/본문 스크랩으로 다시 찾아 저장.
+    이미지 없음으로 확인된 페이지는 캐시에 남아 있는 동안 스크랩하지 않는다. 반환: 이미지를 채운 기사 수
+    """
+    rows = list(NewsItem.objects.filter(img__isnull=True).order_by("-published_at")[:IMAGE_RETRY_BATCH])
+    if not rows:
+        return 0
+    items = resolve_images(
+        [{"link": row.link, "img": None} for row in rows],
+        scrape_limit=SCRAPE_LIMIT,
+        deadline=IMAGE_RETRY_DEADLINE,
+        image_cache=store,
+        timings=timings,
+    )
+    updated = []
+    for row, item in zip(rows, items):
+        if item["img"] and len(item["img"]) <= _URL_MAX:
+            row.img = item["img"]
+            updated.append(row)
+    NewsItem.objects.bulk_update(updated, ["img"], batch_size=BATCH_SIZE)
+    return len(updated)
+
+
+def ingest_news(urls=None, timings=None):
+    """피드를 받아 새 기사만 저장. 반환: 새로 저장한 기사 수 (동시 수집으로 겹친 기사 포함)"""
+    store = news_cache.news_cache()
+    # 이번 수집 전에 저장된 기사만 대상 (새 기사는 아래 fetch_rss_many 에서 스크랩)
+    backfill_images(store)
+    items = fetch_rss_many(
+        urls or INVESTING_FEEDS,
+        limit_per_feed=120,
+        try_scrape_og_image=True,
+        scrape_limit=SCRAPE_LIMIT,
+        timings=timings,
+        feed_cache=store,
+        image_cache=store,
+        seen=stored_keys,
+    )
+    now = timezone.now()
+    rows = [_to_row(item, now) for item in items if item["link"] and len(item["link"]) <= _URL_MAX]
+    NewsItem.objects.bulk_create(rows, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    index_pending()
+    return len(rows)
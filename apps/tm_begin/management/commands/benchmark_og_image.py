@@ -0,0 +1,85 @@
+import glob
+import time
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from apps.tm_begin.utils.rss_fetch import CHUNK_SIZE, extract_meta_image
+
+
+def sample_page(n):
+    """기사 페이지와 비슷한 구조의 예시 HTML (head 의 스크립트/메타 + 긴 본문)."""
+    head = "".join(
+        f'<link rel="preload" href="/static/chunk-{i}.js" as="script">'
+        f'<script>window.__cfg{i} = {{"a": {i}, "b": "{"x" * 200}"}};</script>'
+        for i in range(30)
+    )
+    body = "".join(
+        f'<div class="article-p"><p>{"기사 본문 문단 " * 40}</p><img src="/img/{n}-{i}.jpg"></div>'
+        for i in range(400)
+    )
+    return (
+        '<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8">'
+        f"<title>기사 {n}</title>{head}"
+        f'<meta property="og:title" content="기사 {n}">'
+        f'<meta property="og:image" content="https://i-invdn-com.investing.com/news/{n}.jpg">'
+        f'<meta name="twitter:card" content="summary_large_image"></head><body>{body}</body></html>'
+    ).encode("utf-8")
+
+
+def _soup_image(raw):
+    # 이전 방식: 본문 전체 디코딩 + BeautifulSoup(html.parser) 트리 생성
+    soup = BeautifulSoup(raw.decode("utf-8", errors="replace"), "html.parser")
+    tag = soup.select_one('meta[property="og:image"], meta[name="og:image"]') or \
+          soup.select_one('meta[name="twitter:image"], meta[property="twitter:image"]')
+    return tag.get("content") if tag else None
+
+
+def _stream_image(raw):
+    chunks = (raw[i:i + CHUNK_SIZE] for i in range(0, len(raw), CHUNK_SIZE))
+    return extract_meta_image(chunks)
+
+
+class Command(BaseCommand):
+    help = "Compare full-page BeautifulSoup parsing with the streaming head-only og:image extractor"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=str, default=None, help="glob of saved HTML pages (default: generated samples)")
+        parser.add_argument("--samples", type=int, default=5, help="generated pages when --pages is not given")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options["pages"]:
+            pages = []
+            for path in sorted(glob.glob(options["pages"])):
+                with open(path, "rb") as f:
+                    pages.append(f.read())
+        else:
+            pages = [sample_page(n) for n in range(options["samples"])]
+        if not pages:
+            self.stderr.write(self.style.ERROR("no pages to benchmark"))
+            return
+
+        repeat = options["repeat"]
+        full_bytes = sum(len(raw) for raw in pages)
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            soup_images = [_soup_image(raw) for raw in pages]
+        soup_ms = (time.perf_counter() - started) * 1000 / (repeat * len(pages))
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            results = [_stream_image(raw) for raw in pages]
+        stream_ms = (time.perf_counter() - started) * 1000 / (repeat * len(pages))
+        stream_bytes = sum(read for _, read in results)
+
+        mismatched = sum(a != b for a, (b, _) in zip(soup_images, results))
+        self.stdout.write(f"pages: {len(pages)}, repeat: {repeat}")
+        self.stdout.write(f"BeautifulSoup: {full_bytes / len(pages) / 1024:.1f} KiB/page, {soup_ms:.2f} ms/page")
+        self.stdout.write(f"streaming:     {stream_bytes / len(pages) / 1024:.1f} KiB/page, {stream_ms:.2f} ms/page")
+        style = self.style.SUCCESS if not mismatched else self.style.WARNING
+        self.stdout.write(style(
+            f"bytes x{full_bytes / max(stream_bytes, 1):.1f} fewer, CPU x{soup_ms / max(stream_ms, 1e-9):.1f} faster, "
+            f"{mismatched} mismatched results"
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('link', models.URLField(max_length=1000)),
+                ('title', models.CharField(max_length=500)),
+                ('summary', models.TextField(blank=True)),
+                ('published', models.CharField(blank=True, max_length=64, verbose_name='발행일(원문)')),
+                ('published_at', models.DateTimeField(verbose_name='발행 시각')),
+                ('source', models.CharField(blank=True, max_length=50)),
+                ('img', models.URLField(blank=True, max_length=1000, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-published_at', '-id'],
+                'indexes': [models.Index(fields=['-published_at', '-id'], name='tm_begin_news_recent')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tm_begin', '0001_newsitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsitem',
+            name='term_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='NewsTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=8)),
+                ('tf', models.PositiveSmallIntegerField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='tm_begin.newsitem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'item'), name='tm_begin_newsterm_posting')],
+            },
+        ),
+    ]
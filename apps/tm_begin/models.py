@@ -1,3 +1,46 @@
 from django.db import models
 
-# Create your models here.
+
+class NewsItem(models.Model):
+    """
+    수집한 뉴스 기사. key = GUID(없으면 링크)의 해시로, 여러 피드에 같은 기사가 있어도 한 행만 저장.
+    필드 이름은 RSS 항목 dict 와 같아 템플릿을 그대로 쓴다.
+    """
+
+    key = models.CharField(max_length=40, unique=True)
+    link = models.URLField(max_length=1000)
+    title = models.CharField(max_length=500)
+    summary = models.TextField(blank=True)
+    published = models.CharField(max_length=64, blank=True, verbose_name="발행일(원문)")
+    # 발행 시각이 없는 기사는 수집 시각
+    published_at = models.DateTimeField(verbose_name="발행 시각")
+    source = models.CharField(max_length=50, blank=True)
+    img = models.URLField(max_length=1000, null=True, blank=True)
+    # 검색 색인 문서 길이(토큰 수). None = 아직 색인 안 됨
+    term_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-published_at", "-id"]
+        indexes = [
+            models.Index(fields=["-published_at", "-id"], name="tm_begin_news_recent"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class NewsTerm(models.Model):
+    """뉴스 검색 역색인: 기사별 토큰(문자 bigram) 빈도. (term, item) 유니크 인덱스로 term 조회."""
+
+    term = models.CharField(max_length=8)
+    item = models.ForeignKey(NewsItem, on_delete=models.CASCADE, related_name="terms")
+    tf = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["term", "item"], name="tm_begin_newsterm_posting"),
+        ]
+
+    def __str__(self):
+        return f"{self.term} × {self.tf}"
@@ -0,0 +1,143 @@
+"""
+뉴스 검색: 문자 bigram 역색인(NewsTerm) + BM25 순위.
+
+- 한국어는 띄어쓰기/조사 때문에 단어 단위 색인이 잘 맞지 않아 글자 2개씩 잘라 색인한다
+  ("금리인상" → 금리, 리인, 인상). 한 글자 단어는 그대로 한 토큰, 제목은 TITLE_WEIGHT 배로 셈
+- 색인은 수집 시점에 만들고(index_pending), 조회는 (term, item) 인덱스로 포스팅만 읽어 DB 에서 점수를 합산
+- 검색어의 토큰을 모두 가진 기사만 결과 (부분 문자열 검색과 비슷한 정밀도)
+- 토큰이 한 글자뿐인 검색어는 색인으로 찾을 수 없어 제목/요약 부분 문자열 검색(최신순)으로 대신함
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import NewsItem, NewsTerm
+from .utils.news_cache import news_cache
+
+TITLE_WEIGHT = 2
+K1 = 1.2
+B = 0.75
+INDEX_BATCH = 200
+STATS_KEY = "tm_begin:search:stats"
+STATS_TIMEOUT = 300
+_TF_MAX = 32767
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """텍스트 → Counter{토큰: 빈도}. NFKC 정규화 + 소문자, 단어마다 문자 bigram."""
+    counts = Counter()
+    for word in _WORD_RE.findall(unicodedata.normalize("NFKC", text or "").lower()):
+        if len(word) == 1:
+            counts[word] += 1
+        else:
+            counts.update(word[i:i + 2] for i in range(len(word) - 1))
+    return counts
+
+
+def _document_terms(item):
+    counts = Counter()
+    for term, tf in tokenize(item.title).items():
+        counts[term] += tf * TITLE_WEIGHT
+    counts.update(tokenize(item.summary))
+    return counts
+
+
+def index_items(items):
+    """기사 목록 색인 (기존 포스팅은 교체). 반환: 색인한 기사 수"""
+    items = list(items)
+    postings = []
+    for item in items:
+        counts = _document_terms(item)
+        item.term_count = sum(counts.values())
+        postings.extend(NewsTerm(item=item, term=term, tf=min(tf, _TF_MAX)) for term, tf in counts.items())
+    with transaction.atomic():
+        NewsTerm.objects.filter(item__in=items).delete()
+        NewsTerm.objects.bulk_create(postings, batch_size=1000, ignore_conflicts=True)
+        NewsItem.objects.bulk_update(items, ["term_count"], batch_size=500)
+    news_cache().delete(STATS_KEY)
+    return len(items)
+
+
+def index_pending(limit=INDEX_BATCH * 5):
+    """아직 색인 안 된 기사(term_count=None) 색인. 수집 직후 호출 — 기존 기사도 점진적으로 색인된다."""
+    done = 0
+    while done < limit:
+        batch = list(
+            NewsItem.objects.filter(term_count__isnull=True)
+            .only("id", "title", "summary", "term_count")
+            .order_by("-id")[:INDEX_BATCH]
+        )
+        if not batch:
+            break
+        done += index_items(batch)
+    return done
+
+
+def _stats():
+    """(색인된 기사 수, 평균 문서 길이). 공유 캐시에 STATS_TIMEOUT 초 보관, 색인 시 무효화."""
+    store = news_cache()
+    stats = store.get(STATS_KEY)
+    if stats is None:
+        agg = NewsItem.objects.filter(term_count__isnull=False).aggregate(n=Count("id"), avgdl=Avg("term_count"))
+        stats = (agg["n"], float(agg["avgdl"] or 0.0))
+        store.set(STATS_KEY, stats, STATS_TIMEOUT)
+    return stats
+
+
+def ranked(query):
+    """
+    BM25 순위 queryset — values(item, score) 행, 점수 내림차순.
+    검색어에 bigram 이 없으면(한 글자 토큰뿐) None.
+    """
+    terms = list(tokenize(query))
+    if not terms or all(len(term) == 1 for term in terms):
+        return None
+    n, avgdl = _stats()
+    df = dict(
+        NewsTerm.objects.filter(term__in=terms).values("term").annotate(df=Count("id")).values_list("term", "df")
+    )
+    if not n or len(df) < len(terms):
+        return NewsTerm.objects.none().values("item")
+
+    idf = {term: math.log(1.0 + (n - df[term] + 0.5) / (df[term] + 0.5)) for term in terms}
+    tf = Cast("tf", FloatField())
+    # tf·(k1+1) / (tf + k1·(1 - b + b·dl/avgdl)) · idf
+    norm = Value(K1 * (1.0 - B)) + Value(K1 * B / max(avgdl, 1.0)) * Cast(F("item__term_count"), FloatField())
+    weight = Case(*[When(term=term, then=Value(idf[term])) for term in terms], output_field=FloatField())
+    score = Sum(weight * tf * Value(K1 + 1.0) / (tf + norm), output_field=FloatField())
+    return (
+        NewsTerm.objects.filter(term__in=terms)
+        .values("item")
+        .annotate(matched=Count("id"), score=score)
+        .filter(matched=len(terms))
+        .order_by("-score", "-item")
+    )
+
+
+def search_news(query, page=1, per_page=12):
+    """검색 결과 한 페이지. 반환: (Page, 기사 목록 — BM25 검색이면 각 기사에 score)"""
+    rows = ranked(query)
+    if rows is None:
+        paginator = Paginator(NewsItem.objects.filter(Q(title__icontains=query) | Q(summary__icontains=query)), per_page)
+        page_obj = paginator.get_page(page)
+        return page_obj, list(page_obj.object_list)
+
+    page_obj = Paginator(rows, per_page).get_page(page)
+    rows = list(page_obj.object_list)
+    found = NewsItem.objects.in_bulk([row["item"] for row in rows])
+    items = []
+    for row in rows:
+        item = found.get(row["item"])
+        if item is not None:
+            item.score = row["score"]
+            items.append(item)
+    return page_obj, items
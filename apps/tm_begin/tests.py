@@ -1,3 +1,504 @@
-from django.test import TestCase
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.tm_assets.models import BondHolding, DepositSaving, Market, StockHolding
+from apps.tm_begin import ingest, search, views
+from apps.tm_begin.models import NewsItem, NewsTerm
+from apps.tm_begin.utils import news_cache, rss_fetch
+
+
+def _news(title, minutes_ago=0, **fields):
+    return NewsItem.objects.create(
+        key=title, link=f"https://x/{title}", title=title,
+        published_at=timezone.now() - timedelta(minutes=minutes_ago), **fields,
+    )
+
+
+class NewsRefreshTest(TestCase):
+    def setUp(self):
+        caches["news"].clear()
+
+    def test_one_refresh_serves_every_worker(self):
+        """Refresh state lives in the shared cache, so a second request does not ingest again."""
+        def ingest(urls):
+            _news("first")
+            return 1
+
+        with patch.object(views, "ingest_news", side_effect=ingest) as run:
+            self.assertIsNotNone(views._news_updated_at())
+            views._news_updated_at()
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(caches["news"].get(news_cache.STATE_KEY)["added"], 1)
+
+    def test_expired_state_serves_stored_news_and_refreshes_in_background(self):
+        """An expired refresh returns immediately; one background refresh replaces the state."""
+        _news("old")
+        old = news_cache.write(timezone.now() - timedelta(seconds=views._CACHE_TTL + 1))
+        started = []
+        with patch.object(views, "ingest_news", return_value=0) as run, \
+                patch.object(views, "_start_background", side_effect=lambda fn, *a: started.append((fn, a))):
+            self.assertEqual(views._news_updated_at(), old["at"])
+            # 동시에 들어온 요청은 락 때문에 갱신을 시작하지 않음
+            views._news_updated_at()
+            self.assertEqual(len(started), 1)
+            run.assert_not_called()
+
+            fn, args = started[0]
+            fn(*args)
+        self.assertEqual(run.call_count, 1)
+        self.assertGreater(news_cache.read()["at"], old["at"])
+        self.assertIsNone(caches["news"].get(news_cache.LOCK_KEY))
+
+    @override_settings(NEWS_STALE_WHILE_REVALIDATE=False)
+    def test_expired_state_is_refreshed_inline_when_disabled(self):
+        """With stale-while-revalidate off the request ingests itself."""
+        _news("old")
+        news_cache.write(timezone.now() - timedelta(seconds=views._CACHE_TTL + 1))
+        with patch.object(views, "ingest_news", return_value=0) as run:
+            views._news_updated_at()
+        run.assert_called_once()
+
+    def test_failed_refresh_releases_lock(self):
+        """A failing ingest keeps the previous state and frees the lock for a retry."""
+        news_cache.write(timezone.now() - timedelta(seconds=views._CACHE_TTL + 1))
+        token = news_cache.acquire_lock()
+        with patch.object(views, "ingest_news", side_effect=RuntimeError("down")), \
+                self.assertLogs("apps.tm_begin.views", "WARNING"):
+            self.assertIsNone(views._refresh_news(token))
+        self.assertIsNotNone(news_cache.read())
+        self.assertIsNotNone(news_cache.acquire_lock())
+
+    def test_cold_start_waits_for_other_worker(self):
+        """With no stored news and the lock held elsewhere, the request waits instead of ingesting."""
+        news_cache.acquire_lock()
+        with patch.object(views, "ingest_news") as run, \
+                patch.object(views, "_wait_for_news", return_value=None) as wait:
+            self.assertIsNone(views._news_updated_at())
+        wait.assert_called_once()
+        run.assert_not_called()
+
+
+class NewsViewsTest(TestCase):
+    def setUp(self):
+        caches["news"].clear()
+        news_cache.write(timezone.now())
+
+    def test_news_list_pages_through_archive(self):
+        """The list view pages through every stored item, newest first."""
+        for i in range(250):
+            _news(f"n{i:03d}", minutes_ago=i)
+        response = self.client.get(reverse("tm_begin:stock_news"), {"page": 28})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total"], 250)
+        self.assertEqual(response.context["hero_item"].title, "n243")
+        self.assertEqual([item.title for item in response.context["grid_items"]],
+                         [f"n{i}" for i in range(244, 250)])
+
+    def test_index_shows_latest(self):
+        """The home page lists the 20 newest stored items."""
+        for i in range(25):
+            _news(f"n{i:02d}", minutes_ago=i)
+        response = self.client.get(reverse("tm_begin:index"))
+        self.assertEqual(response.context["count"], 20)
+        self.assertEqual(response.context["news_list"][0].title, "n00")
+
+
+class IngestNewsTest(TestCase):
+    def setUp(self):
+        caches["news"].clear()
+
+    def _ingest(self, *feeds):
+        bodies = dict(feeds)
+        download = lambda url, session, timeout, state=None: FakeResponse(bodies[url])
+        with patch.object(rss_fetch, "_download_feed", side_effect=download), \
+                patch.object(rss_fetch, "_get_og_image", return_value=None), \
+                patch.object(rss_fetch, "clean_text", wraps=rss_fetch.clean_text) as clean:
+            added = ingest.ingest_news([url for url, _ in feeds])
+        return added, clean.call_count
+
+    def test_only_unseen_entries_are_processed_and_stored_once(self):
+        """Articles shared by two feeds are stored once; a second run cleans only new entries."""
+        shared = ("공유 기사", "https://x/shared")
+        added, _ = self._ingest(("f1", _rss(shared, ("a", "https://x/a"))), ("f2", _rss(shared)))
+        self.assertEqual(added, 2)
+        self.assertEqual(NewsItem.objects.count(), 2)
+
+        added, cleaned = self._ingest(("f1", _rss(shared, ("a", "https://x/a"), ("b", "https://x/b"))))
+        self.assertEqual(added, 1)
+        self.assertEqual(cleaned, 1)  # 새 기사 제목만 정리
+        self.assertEqual(NewsItem.objects.count(), 3)
+        self.assertEqual(NewsItem.objects.first().title, "b")
+
+    def test_stored_items_without_image_are_retried(self):
+        """Each ingest revisits a bounded batch of stored image-less items, skipping known misses."""
+        for i in range(4):
+            _news(f"old{i}", minutes_ago=i)
+        NewsItem.objects.filter(key="old3").update(published_at=timezone.now() - timedelta(days=1))
+        caches["news"].set(rss_fetch._og_image_key("https://x/old2"), "", rss_fetch.OG_IMAGE_MISS_TTL)
+        og_image = lambda link, session, timeout: f"{link}.png"
+        with patch.object(rss_fetch, "_download_feed", return_value=FakeResponse(_rss())), \
+                patch.object(rss_fetch, "_get_og_image", side_effect=og_image) as scrape, \
+                patch.object(ingest, "IMAGE_RETRY_BATCH", 3), patch.object(ingest, "SCRAPE_LIMIT", 1):
+            ingest.ingest_news(["f"])
+            self.assertEqual(scrape.call_count, 1)
+            ingest.ingest_news(["f"])
+        images = dict(NewsItem.objects.values_list("key", "img"))
+        self.assertEqual(images, {
+            "old0": "https://x/old0.png", "old1": "https://x/old1.png", "old2": None, "old3": None,
+        })
+
+    def test_undated_entries_use_ingest_time(self):
+        """Entries without a publish date are stored with the ingest time."""
+        body = b'<?xml version="1.0"?><rss version="2.0"><channel><item><title>t</title><link>https://x/t</link></item></channel></rss>'
+        self._ingest(("f", body))
+        item = NewsItem.objects.get()
+        self.assertLess((timezone.now() - item.published_at).total_seconds(), 60)
+
+
+def _rss(*entries):
+    body = "".join(
+        f"<item><title>{title}</title><link>{link}</link>"
+        f"<pubDate>Mon, 0{i + 1} Jan 2024 00:00:00 GMT</pubDate></item>"
+        for i, (title, link) in enumerate(entries)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{body}</channel></rss>'.encode()
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {"Content-Type": "application/rss+xml", **(headers or {})}
+
+    def raise_for_status(self):
+        pass
+
+
+class ConcurrentRssFetchTest(TestCase):
+    def _download(self, delay):
+        def download(url, session, timeout, state=None):
+            time.sleep(delay)
+            return FakeResponse(_rss((f"{url}-1", f"{url}/a"), (f"{url}-2", f"{url}/b")))
+        return download
+
+    def test_feeds_and_images_are_fetched_concurrently(self):
+        """Three slow feeds and their og:image pages overlap instead of adding up."""
+        def og_image(link, session, timeout):
+            time.sleep(0.2)
+            return f"{link}.png"
+
+        timings = {}
+        with patch.object(rss_fetch, "_download_feed", side_effect=self._download(0.2)), \
+                patch.object(rss_fetch, "_get_og_image", side_effect=og_image):
+            started = time.monotonic()
+            items = rss_fetch.fetch_rss_many(["f1", "f2", "f3"], scrape_limit=6, timings=timings)
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(len(items), 6)
+        self.assertTrue(all(item["img"] == f"{item['link']}.png" for item in items))
+        self.assertLess(elapsed, 1.0)  # 직렬이면 0.6 + 1.2초
+        self.assertLessEqual({"feeds", "parse", "og_image", "total", "timed_out"}, set(timings))
+        self.assertEqual(timings["timed_out"], 0)
+        self.assertEqual(items[0]["title"], "f1-2")  # 최신순
+
+    def test_global_deadline_drops_slow_work(self):
+        """Work still running at the deadline is dropped and counted as timed out."""
+        def download(url, session, timeout, state=None):
+            time.sleep(1.0 if url == "slow" else 0)
+            return FakeResponse(_rss((url, f"{url}/a")))
+
+        timings = {}
+        with patch.object(rss_fetch, "_download_feed", side_effect=download):
+            started = time.monotonic()
+            items = rss_fetch.fetch_rss_many(
+                ["fast", "slow"], try_scrape_og_image=False, deadline=0.3, timings=timings
+            )
+            elapsed = time.monotonic() - started
+
+        self.assertEqual([item["title"] for item in items], ["fast"])
+        self.assertEqual(timings["timed_out"], 1)
+        self.assertLess(elapsed, 0.8)
+
+
+class ConditionalFeedFetchTest(TestCase):
+    def setUp(self):
+        self.store = caches["news"]
+        self.store.clear()
+
+    def _session_get(self, responses, seen):
+        def get(url, headers=None, timeout=None):
+            seen.append(dict(headers))
+            return responses.pop(0)
+        return get
+
+    def test_not_modified_feed_reuses_stored_entries(self):
+        """Validators are stored and sent back; a 304 reuses entries without parsing."""
+        seen = []
+        responses = [
+            FakeResponse(_rss(("a", "https://x/a")), headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+            FakeResponse(b"", status_code=304),
+        ]
+        timings = {}
+        with patch("requests.Session.get", side_effect=self._session_get(responses, seen)):
+            first = rss_fetch.fetch_rss_many(["https://x/rss"], try_scrape_og_image=False, feed_cache=self.store)
+            with patch.object(rss_fetch.feedparser, "parse") as parse:
+                second = rss_fetch.fetch_rss_many(
+                    ["https://x/rss"], try_scrape_og_image=False, feed_cache=self.store, timings=timings
+                )
+                parse.assert_not_called()
+
+        self.assertNotIn("If-None-Match", seen[0])
+        self.assertEqual(seen[1]["If-None-Match"], '"v1"')
+        self.assertEqual(seen[1]["If-Modified-Since"], "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertEqual(first, second)
+        self.assertEqual(timings["not_modified"], 1)
+
+    def test_state_from_seen_poll_is_not_served_to_full_callers(self):
+        """A poll that skipped known entries keeps only validators, so a caller without seen fetches in full."""
+        seen = []
+        body = _rss(("a", "https://x/a"), ("b", "https://x/b"))
+        responses = [FakeResponse(body, headers={"ETag": '"v1"'}), FakeResponse(body, headers={"ETag": '"v1"'})]
+        known = lambda keys: [k for k in keys if k == rss_fetch.hashlib.sha1(b"https://x/a").hexdigest()]
+        with patch("requests.Session.get", side_effect=self._session_get(responses, seen)):
+            new = rss_fetch.fetch_rss_many(["https://x/rss"], try_scrape_og_image=False, feed_cache=self.store, seen=known)
+            full = rss_fetch.fetch_rss_many(["https://x/rss"], try_scrape_og_image=False, feed_cache=self.store)
+        self.assertEqual([item["title"] for item in new], ["b"])
+        self.assertNotIn("If-None-Match", seen[1])
+        self.assertEqual(sorted(item["title"] for item in full), ["a", "b"])
+
+    def test_feed_without_validators_is_not_stored(self):
+        """Feeds that send neither ETag nor Last-Modified are always fetched in full."""
+        seen = []
+        responses = [FakeResponse(_rss(("a", "https://x/a"))), FakeResponse(_rss(("a", "https://x/a")))]
+        with patch("requests.Session.get", side_effect=self._session_get(responses, seen)):
+            rss_fetch.fetch_rss_many(["https://x/rss"], try_scrape_og_image=False, feed_cache=self.store)
+            rss_fetch.fetch_rss_many(["https://x/rss"], try_scrape_og_image=False, feed_cache=self.store)
+        self.assertNotIn("If-None-Match", seen[1])
+        self.assertNotIn("If-Modified-Since", seen[1])
+
+
+class OgImageCacheTest(TestCase):
+    def setUp(self):
+        self.store = caches["news"]
+        self.store.clear()
+        links = [("a", "https://x/a"), ("b", "https://x/b"), ("c", "https://x/c")]
+        self.download = lambda url, session, timeout, state=None: FakeResponse(_rss(*links))
+
+    def _fetch(self, og_image, scrape_limit=8):
+        timings = {}
+        with patch.object(rss_fetch, "_download_feed", side_effect=self.download), \
+                patch.object(rss_fetch, "_get_og_image", side_effect=og_image) as scrape:
+            items = rss_fetch.fetch_rss_many(
+                ["f"], scrape_limit=scrape_limit, image_cache=self.store, timings=timings
+            )
+        return {item["link"]: item["img"] for item in items}, scrape, timings
+
+    def test_each_article_is_scraped_once(self):
+        """Found images and pages without one are both remembered; the next refresh scrapes nothing."""
+        def og_image(link, session, timeout):
+            return None if link.endswith("c") else f"{link}.png"
+
+        images, scrape, _ = self._fetch(og_image)
+        self.assertEqual(scrape.call_count, 3)
+        again, scrape, timings = self._fetch(og_image)
+        scrape.assert_not_called()
+        self.assertEqual(again, images)
+        self.assertEqual(again["https://x/c"], None)
+        self.assertEqual(timings["og_cached"], 3)
+
+    def test_scrape_limit_counts_only_uncached_links(self):
+        """Coverage grows across refreshes while each refresh scrapes at most scrape_limit pages."""
+        og_image = lambda link, session, timeout: f"{link}.png"
+        first, _, _ = self._fetch(og_image, scrape_limit=2)
+        self.assertEqual(sum(bool(img) for img in first.values()), 2)
+        second, scrape, _ = self._fetch(og_image, scrape_limit=2)
+        self.assertEqual(scrape.call_count, 1)
+        self.assertTrue(all(second.values()))
+
+    def test_failed_scrape_is_retried(self):
+        """Network errors are not negatively cached."""
+        def broken(link, session, timeout):
+            raise rss_fetch.requests.ConnectionError("down")
+
+        self._fetch(broken)
+        _, scrape, _ = self._fetch(lambda link, session, timeout: None)
+        self.assertEqual(scrape.call_count, 3)
+
+
+class StreamingOgImageTest(TestCase):
+    def _chunks(self, raw, size=64):
+        self.served = 0
+        for i in range(0, len(raw), size):
+            self.served += 1
+            yield raw[i:i + size]
+
+    def test_stops_at_og_image_without_reading_body(self):
+        """Reading stops once og:image is found, long before the body."""
+        raw = (b'<html><head><meta property="og:image" content="https://x/i.png">'
+               b'</head><body>' + b"<p>text</p>" * 10000 + b"</body></html>")
+        img, read = rss_fetch.extract_meta_image(self._chunks(raw))
+        self.assertEqual(img, "https://x/i.png")
+        self.assertLess(read, 200)
+        self.assertLessEqual(self.served, 2)
+
+    def test_twitter_image_fallback_and_head_end(self):
+        """twitter:image is used when og:image is absent; parsing stops at </head>."""
+        raw = (b'<html><head><meta name="twitter:image" content="/t.png"></head><body>'
+               b'<meta property="og:image" content="/late.png">' + b"x" * 5000 + b"</body></html>")
+        img, read = rss_fetch.extract_meta_image(self._chunks(raw))
+        self.assertEqual(img, "/t.png")
+        self.assertLess(read, 200)
+
+    def test_byte_cap_and_split_multibyte_chunks(self):
+        """Chunks splitting UTF-8 characters decode cleanly, and a missing </head> is bounded by the cap."""
+        raw = ('<html><head><title>' + "한글" * 50 + '</title>'
+               '<meta property="og:image" content="https://x/한글.png">').encode("utf-8")
+        img, _ = rss_fetch.extract_meta_image(self._chunks(raw, size=7))
+        self.assertEqual(img, "https://x/한글.png")
+
+        img, read = rss_fetch.extract_meta_image(self._chunks(b"<html><head>" + b"x" * 10000, 1000), byte_cap=3000)
+        self.assertIsNone(img)
+        self.assertEqual(read, 3000)
+
+    def test_get_og_image_streams_and_resolves_relative_url(self):
+        """_get_og_image requests a streamed response and makes the image URL absolute."""
+        raw = b'<html><head><meta property="og:image" content="/img/a.png"></head><body></body></html>'
+
+        class Streamed(FakeResponse):
+            encoding = "ISO-8859-1"
+
+            def iter_content(self, size):
+                return iter([self.content])
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        response = Streamed(raw, headers={"Content-Type": "text/html"})
+        session = Mock()
+        session.get.return_value = response
+        self.assertEqual(rss_fetch._get_og_image("https://x/news/1", session), "https://x/img/a.png")
+        self.assertTrue(session.get.call_args.kwargs["stream"])
+
+
+class NewsSearchTest(TestCase):
+    def setUp(self):
+        caches["news"].clear()
+
+    def _indexed(self, title, summary="", minutes_ago=0):
+        item = _news(title, minutes_ago=minutes_ago, summary=summary)
+        search.index_items([item])
+        return item
+
+    def test_tokenize_uses_character_bigrams(self):
+        """Korean words split into bigrams; single-character words stay whole."""
+        self.assertEqual(
+            search.tokenize("금리인상 및 FOMC"),
+            {"금리": 1, "리인": 1, "인상": 1, "및": 1, "fo": 1, "om": 1, "mc": 1},
+        )
+
+    def test_results_are_bm25_ranked(self):
+        """Title matches and repeated terms rank higher; all query bigrams must match."""
+        self._indexed("환율 동향", "달러 약세")
+        self._indexed("증시 마감", "금리인상 우려로 하락")
+        self._indexed("금리인상 단행", "기준금리인상 결정, 금리인상 폭은")
+        self._indexed("금리 동결", "인상 없음")  # '리인' 없음
+
+        page, items = search.search_news("금리인상")
+        self.assertEqual([item.title for item in items], ["금리인상 단행", "증시 마감"])
+        self.assertGreater(items[0].score, items[1].score)
+        self.assertEqual(page.paginator.count, 2)
+
+    def test_results_are_paginated(self):
+        """Paging walks the full ranked result set."""
+        for i in range(30):
+            self._indexed(f"반도체 {i}", "반도체 수출" * (i % 3 + 1), minutes_ago=i)
+        page, items = search.search_news("반도체", page=3, per_page=12)
+        self.assertEqual(page.paginator.count, 30)
+        self.assertEqual(len(items), 6)
+
+    def test_single_character_query_falls_back_to_substring(self):
+        """Queries without a bigram fall back to a substring scan."""
+        self._indexed("금 값 상승")
+        self._indexed("원유 하락")
+        page, items = search.search_news("금")
+        self.assertEqual([item.title for item in items], ["금 값 상승"])
+
+    def test_ingest_indexes_new_items(self):
+        """Ingestion indexes new articles, and pending older ones, right away."""
+        pending = _news("과거 기사 반도체")
+        body = _rss(("반도체 수출 증가", "https://x/chip"))
+        with patch.object(rss_fetch, "_download_feed", side_effect=lambda *a, **k: FakeResponse(body)), \
+                patch.object(rss_fetch, "_get_og_image", return_value=None):
+            ingest.ingest_news(["f"])
+        self.assertFalse(NewsItem.objects.filter(term_count__isnull=True).exists())
+        self.assertTrue(NewsTerm.objects.filter(item=pending, term="반도").exists())
+        _, items = search.search_news("반도체")
+        self.assertEqual(len(items), 2)
+
+    def test_search_view_paginates_news(self):
+        """The search page renders one page of ranked news."""
+        for i in range(15):
+            self._indexed(f"반도체 {i}", minutes_ago=i)
+        response = self.client.get(reverse("tm_begin:search"), {"q": "반도체", "page": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["news_results"]), 3)
+        self.assertEqual(response.context["news_page"].number, 2)
+
+
+class PortfolioSearchTest(TestCase):
+    def setUp(self):
+        caches["news"].clear()
+        news_cache.write(timezone.now())
+        User = get_user_model()
+        self.user = User.objects.create_user(username="owner", password="pw", nickname="Owner")
+        self.other = User.objects.create_user(username="other", password="pw", nickname="Other")
+        for user in (self.user, self.other):
+            DepositSaving.objects.create(
+                user=user, product_type=DepositSaving.ProductType.DEPOSIT, bank_name="삼성증권",
+                product_name="정기예금", principal_amount=Decimal("1000000"), annual_rate=Decimal("3.00"),
+                start_date=date(2024, 1, 1),
+            )
+            BondHolding.objects.create(
+                user=user, name="회사채", issuer="삼성전자", face_amount=Decimal("1000000"),
+                coupon_rate=Decimal("3.00"), purchase_price_pct=Decimal("100"), maturity_date=date(2030, 1, 1),
+            )
+        for i in range(25):
+            StockHolding.objects.create(
+                user=self.user, market=Market.KR, ticker=f"{i:06d}", name=f"삼성 {i:02d}",
+                quantity=Decimal("1"), average_price=Decimal("1000"),
+            )
+        StockHolding.objects.create(
+            user=self.other, market=Market.KR, ticker="005930", name="삼성전자",
+            quantity=Decimal("1"), average_price=Decimal("1000"),
+        )
+
+    def test_results_are_scoped_to_user_and_paginated(self):
+        """Only the requester's holdings are returned, one capped page per asset class."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("tm_begin:search"), {"q": "삼성", "stock_holdings_page": 2})
+        results = response.context["portfolio_results"]
+        stocks = results["stock_holdings"]
+        self.assertEqual(stocks.paginator.count, 25)
+        self.assertEqual(stocks.number, 2)
+        self.assertEqual([s.name for s in stocks], [f"삼성 {i}" for i in range(20, 25)])
+        self.assertEqual({s.user_id for s in stocks}, {self.user.pk})
+        self.assertEqual(results["deposit_savings"].paginator.count, 1)
+        self.assertEqual(results["bond_holdings"].paginator.count, 1)
+        self.assertContains(response, "Stocks (25)")
+
+    def test_anonymous_search_skips_portfolio(self):
+        """Anonymous users get news results only."""
+        response = self.client.get(reverse("tm_begin:search"), {"q": "삼성"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["portfolio_results"]["stock_holdings"], [])
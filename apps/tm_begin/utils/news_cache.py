@@ -0,0 +1,51 @@
+# apps/tm_begin/utils/news_cache.py
+"""
+뉴스 수집 상태 공유 캐시.
+
+기사는 DB(NewsItem)에 쌓이고, 여기에는 마지막 수집 시각과 추가 건수만 둔다.
+모든 웹 인스턴스가 settings.CACHES["news"] (DB/Redis 등 공유 백엔드) 한 곳을 함께 쓰므로
+피드는 TTL 마다 한 워커만 받아 오면 된다.
+
+- 수집은 공유 캐시의 락(add)을 잡은 워커 하나만 수행한다 (single-flight)
+- 수집이 끝나면 상태를 한 번에 교체한다
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+STATE_KEY = "tm_begin:news:state"
+LOCK_KEY = "tm_begin:news:refresh-lock"
+# 갱신 락 유지 시간 — 갱신 중 워커가 죽어도 이 시간이 지나면 다른 워커가 갱신
+LOCK_TIMEOUT = 120
+# 공유 캐시에 상태를 보관하는 시간 (신선도 판단은 호출 측 TTL 로)
+STATE_TIMEOUT = 60 * 60 * 24
+
+
+def news_cache():
+    return caches[getattr(settings, "NEWS_CACHE_ALIAS", "news")]
+
+
+def read():
+    """마지막 수집 상태 dict(at, added). 없으면 None."""
+    return news_cache().get(STATE_KEY)
+
+
+def write(at, added=0):
+    """수집 완료 상태 저장."""
+    entry = {"at": at, "added": added}
+    news_cache().set(STATE_KEY, entry, STATE_TIMEOUT)
+    return entry
+
+
+def acquire_lock():
+    """갱신 락 획득. 성공 시 토큰, 다른 워커가 갱신 중이면 None."""
+    token = str(time.time_ns())
+    return token if news_cache().add(LOCK_KEY, token, LOCK_TIMEOUT) else None
+
+
+def release_lock(token):
+    store = news_cache()
+    if store.get(LOCK_KEY) == token:
+        store.delete(LOCK_KEY)
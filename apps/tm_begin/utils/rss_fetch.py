@@ -1,13 +1,17 @@
 # apps/tm_begin/utils/rss_fetch.py
 # --- 리팩토링 버전 (안정성/정확도/커버리지 개선) ---
 
-import re, html, time, calendar
-from typing import Iterable, Optional
+import re, html, time, calendar, logging, hashlib, codecs
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Optional
 from urllib.parse import urljoin
 
 import feedparser
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
 
 # HTML 태그 제거용 정규식
 TAG_RE = re.compile(r"<[^>]+>")
@@ -20,6 +24,20 @@ UA = (
 
 HEADERS = {"User-Agent": UA}
 
+# 피드/본문 동시 요청 스레드 수 (세션 커넥션 풀 크기와 같게)
+MAX_WORKERS = 8
+# fetch_rss_many 전체 소요 상한(초) — 넘기면 끝난 결과만으로 목록 구성
+DEFAULT_DEADLINE = 20.0
+FEED_TIMEOUT = 10
+# 조건부 요청용 피드 상태(ETag/Last-Modified + 마지막 항목) 보관 시간(초)
+FEED_STATE_TIMEOUT = 60 * 60 * 24 * 7
+# 기사 링크 → og:image 캐시 보관 시간(초). 이미지가 없는 페이지도 짧게 기억해 다시 스크랩하지 않음
+OG_IMAGE_TTL = 60 * 60 * 24 * 30
+OG_IMAGE_MISS_TTL = 60 * 60 * 24
+# og:image 탐색 시 본문에서 읽을 최대 바이트 (보통 </head> 에서 먼저 멈춤)
+HEAD_BYTE_CAP = 256 * 1024
+CHUNK_SIZE = 8 * 1024
+
 
 def clean_text(s: str | None) -> str:
     """HTML 태그/엔티티 제거 + 공백 정리."""
@@ -95,32 +113,94 @@ def _first_image_from_feed_entry(e) -> Optional[str]:
     return None
 
 
-def _get_og_image(url: str, session: requests.Session, timeout: int = 6) -> Optional[str]:
+class _MetaImageParser(HTMLParser):
+    """<head> 의 og:image / twitter:image meta 를 찾는 증분 파서. </head> 나 <body> 를 만나면 done."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.og_image: Optional[str] = None
+        self.twitter_image: Optional[str] = None
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.done = True
+            return
+        if tag != "meta":
+            return
+        a = dict(attrs)
+        key = (a.get("property") or a.get("name") or "").strip().lower()
+        content = (a.get("content") or "").strip()
+        if not content:
+            return
+        if key == "og:image" and not self.og_image:
+            self.og_image = content
+            self.done = True  # og:image 가 우선이므로 더 읽을 필요 없음
+        elif key == "twitter:image" and not self.twitter_image:
+            self.twitter_image = content
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+
+def extract_meta_image(chunks: Iterable[bytes], encoding: Optional[str] = None,
+                       byte_cap: int = HEAD_BYTE_CAP) -> tuple[Optional[str], int]:
     """
-    본문 페이지에서 og:image/twitter:image를 추출.
-    상대경로는 원문 URL 기준으로 절대경로로 보정.
+    HTML 바이트 조각을 순서대로 읽으며 og:image(없으면 twitter:image)를 찾음.
+    </head> / <body> / og:image 발견 / byte_cap 중 먼저 오는 지점에서 멈춤.
+    반환: (이미지 URL 또는 None, 읽은 바이트 수)
     """
     try:
-        r = session.get(url, headers=HEADERS, timeout=timeout)
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = _MetaImageParser()
+    read = 0
+    for chunk in chunks:
+        read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read >= byte_cap:
+            break
+    return parser.og_image or parser.twitter_image, read
+
+
+def _get_og_image(url: str, session: requests.Session, timeout: float = 6) -> Optional[str]:
+    """
+    본문 페이지에서 og:image/twitter:image를 추출. 이미지가 없는 페이지는 None.
+    응답을 스트리밍으로 받아 <head> 까지만 읽는다 (extract_meta_image).
+    상대경로는 원문 URL 기준으로 절대경로로 보정.
+    네트워크 오류/서버 오류(5xx, 429)는 예외로 올려 "이미지 없음"과 구분한다.
+    """
+    with session.get(url, headers=HEADERS, timeout=timeout, stream=True) as r:
+        if r.status_code >= 500 or r.status_code == 429:
+            r.raise_for_status()
         if r.status_code != 200 or "text/html" not in r.headers.get("Content-Type", ""):
             return None
+        # Content-Type 에 charset 이 없으면 requests 는 ISO-8859-1 로 가정 → UTF-8 로 읽음
+        encoding = r.encoding if "charset" in r.headers.get("Content-Type", "").lower() else None
+        content, _ = extract_meta_image(r.iter_content(CHUNK_SIZE), encoding)
 
-        soup = BeautifulSoup(r.text, "html.parser")
-        # 우선 og:image, 없으면 twitter:image 도 시도
-        tag = soup.select_one('meta[property="og:image"], meta[name="og:image"]') or \
-              soup.select_one('meta[name="twitter:image"], meta[property="twitter:image"]')
-        if not tag:
-            return None
+    # 상대경로 → 절대경로
+    return urljoin(url, content) if content else None
 
-        content = tag.get("content")
-        if not content:
-            return None
-
-        # 상대경로 → 절대경로
-        return urljoin(url, content)
 
+def _try_og_image(url: str, session: requests.Session, timeout: float) -> tuple[Optional[str], bool]:
+    """반환: (이미지 URL, 확인 여부). 요청이 실패하면 확인 안 됨(False) — 캐시하지 않고 다음에 재시도."""
+    try:
+        return _get_og_image(url, session, timeout), True
     except Exception:
-        return None
+        return None, False
+
+
+def _og_image_key(link: str) -> str:
+    return "tm_begin:rss:og:" + hashlib.md5(link.encode()).hexdigest()
+
+
+def entry_key(e) -> str:
+    """기사 식별 키: GUID(id) → 링크 → 제목 순으로 첫 값의 SHA-1."""
+    ident = e.get("id") or e.get("link") or e.get("title") or ""
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
 
 
 def _to_epoch_utc(entry) -> Optional[int]:
@@ -137,60 +217,248 @@ def _to_epoch_utc(entry) -> Optional[int]:
         return None
 
 
+def _session(workers: int) -> requests.Session:
+    """모든 피드/본문 요청이 같은 커넥션 풀을 쓰는 세션."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _feed_state_key(url: str) -> str:
+    return "tm_begin:rss:feed:" + hashlib.md5(url.encode()).hexdigest()
+
+
+def _download_feed(
+    url: str, session: requests.Session, timeout: float, state: Optional[dict] = None
+) -> Optional[requests.Response]:
+    """피드 다운로드. state(이전 ETag/Last-Modified)가 있으면 조건부 요청 — 변경이 없으면 304 응답."""
+    headers = dict(HEADERS)
+    if state:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            headers["If-Modified-Since"] = state["modified"]
+    try:
+        r = session.get(url, headers=headers, timeout=timeout)
+        r.raise_for_status()
+        return r
+    except Exception:
+        logger.warning("RSS fetch failed: %s", url, exc_info=True)
+        return None
+
+
+def _run_all(pool: ThreadPoolExecutor, fn, args_list, deadline: float) -> tuple[list, int]:
+    """args_list 를 동시에 실행하고 deadline(monotonic) 까지 끝난 결과만 모음. 반환: (결과 목록, 시간 초과 수)"""
+    futures = [pool.submit(fn, *args) for args in args_list]
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+    for f in not_done:
+        f.cancel()
+    return [f.result() if f in done else None for f in futures], len(not_done)
+
+
+def _resolve_images(
+    items: list[dict], pool: ThreadPoolExecutor, session: requests.Session, image_cache,
+    scrape_limit: int, end: float, phases: dict,
+) -> None:
+    """
+    "img" 가 비어 있는 항목의 이미지를 og:image 캐시 → 본문 스크랩(최대 scrape_limit 링크) 순으로 채움.
+    end(monotonic) 가 지나면 스크랩하지 않는다. phases 의 og_image/og_cached/og_scraped/timed_out 을 갱신.
+    """
+    pending = [item for item in items if not item["img"] and item["link"]]
+    if pending and image_cache is not None:
+        known = image_cache.get_many(list({_og_image_key(item["link"]) for item in pending}))
+        rest = []
+        for item in pending:
+            img = known.get(_og_image_key(item["link"]))
+            if img is None:
+                rest.append(item)
+                continue
+            item["img"] = img or None  # "" 는 이미지 없음으로 확인된 페이지
+            phases["og_cached"] += 1
+        pending = rest
+
+    # 같은 기사가 여러 피드에 있어도 링크당 한 번만
+    links = list(dict.fromkeys(item["link"] for item in pending))[:scrape_limit]
+    if not links or time.monotonic() >= end:
+        return
+    t0 = time.monotonic()
+    timeout = max(0.1, min(6, end - time.monotonic()))
+    results, timed_out = _run_all(pool, _try_og_image, [(link, session, timeout) for link in links], end)
+    images, found, missing = {}, {}, {}
+    for link, result in zip(links, results):
+        img, resolved = result or (None, False)
+        if img:
+            images[link] = img
+        if resolved:
+            (found if img else missing)[_og_image_key(link)] = img or ""
+    for item in pending:
+        if item["link"] in images:
+            item["img"] = images[item["link"]]
+    if image_cache is not None:
+        if found:
+            image_cache.set_many(found, OG_IMAGE_TTL)
+        if missing:
+            image_cache.set_many(missing, OG_IMAGE_MISS_TTL)
+    phases["og_image"] += time.monotonic() - t0
+    phases["og_scraped"] += len(links)
+    phases["timed_out"] += timed_out
+
+
+def resolve_images(
+    items: list[dict],
+    scrape_limit: int = 6,
+    deadline: float = DEFAULT_DEADLINE,
+    workers: int = MAX_WORKERS,
+    image_cache=None,
+    timings: Optional[dict] = None,
+) -> list[dict]:
+    """
+    이미 만들어 둔 항목({"link", "img"} 포함, 예: 이미지 없이 저장된 기사)의 빠진 이미지를
+    fetch_rss_many 와 같은 방식(og:image 캐시, scrape_limit, deadline)으로 채워 그대로 반환.
+    """
+    end = time.monotonic() + deadline
+    phases = {"og_image": 0.0, "og_cached": 0, "og_scraped": 0, "timed_out": 0}
+    pool = ThreadPoolExecutor(max_workers=workers)
+    session = _session(workers)
+    try:
+        _resolve_images(items, pool, session, image_cache, scrape_limit, end, phases)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        session.close()
+    if timings is not None:
+        timings.update(phases)
+    return items
+
+
 def fetch_rss_many(
     urls: Iterable[str],
     limit_per_feed: int = 100,
     try_scrape_og_image: bool = True,
     scrape_limit: int = 6,
+    deadline: float = DEFAULT_DEADLINE,
+    workers: int = MAX_WORKERS,
+    timings: Optional[dict] = None,
+    feed_cache=None,
+    image_cache=None,
+    seen: Optional[Callable[[list[str]], Iterable[str]]] = None,
 ) -> list[dict]:
     """
     여러 RSS 피드를 읽어 통합 리스트를 만들고, 최신 순으로 정렬해 반환.
     - urls: 피드 URL 모음
     - limit_per_feed: 피드당 최대 엔트리 수
     - try_scrape_og_image: 이미지가 없을 때 본문 페이지에서 og:image 시도 여부
-    - scrape_limit: og:image 스크랩 시도 상한(과도한 네트워크 요청 방지)
+    - scrape_limit: og:image 스크랩 시도 상한(과도한 네트워크 요청 방지). image_cache 가 있으면 캐시에 없는 링크만 셈
+    - deadline: 전체 소요 상한(초). 피드 다운로드와 og:image 스크랩은 각각 스레드 풀로 동시에 실행
+    - timings: dict 를 넘기면 단계별 소요(초)와 건수를 채움
+      (feeds/parse/og_image/total/timed_out/not_modified/bytes/known/og_cached/og_scraped)
+    - feed_cache: Django 캐시(get_many/set_many). 넘기면 피드별 ETag/Last-Modified 와 항목을 저장해 두고
+      다음 요청에 If-None-Match/If-Modified-Since 를 보냄. 304 면 파싱 없이 저장된 항목 사용
+      (seen 과 함께 쓰면 검증값만 저장 — 이후 seen 없는 호출은 항목이 저장된 피드만 조건부 요청)
+    - image_cache: Django 캐시. 넘기면 기사 링크별 og:image 결과(이미지 없음 포함)를 저장해 기사당 한 번만 스크랩
+    - seen: 기사 키(entry_key) 목록을 받아 이미 저장된 키를 돌려주는 함수. 넘기면 새 기사만 정리해 반환
+    항목마다 "key"(entry_key) 가 붙고, 여러 피드에 있는 같은 기사는 한 번만 포함된다.
     """
+    urls = list(urls)
+    started = time.monotonic()
+    end = started + deadline
+    phases = {
+        "feeds": 0.0, "parse": 0.0, "og_image": 0.0, "total": 0.0,
+        "timed_out": 0, "not_modified": 0, "bytes": 0, "known": 0, "og_cached": 0, "og_scraped": 0,
+    }
+    keys = [_feed_state_key(url) for url in urls]
+    states = feed_cache.get_many(keys) if feed_cache is not None else {}
+    if seen is None:
+        # 304 면 저장된 항목을 돌려줘야 하므로 항목까지 저장된 상태만 조건부 요청에 사용
+        states = {key: state for key, state in states.items() if state.get("items") is not None}
+    fresh_states: dict[str, dict] = {}
     items: list[dict] = []
-    tried = 0
-
-    with requests.Session() as session:
-        for url in urls:
-            # feedparser 요청 시 UA 지정
-            d = feedparser.parse(url, request_headers=HEADERS)
-
-            # 파싱 에러(bozo) 있으면 넘어가되, 필요시 로깅 고려
-            # if getattr(d, "bozo", 0):
-            #     print("RSS parse warning:", url, getattr(d, "bozo_exception", None))
-
-            for e in d.entries[:limit_per_feed]:
-                ts = _to_epoch_utc(e)
-                link = e.get("link")
 
-                # 피드 자체에서 이미지 탐색
-                img = _first_image_from_feed_entry(e)
-
-                # 이미지가 없으면 og:image 시도(상한 제한)
-                if not img and try_scrape_og_image and link and tried < scrape_limit:
-                    og = _get_og_image(link, session=session)
-                    if og:
-                        img = og
-                    tried += 1
-
-                items.append(
-                    {
+    # 시간 초과 작업은 기다리지 않도록 풀은 with 대신 shutdown(wait=False)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    session = _session(workers)
+    try:
+        # 1) 피드 다운로드 (동시)
+        t0 = time.monotonic()
+        timeout = min(FEED_TIMEOUT, deadline)
+        responses, timed_out = _run_all(
+            pool, _download_feed, [(url, session, timeout, states.get(key)) for url, key in zip(urls, keys)], end
+        )
+        phases["feeds"] = time.monotonic() - t0
+        phases["timed_out"] += timed_out
+
+        # 2) 파싱 (피드 순서 유지). 같은 기사(GUID/링크)는 한 번만, seen 이 아는 기사는 정리하지 않음
+        t0 = time.monotonic()
+        parsed = []  # (피드 상태 키, 응답, [(기사 키, 엔트리)])
+        for key, r in zip(keys, responses):
+            if r is None:
+                continue
+            phases["bytes"] += len(r.content)
+            if r.status_code == 304 and key in states:
+                # 변경 없음: 저장해 둔 항목 재사용 (seen 이 있으면 새 기사가 없으므로 건너뜀)
+                phases["not_modified"] += 1
+                if seen is None:
+                    items.extend(dict(item) for item in states[key]["items"][:limit_per_feed])
+                continue
+            d = feedparser.parse(r.content, response_headers=r.headers)
+            parsed.append((key, r, [(entry_key(e), e) for e in d.entries[:limit_per_feed]]))
+
+        known = set(seen([k for _, _, entries in parsed for k, _ in entries])) if seen is not None else set()
+        built = {item.get("key"): item for item in items}
+        for key, r, entries in parsed:
+            feed_items: list[dict] = []
+            etag, modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+            if feed_cache is not None and (etag or modified):
+                # seen 을 쓰면 이번에 새로 본 기사만 남으므로 항목은 저장하지 않음 (검증값만)
+                fresh_states[key] = {
+                    "etag": etag, "modified": modified, "items": feed_items if seen is None else None,
+                }
+            for k, e in entries:
+                if k in known:
+                    phases["known"] += 1
+                    continue
+                if k not in built:
+                    built[k] = {
+                        "key": k,
                         "title": clean_text(e.get("title")),
-                        "link": link,
+                        "link": e.get("link"),
                         "summary": _extract_summary(e),
                         "published": e.get("published") or e.get("updated") or "",
-                        "ts": ts,  # 정렬용 epoch(UTC)
+                        "ts": _to_epoch_utc(e),  # 정렬용 epoch(UTC)
                         "source": "Investing.com",
-                        "img": img,
+                        # 피드 자체에서 이미지 탐색
+                        "img": _first_image_from_feed_entry(e),
                     }
-                )
+                    items.append(built[k])
+                feed_items.append(built[k])
+        phases["parse"] = time.monotonic() - t0
+
+        # 3) 이미지가 없는 항목: og:image 캐시 확인 후 남은 링크만 본문 스크랩 (동시, 상한 제한)
+        if try_scrape_og_image:
+            _resolve_images(items, pool, session, image_cache, scrape_limit, end, phases)
+
+        # og:image 결과까지 반영된 항목을 다음 조건부 요청용으로 저장
+        if fresh_states:
+            feed_cache.set_many(fresh_states, FEED_STATE_TIMEOUT)
+
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        session.close()
 
     # 최신순 정렬:
     # 1) ts가 있는 항목이 먼저
     # 2) ts가 큰(최신) 순으로
     items.sort(key=lambda x: (x["ts"] is None, -(x["ts"] or 0)))
 
+    phases["total"] = time.monotonic() - started
+    logger.info(
+        "RSS fetch: %d items (%d already stored) from %d feeds (%d not modified, %d bytes) in %.2fs "
+        "(feeds %.2fs, parse %.2fs, og:image %.2fs for %d pages / %d cached, %d timed out)",
+        len(items), phases["known"], len(urls), phases["not_modified"], phases["bytes"], phases["total"],
+        phases["feeds"], phases["parse"], phases["og_image"], phases["og_scraped"], phases["og_cached"],
+        phases["timed_out"],
+    )
+    if timings is not None:
+        timings.update(phases)
     return items
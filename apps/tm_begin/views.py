@@ -1,41 +1,84 @@
 # apps/tm_begin/views.py
+import logging
+import threading
+import time
+
+from django.conf import settings
 from django.shortcuts import render
 from django.utils import timezone
 from django.core.paginator import Paginator
+from django.db import connection
 from django.db.models import Q
 
-from .utils.rss_fetch import fetch_rss_many
+from .ingest import INVESTING_FEEDS, ingest_news
+from .models import NewsItem
+from .search import search_news
+from .utils import news_cache
 from apps.tm_assets.models import DepositSaving, StockHolding, BondHolding
 
-# ---- RSS 설정 ----
-INVESTING_FEEDS = [
-    "https://kr.investing.com/rss/news.rss",
-    "https://kr.investing.com/rss/news_14.rss",  # 경제 지표
-    "https://kr.investing.com/rss/news_301.rss", # 외환
-]
+logger = logging.getLogger(__name__)
 
-# ---- 초간단 메모리 캐시 ----
-_CACHE = {"items": [], "at": None}
+# ---- 뉴스 수집 주기 (워커 간 공유: settings.CACHES["news"]) ----
 _CACHE_TTL = 60 * 10  # 10분
+# 기사가 하나도 없을 때 다른 워커의 첫 수집을 기다리는 최대 시간(초)
+_COLD_WAIT = 15
+NEWS_SEARCH_PER_PAGE = 12
+PORTFOLIO_SEARCH_PER_PAGE = 20
+SEARCH_QUERY_MAX = 100
+
+def _refresh_news(token):
+    """락(token)을 잡은 상태에서 새 기사 수집. 반환: 저장한 수집 상태 또는 None"""
+    try:
+        return news_cache.write(timezone.now(), added=ingest_news(INVESTING_FEEDS))
+    except Exception:
+        logger.warning("news refresh failed", exc_info=True)
+        return None
+    finally:
+        news_cache.release_lock(token)
+
+def _run_in_background(target, *args):
+    try:
+        target(*args)
+    finally:
+        connection.close()  # 스레드 전용 DB 연결 정리
+
+def _start_background(target, *args):
+    threading.Thread(target=_run_in_background, args=(target, *args), name="news-refresh", daemon=True).start()
 
-def _get_investing_news(limit=200):
-    """Investing.com 뉴스: 캐시 10분. 반환: (items[:limit], updated_at)"""
-    now = timezone.now()
-    must_refresh = (_CACHE["at"] is None) or ((now - _CACHE["at"]).total_seconds() > _CACHE_TTL)
-    if must_refresh:
-        items = fetch_rss_many(
-            INVESTING_FEEDS,
-            limit_per_feed=120,
-            try_scrape_og_image=True,
-            scrape_limit=8,
-        )
-        _CACHE["items"] = items
-        _CACHE["at"] = now
-    return _CACHE["items"][:limit], _CACHE["at"]
+def _wait_for_news(timeout):
+    """다른 워커의 첫 수집이 끝날 때까지 대기. 반환: 수집 상태 또는 None"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        entry = news_cache.read()
+        if entry is not None:
+            return entry
+    return None
+
+def _news_updated_at():
+    """
+    Investing.com 뉴스 수집 주기 관리: 10분. 반환: 마지막 수집 시각 (모르면 None)
+    - 주기가 지나면 저장된 기사를 그대로 보여 주고 수집은 락을 잡은 워커 하나가 백그라운드로 수행
+      (settings.NEWS_STALE_WHILE_REVALIDATE=False 면 요청 안에서 수집)
+    - 기사가 하나도 없으면(첫 워밍업) 요청 안에서 수집하거나 다른 워커의 수집을 기다림
+    """
+    entry = news_cache.read()
+    if entry is None and not NewsItem.objects.exists():
+        token = news_cache.acquire_lock()
+        entry = _refresh_news(token) if token else _wait_for_news(_COLD_WAIT)
+    elif entry is None or (timezone.now() - entry["at"]).total_seconds() > _CACHE_TTL:
+        token = news_cache.acquire_lock()
+        if token:
+            if getattr(settings, "NEWS_STALE_WHILE_REVALIDATE", True):
+                _start_background(_refresh_news, token)
+            else:
+                entry = _refresh_news(token) or entry
+    return entry["at"] if entry else None
 
 def index(request):
     # 홈: 가볍게 20개만
-    news_list, updated_at = _get_investing_news(limit=20)
+    updated_at = _news_updated_at()
+    news_list = list(NewsItem.objects.all()[:20])
     return render(request, "common/index.html", {
         "news_list": news_list,
         "updated_at": updated_at,
@@ -43,13 +86,14 @@ def index(request):
     })
 
 def investing_news(request):
-    # 목록: 페이지당 9개 (히어로 1 + 카드 그리드)
-    items, updated_at = _get_investing_news(limit=200)
-    paginator = Paginator(items, 9)
+    # 목록: 페이지당 9개 (히어로 1 + 카드 그리드), 저장된 기사 전체를 발행 시각 인덱스로 페이지 조회
+    updated_at = _news_updated_at()
+    paginator = Paginator(NewsItem.objects.all(), 9)
     page_obj = paginator.get_page(request.GET.get("page"))
+    page_items = list(page_obj.object_list)
 
-    hero_item = page_obj.object_list[0] if page_obj.object_list else None
-    grid_items = page_obj.object_list[1:] if len(page_obj.object_list) > 1 else []
+    hero_item = page_items[0] if page_items else None
+    grid_items = page_items[1:]
 
     # 페이지 번호(현재±2)
     page_group = 2
@@ -59,7 +103,7 @@ def investing_news(request):
 
     ctx = {
         "updated_at": updated_at,
-        "count": len(page_obj.object_list),
+        "count": len(page_items),
         "total": paginator.count,
         "page": page_obj.number,
         "total_pages": paginator.num_pages,
@@ -73,9 +117,30 @@ def investing_news(request):
     }
     return render(request, "tm_begin/stock_news.html", ctx)
 
+def _portfolio_search(user, query, params):
+    """
+    로그인 사용자의 보유 자산만 검색. 자산군별 Page (PORTFOLIO_SEARCH_PER_PAGE 개씩, ?<자산군>_page=N).
+    PostgreSQL 에서는 pg_trgm 인덱스가 icontains 를 받쳐 준다 (tm_assets 0011).
+    """
+    searches = {
+        'deposit_savings': DepositSaving.objects.filter(
+            Q(bank_name__icontains=query) | Q(product_name__icontains=query)
+        ).only('pk', 'bank_name', 'product_name').order_by('bank_name', 'product_name', 'pk'),
+        'stock_holdings': StockHolding.objects.filter(
+            Q(ticker__icontains=query) | Q(name__icontains=query)
+        ).only('pk', 'ticker', 'name').order_by('name', 'ticker', 'pk'),
+        'bond_holdings': BondHolding.objects.filter(
+            Q(name__icontains=query) | Q(issuer__icontains=query)
+        ).only('pk', 'name', 'issuer').order_by('name', 'pk'),
+    }
+    return {
+        key: Paginator(qs.filter(user=user), PORTFOLIO_SEARCH_PER_PAGE).get_page(params.get(f'{key}_page'))
+        for key, qs in searches.items()
+    }
+
 def search(request):
-    query = request.GET.get('q')
-    news_results = []
+    query = (request.GET.get('q') or '').strip()[:SEARCH_QUERY_MAX]
+    news_page, news_results = None, []
     portfolio_results = {
         'deposit_savings': [],
         'stock_holdings': [],
@@ -83,29 +148,17 @@ def search(request):
     }
 
     if query:
-        # 뉴스 검색(제목/요약)
-        all_news, _ = _get_investing_news(limit=1000)
-        q = query.lower()
-        news_results = [
-            item for item in all_news
-            if q in item.get('title', '').lower()
-            or q in item.get('summary', '').lower()
-        ]
-
-        # 포트폴리오 검색
-        portfolio_results['deposit_savings'] = list(DepositSaving.objects.filter(
-            Q(bank_name__icontains=query) | Q(product_name__icontains=query)
-        ))
-        portfolio_results['stock_holdings'] = list(StockHolding.objects.filter(
-            Q(ticker__icontains=query) | Q(name__icontains=query)
-        ))
-        portfolio_results['bond_holdings'] = list(BondHolding.objects.filter(
-            Q(name__icontains=query) | Q(issuer__icontains=query)
-        ))
+        # 뉴스 검색(제목/요약): bigram 색인 + BM25 순위, 페이지 단위
+        news_page, news_results = search_news(query, request.GET.get("page"), NEWS_SEARCH_PER_PAGE)
+
+        # 포트폴리오 검색: 본인 자산만, 자산군별 페이지 단위
+        if request.user.is_authenticated:
+            portfolio_results = _portfolio_search(request.user, query, request.GET)
 
     context = {
         'query': query,
         'news_results': news_results,
+        'news_page': news_page,
         'portfolio_results': portfolio_results,
     }
     return render(request, 'tm_begin/search_results.html', context)
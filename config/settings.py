@@ -119,6 +119,32 @@ else:
         }
     }
 
+# Cache: 웹 인스턴스들과 가격 워커가 무효화·락을 공유해야 하므로 배포 환경은 모두가 보는 백엔드가 필요하다.
+# 기본은 DB 캐시 (테이블은 build.sh 의 createcachetable 로 생성). 로컬 개발(DEBUG, DATABASE_URL 없음)은
+# 별도 준비 없이 뜨도록 프로세스 메모리 캐시 — 인스턴스 간 공유되지 않으므로 배포에는 쓰지 않는다. Redis 사용 예:
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://host:6379/0
+_DEFAULT_CACHE_BACKEND = (
+    'django.core.cache.backends.locmem.LocMemCache' if DEBUG and not DATABASE_URL
+    else 'django.core.cache.backends.db.DatabaseCache'
+)
+CACHES = {
+    "default": {
+        "BACKEND": config('CACHE_BACKEND', default=_DEFAULT_CACHE_BACKEND),
+        "LOCATION": config('CACHE_LOCATION', default='tm_cache'),
+    },
+    # 뉴스 수집 상태/락, og:image 캐시 (NEWS_CACHE_LOCATION=redis://host:6379/1 등)
+    "news": {
+        "BACKEND": config('NEWS_CACHE_BACKEND', default=_DEFAULT_CACHE_BACKEND),
+        "LOCATION": config('NEWS_CACHE_LOCATION', default='tm_news_cache'),
+    },
+}
+
+# 테스트는 실제 캐시 대신 프로세스 메모리 캐시 사용 (배포/개발용 캐시 데이터를 건드리지 않음)
+if sys.argv[1:2] == ['test']:
+    CACHES = {
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"test-{alias}"}
+        for alias in CACHES
+    }
 
 
 # Password validation
@@ -224,3 +250,39 @@ CSRF_TRUSTED_ORIGINS = []
 if RENDER_EXTERNAL_HOSTNAME:
     CSRF_TRUSTED_ORIGINS.append(f'https://{RENDER_EXTERNAL_HOSTNAME}')
 
+
+# 시세 공급자별 요청 제한 (update_asset_prices --workers 사용 시 적용)
+# concurrency: 동시 요청 수, rps: 초당 요청 수
+PRICE_PROVIDER_LIMITS = {
+    'FDR': {
+        'concurrency': config('FDR_CONCURRENCY', default=4, cast=int),
+        'rps': config('FDR_RPS', default=5.0, cast=float),
+    },
+    'pykrx': {
+        'concurrency': config('PYKRX_CONCURRENCY', default=2, cast=int),
+        'rps': config('PYKRX_RPS', default=2.0, cast=float),
+    },
+}
+
+# 로컬 OHLCV 가격 저장소 (종목별 .npy 파일, 모든 워커/커맨드가 공유)
+PRICE_STORE_DIR = config('PRICE_STORE_DIR', default=str(BASE_DIR / 'var' / 'price_store'))
+
+# 가격/평가액 이력 보존 정책 (compact_price_history 커맨드)
+PRICE_HISTORY_RETENTION_DAYS = config('PRICE_HISTORY_RETENTION_DAYS', default=365 * 5, cast=int)
+PRICE_HISTORY_INTRADAY_DAYS = config('PRICE_HISTORY_INTRADAY_DAYS', default=30, cast=int)
+
+# 합계/비중을 환산할 기준 통화, 프로세스 내 환율 캐시 유지 시간(초)
+BASE_CURRENCY = config('BASE_CURRENCY', default='KRW')
+FX_CACHE_TTL = config('FX_CACHE_TTL', default=300, cast=int)
+
+# 이 시간(초) 동안 진행 기록이 없는 가격 새로고침 작업은 워커가 죽은 것으로 보고 실패 처리
+PRICE_JOB_STALE_SECONDS = config('PRICE_JOB_STALE_SECONDS', default=900, cast=int)
+
+# 국내 주식을 거래일별 KRX 전 종목 시세표(pykrx)로 일괄 갱신 (False 면 종목별 FDR 조회)
+PRICE_KRX_SNAPSHOT = config('PRICE_KRX_SNAPSHOT', default=True, cast=bool)
+
+# 뉴스 목록이 만료되면 이전 목록을 바로 보여 주고 백그라운드에서 갱신 (False: 요청 안에서 갱신)
+NEWS_STALE_WHILE_REVALIDATE = config('NEWS_STALE_WHILE_REVALIDATE', default=True, cast=bool)
+
+# 자산 화면 컨텍스트 캐시 유지 시간(초) — 데이터 변경 시에는 즉시 무효화
+TM_ASSETS_VIEW_CACHE_TIMEOUT = config('TM_ASSETS_VIEW_CACHE_TIMEOUT', default=600, cast=int)